@@ -0,0 +1,277 @@
+"""
+Benchmark du moteur - Simulation pas à pas, sans temps réel
+Lancer avec : python benchmark.py [--quick] [--output bench.json] [--baseline ancien.json]
+
+Chaque scénario crée un `GameEngine` à horloge virtuelle et seed fixe,
+y place des bots synthétiques et des balles, puis enchaîne les ticks
+avec `step()` aussi vite que possible. Les résultats (ticks/s, durées
+de tick, moyenne de chaque phase, état final) sont écrits en JSON pour
+suivre les performances d'une version à l'autre ; `digest` (empreinte
+de l'état final) change si le comportement du jeu change.
+"""
+import argparse
+import contextlib
+import hashlib
+import json
+import math
+import os
+import platform
+import random
+import subprocess
+import sys
+import time
+from dataclasses import asdict, dataclass
+from typing import Callable, Dict, List, Optional, Tuple
+
+import config
+from engine import GameEngine
+from entities import Player
+from physics import find_obstacle_collision
+from scheduler import TickStats, VirtualClock
+
+BENCHMARK_VERSION = 1  # à incrémenter si le format ou les scénarios changent
+ACT_EVERY = 3  # ticks entre deux actions d'un bot (~MOVE_RATE_LIMIT à 60 FPS)
+HUNT_RADIUS = 10.0  # portée de visée des bots (petite : coût des bots borné à 10k joueurs)
+
+Direction = Optional[Tuple[float, float]]
+
+
+# ==================== BOTS SYNTHÉTIQUES ====================
+
+def idle_policy(engine: GameEngine, player: Player, rng: random.Random) -> Tuple[Direction, Direction]:
+    """Ne rien faire"""
+    return None, None
+
+
+def wander_policy(engine: GameEngine, player: Player, rng: random.Random) -> Tuple[Direction, Direction]:
+    """Se déplacer au hasard, sans tirer"""
+    angle = rng.uniform(0, 2 * math.pi)
+    return (math.cos(angle), math.sin(angle)), None
+
+
+def hunter_policy(engine: GameEngine, player: Player, rng: random.Random) -> Tuple[Direction, Direction]:
+    """Se déplacer au hasard et tirer sur le joueur le plus proche (à moins de HUNT_RADIUS)"""
+    move, _ = wander_policy(engine, player, rng)
+    x, y = player.x, player.y
+    target, best = None, HUNT_RADIUS ** 2
+    for other in engine.player_grid.query(x, y, HUNT_RADIUS):
+        d2 = (other.x - x) ** 2 + (other.y - y) ** 2
+        if other is not player and d2 < best:
+            target, best = other, d2
+    if target is None:
+        return move, None
+    return move, (target.x - x, target.y - y)
+
+
+POLICIES: Dict[str, Callable] = {
+    'idle': idle_policy,
+    'wander': wander_policy,
+    'hunter': hunter_policy,
+}
+
+
+# ==================== SCÉNARIOS ====================
+
+@dataclass
+class Scenario:
+    """Un monde de départ et le comportement de ses bots"""
+    name: str
+    players: int
+    bullets: int = 0  # balles en vol au départ
+    obstacles: int = config.OBSTACLE_COUNT
+    policy: str = 'hunter'
+
+
+SCENARIOS = [
+    Scenario('idle-10', 10, policy='idle'),
+    Scenario('hunter-10', 10),
+    Scenario('hunter-100', 100),
+    Scenario('hunter-100-obstacles-200', 100, obstacles=200),
+    Scenario('hunter-1k', 1_000),
+    Scenario('hunter-1k-bullets-5k', 1_000, bullets=5_000),
+    Scenario('hunter-1k-obstacles-200', 1_000, obstacles=200),
+    Scenario('idle-100-bullets-10k', 100, bullets=10_000, policy='idle'),
+    Scenario('hunter-10k', 10_000),
+]
+QUICK_MAX_PLAYERS = 1_000  # --quick : scénarios jusqu'à 1000 joueurs
+
+
+def populate(engine: GameEngine, scenario: Scenario, rng: random.Random) -> List[Player]:
+    """
+    Placer les bots n'importe où hors des obstacles (sans passer par
+    join_game : ni MAX_PLAYERS ni zone de spawn) et les balles initiales
+    """
+    bots = []
+    for i in range(scenario.players):
+        for _ in range(20):
+            x = rng.uniform(0, config.MAP_WIDTH)
+            y = rng.uniform(0, config.MAP_HEIGHT)
+            if not find_obstacle_collision(x, y, config.PLAYER_RADIUS, engine.obstacle_index):
+                break
+        bots.append(engine._add_player(f"bot_{i}", x, y))
+
+    for _ in range(scenario.bullets):
+        owner = rng.choice(bots)
+        angle = rng.uniform(0, 2 * math.pi)
+        engine._spawn_bullet(owner.entity_id, rng.uniform(0, config.MAP_WIDTH), rng.uniform(0, config.MAP_HEIGHT),
+                             math.cos(angle) * config.BULLET_SPEED, math.sin(angle) * config.BULLET_SPEED)
+    return bots
+
+
+def act(engine: GameEngine, bots: List[Player], policy: Callable, rng: random.Random, tick: int):
+    """Un lot d'actions pour les bots dont c'est le tour (comme /actions), exécuté au prochain tick"""
+    actions = []
+    for i, player in enumerate(bots):
+        if (tick + i) % ACT_EVERY or player.entity_id not in engine.players:
+            continue
+        move, shoot = policy(engine, player, rng)
+        if move is not None or shoot is not None:
+            actions.append({'player_id': player.entity_id, 'move': move, 'shoot': shoot})
+    if actions:
+        engine.submit(engine.player_actions, actions)
+
+
+def percentile(sorted_values: List[float], q: float) -> float:
+    return sorted_values[min(len(sorted_values) - 1, int(round(q * (len(sorted_values) - 1))))]
+
+
+def run_scenario(scenario: Scenario, ticks: int, warmup: int, seed: int) -> dict:
+    """Jouer un scénario ; seules les `ticks` mesures après l'échauffement comptent"""
+    policy = POLICIES[scenario.policy]
+    rng = random.Random(seed)
+    durations: List[float] = []
+    bots_time = 0.0
+    clock = time.perf_counter
+
+    # Les print du moteur (morts, etc.) ne doivent pas peser sur la mesure
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        engine = GameEngine(stats_file=None, seed=seed, clock=VirtualClock(),
+                            obstacle_count=scenario.obstacles)
+        bots = populate(engine, scenario, rng)
+        engine.step()  # premier snapshot avec tout le monde
+
+        for tick in range(warmup + ticks):
+            if tick == warmup:
+                engine.tick_stats = TickStats()
+            start = clock()
+            act(engine, bots, policy, rng, tick)
+            bots_done = clock()
+            engine.step()
+            if tick >= warmup:
+                bots_time += bots_done - start
+                durations.append(clock() - bots_done)
+
+    durations.sort()
+    total = sum(durations)
+    tick_stats = engine.tick_stats.to_dict()
+    return dict(
+        asdict(scenario),
+        seed=seed,
+        ticks=ticks,
+        ticks_per_second=round(ticks / total, 1),
+        realtime_factor=round(ticks / total / config.TICK_RATE, 2),  # > 1 : tient les 60 FPS
+        tick_ms={
+            'avg': round(total / ticks * 1000, 3),
+            'p50': round(percentile(durations, 0.50) * 1000, 3),
+            'p95': round(percentile(durations, 0.95) * 1000, 3),
+            'p99': round(percentile(durations, 0.99) * 1000, 3),
+            'max': round(durations[-1] * 1000, 3),
+        },
+        phases_avg_ms=tick_stats['phases_avg_ms'],
+        bots_ms=round(bots_time / ticks * 1000, 3),  # coût des bots, hors moteur
+        final={
+            'players': len(engine.players),
+            'bullets': engine.bullet_count(),
+            'kills': engine.stats.total_kills_all_time,
+            'shots': engine.stats.total_shots_all_time,
+            'digest': hashlib.sha1(engine.snapshot.body).hexdigest()[:16],
+        },
+    )
+
+
+# ==================== RAPPORT ====================
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True,
+                              text=True, check=True, cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results: List[dict], baseline: dict, tolerance: float) -> List[str]:
+    """Scénarios plus lents que la référence au-delà de `tolerance` (ratio de ticks/s)"""
+    previous = {r['name']: r for r in baseline.get('scenarios', [])}
+    regressions = []
+    print(f"\n📉 Comparaison avec {baseline.get('commit') or 'la référence'}")
+    for result in results:
+        old = previous.get(result['name'])
+        if old is None:
+            continue
+        ratio = result['ticks_per_second'] / old['ticks_per_second']
+        flag = ''
+        if ratio < 1 - tolerance:
+            flag = ' ❌ régression'
+            regressions.append(result['name'])
+        if result['final']['digest'] != old['final']['digest']:
+            flag += ' (comportement modifié)'
+        print(f"   {result['name']:<28} {old['ticks_per_second']:>10.1f} → {result['ticks_per_second']:>10.1f} ticks/s"
+              f"  ×{ratio:.2f}{flag}")
+    return regressions
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark du moteur Battle Arena")
+    parser.add_argument('--ticks', type=int, default=300, help="ticks mesurés par scénario")
+    parser.add_argument('--warmup', type=int, default=30, help="ticks d'échauffement non mesurés")
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--quick', action='store_true', help=f"jusqu'à {QUICK_MAX_PLAYERS} joueurs seulement")
+    parser.add_argument('--only', nargs='+', metavar='NOM', help="scénarios à jouer")
+    parser.add_argument('--output', default='benchmark_results.json', help="fichier JSON des résultats")
+    parser.add_argument('--baseline', help="résultats précédents à comparer")
+    parser.add_argument('--tolerance', type=float, default=0.10, help="ralentissement toléré (0.10 = 10%%)")
+    args = parser.parse_args(argv)
+
+    scenarios = [s for s in SCENARIOS
+                 if (not args.only or s.name in args.only)
+                 and (not args.quick or s.players <= QUICK_MAX_PLAYERS)]
+
+    print(f"⏱️ {len(scenarios)} scénarios, {args.ticks} ticks chacun (stockage des balles : {config.BULLET_STORE})")
+    print(f"   {'Scénario':<28} {'ticks/s':>10} {'×temps réel':>12} {'p99 ms':>8}  phases (ms)")
+    results = []
+    for scenario in scenarios:
+        result = run_scenario(scenario, args.ticks, args.warmup, args.seed)
+        results.append(result)
+        phases = ' '.join(f"{k}={v}" for k, v in result['phases_avg_ms'].items())
+        print(f"   {scenario.name:<28} {result['ticks_per_second']:>10.1f} {result['realtime_factor']:>12.2f}"
+              f" {result['tick_ms']['p99']:>8.2f}  {phases}")
+
+    report = {
+        'benchmark_version': BENCHMARK_VERSION,
+        'commit': _git_commit(),
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'config': {
+            'tick_rate': config.TICK_RATE,
+            'bullet_store': config.BULLET_STORE,
+            'map': [config.MAP_WIDTH, config.MAP_HEIGHT],
+            'ticks': args.ticks,
+            'warmup': args.warmup,
+        },
+        'scenarios': results,
+    }
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"💾 Résultats écrits dans {args.output}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        if regressions:
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,600 @@
+"""
+Stockage des balles
+
+- `BulletPool` (par défaut) : objets `Bullet` préalloués et recyclés,
+  identifiés par un handle entier.
+- `ArrayBulletStore` : tableaux NumPy (struct-of-arrays). Toutes les balles
+  vivantes occupent les `n` premières cases de tableaux contigus, et
+  l'intégration, les rebonds, le nettoyage et les impacts sont calculés
+  en quelques opérations vectorisées par tick. Seules les paires
+  balle/obstacle et balle/joueur d'une même cellule de la grille
+  (SPATIAL_CELL_SIZE) sont testées, comme dans le moteur.
+  Activé avec `config.BULLET_STORE = "numpy"`.
+"""
+import math
+import time
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+try:
+    import numpy as np
+except ImportError:  # numpy est optionnel
+    np = None
+
+from entities import Bullet
+import config
+
+
+# Normales des côtés gauche, droite, haut, bas d'un obstacle
+_SIDE_NORMALS = np.array([[-1.0, 0.0], [1.0, 0.0], [0.0, -1.0], [0.0, 1.0]]) if np else None
+
+
+class BulletPool:
+    """
+    Pool de `Bullet` préallouées (stockage par défaut).
+
+    Le handle d'une balle est son indice dans le pool ; une balle
+    disparue rend son handle et son objet, réutilisés par le tir suivant
+    (ni UUID ni allocation). Le nombre de balles vivantes par joueur est
+    tenu à jour au tir et à la disparition : la limite se vérifie en O(1).
+    """
+
+    def __init__(self, capacity: int = config.MAX_PLAYERS * config.MAX_BULLETS_PER_PLAYER,
+                 clock: Callable[[], float] = time.time):
+        self.clock = clock  # horloge du moteur (date de tir)
+        self._slots: List[Bullet] = [
+            Bullet(entity_id=i, owner_id='', x=0.0, y=0.0, vx=0.0, vy=0.0)
+            for i in range(capacity)
+        ]
+        self._free: List[int] = list(range(capacity - 1, -1, -1))  # pile : petits handles d'abord
+        self._live: Dict[int, Bullet] = {}  # balles vivantes par handle, ordre de tir
+        self._owned: Dict[str, int] = {}  # {owner_id: balles vivantes}
+
+    def __len__(self) -> int:
+        return len(self._live)
+
+    def __iter__(self) -> Iterator[Bullet]:
+        """Balles vivantes (ne pas tirer ni libérer pendant l'itération)"""
+        return iter(self._live.values())
+
+    def get(self, handle: int) -> Optional[Bullet]:
+        return self._live.get(handle)
+
+    def spawn(self, owner_id: str, x: float, y: float, vx: float, vy: float,
+              damage: int, public_id: int) -> Bullet:
+        """Activer une balle (recyclée si possible)"""
+        if self._free:
+            bullet = self._slots[self._free.pop()]
+        else:
+            bullet = Bullet(entity_id=len(self._slots), owner_id='', x=0.0, y=0.0, vx=0.0, vy=0.0)
+            self._slots.append(bullet)
+
+        bullet.owner_id = owner_id
+        bullet.x = x
+        bullet.y = y
+        bullet.vx = vx
+        bullet.vy = vy
+        bullet.bounces = 0
+        bullet.damage = damage
+        bullet.created_at = self.clock()
+        bullet.public_id = public_id
+
+        self._live[bullet.entity_id] = bullet
+        self._owned[owner_id] = self._owned.get(owner_id, 0) + 1
+        return bullet
+
+    def release(self, bullet: Bullet):
+        """Rendre une balle au pool (no-op si déjà libérée)"""
+        if self._live.pop(bullet.entity_id, None) is None:
+            return
+        owned = self._owned[bullet.owner_id] - 1
+        if owned:
+            self._owned[bullet.owner_id] = owned
+        else:
+            del self._owned[bullet.owner_id]
+        self._free.append(bullet.entity_id)
+
+    def count_owned(self, owner_id: str) -> int:
+        """Nombre de balles vivantes d'un joueur"""
+        return self._owned.get(owner_id, 0)
+
+
+class ArrayBulletStore:
+    """
+    Balles en tableaux contigus, compactés à chaque tick.
+
+    Même partie que `BulletPool` + `GameEngine._sweep_bullet` : mêmes
+    calculs flottants, balles traitées dans l'ordre de tir, et une balle
+    ne touche jamais un joueur tué par une balle précédente du même tick.
+    """
+
+    def __init__(self, obstacles, capacity: int = 1024, clock: Callable[[], float] = time.time):
+        if np is None:
+            raise RuntimeError("BULLET_STORE = 'numpy' nécessite le paquet numpy")
+
+        self.clock = clock  # horloge du moteur (date de tir, durée de vie)
+        self.capacity = capacity
+        self.n = 0
+        self.pair_tests = 0  # paires balle/obstacle ou joueur testées au dernier step
+
+        self.ids = np.zeros(capacity, dtype=np.int64)
+        self.x = np.zeros(capacity, dtype=np.float64)
+        self.y = np.zeros(capacity, dtype=np.float64)
+        self.vx = np.zeros(capacity, dtype=np.float64)
+        self.vy = np.zeros(capacity, dtype=np.float64)
+        self.bounces = np.zeros(capacity, dtype=np.int16)
+        self.damage = np.zeros(capacity, dtype=np.int32)
+        self.owner = np.zeros(capacity, dtype=np.int32)
+        self.created_at = np.zeros(capacity, dtype=np.float64)
+
+        # Les owners (player_id) sont remplacés par un index entier
+        self._owner_index: Dict[str, int] = {}
+        self._owner_ids: List[str] = []
+        self._owned: List[int] = []  # balles vivantes par index owner
+
+        # Obstacles figés en tableaux (ils ne bougent jamais)
+        self._ox = np.array([o.x for o in obstacles], dtype=np.float64)
+        self._oy = np.array([o.y for o in obstacles], dtype=np.float64)
+        self._ox2 = self._ox + np.array([o.width for o in obstacles], dtype=np.float64)
+        self._oy2 = self._oy + np.array([o.height for o in obstacles], dtype=np.float64)
+
+        # Grille de la map (cellules de `ObstacleGrid` / `SpatialHash`)
+        self._inv_cell = 1.0 / config.SPATIAL_CELL_SIZE
+        self._grid_w = int(math.floor(config.MAP_WIDTH * self._inv_cell)) + 1
+        self._grid_h = int(math.floor(config.MAP_HEIGHT * self._inv_cell)) + 1
+        # Obstacles de chaque cellule recouverte par leur AABB (CSR), par index croissant
+        self._obs_cx, self._obs_cy = self._cell_of(self._ox, self._oy)
+        hi_x, hi_y = self._cell_of(self._ox2, self._oy2)
+        buckets: List[List[int]] = [[] for _ in range(self._grid_w * self._grid_h)]
+        for i, (x1, y1, x2, y2) in enumerate(zip(self._obs_cx.tolist(), self._obs_cy.tolist(),
+                                                 hi_x.tolist(), hi_y.tolist())):
+            for cx in range(max(x1, 0), min(x2, self._grid_w - 1) + 1):
+                for cy in range(max(y1, 0), min(y2, self._grid_h - 1) + 1):
+                    buckets[cx * self._grid_h + cy].append(i)
+        self._obs_start = np.cumsum([0] + [len(b) for b in buckets]).astype(np.int64)
+        self._obs_items = np.array([i for b in buckets for i in b], dtype=np.int64)
+
+    def __len__(self) -> int:
+        return self.n
+
+    _COLUMNS = ('ids', 'x', 'y', 'vx', 'vy', 'bounces', 'damage', 'owner', 'created_at')
+    _MOVING = ('x', 'y', 'vx', 'vy', 'bounces')  # colonnes modifiées par `_advance`
+
+    def _grow(self):
+        self.capacity *= 2
+        for name in self._COLUMNS:
+            old = getattr(self, name)
+            new = np.zeros(self.capacity, dtype=old.dtype)
+            new[:self.n] = old[:self.n]
+            setattr(self, name, new)
+
+    def _owner_slot(self, owner_id: str) -> int:
+        slot = self._owner_index.get(owner_id)
+        if slot is None:
+            slot = len(self._owner_ids)
+            self._owner_index[owner_id] = slot
+            self._owner_ids.append(owner_id)
+            self._owned.append(0)
+        return slot
+
+    def _compact_owners(self):
+        """Renuméroter les owners encore référencés (évite une table sans fin)"""
+        live = np.unique(self.owner[:self.n])
+        remap = np.full(len(self._owner_ids), -1, dtype=np.int32)
+        remap[live] = np.arange(len(live), dtype=np.int32)
+        self.owner[:self.n] = remap[self.owner[:self.n]]
+        self._owner_ids = [self._owner_ids[i] for i in live.tolist()]
+        self._owned = [self._owned[i] for i in live.tolist()]
+        self._owner_index = {owner_id: i for i, owner_id in enumerate(self._owner_ids)}
+
+    # ==================== SPAWN / REQUÊTES ====================
+
+    def spawn(self, owner_id: str, x: float, y: float, vx: float, vy: float,
+              damage: int, public_id: int) -> int:
+        """Ajouter une balle, retourne son handle public"""
+        if self.n == self.capacity:
+            self._grow()
+        i = self.n
+
+        self.ids[i] = public_id
+        self.x[i] = x
+        self.y[i] = y
+        self.vx[i] = vx
+        self.vy[i] = vy
+        self.bounces[i] = 0
+        self.damage[i] = damage
+        slot = self._owner_slot(owner_id)
+        self.owner[i] = slot
+        self._owned[slot] += 1
+        self.created_at[i] = self.clock()
+        self.n += 1
+        return public_id
+
+    def count_owned(self, owner_id: str) -> int:
+        """Nombre de balles vivantes d'un joueur"""
+        slot = self._owner_index.get(owner_id)
+        if slot is None:
+            return 0
+        return self._owned[slot]
+
+    def handles(self) -> List[int]:
+        """Handles publics des balles vivantes, dans l'ordre de `to_public_list`"""
+        return self.ids[:self.n].tolist()
+
+    def to_public_list(self) -> List[dict]:
+        """Même format que `Bullet.to_public_dict` pour toutes les balles"""
+        n = self.n
+        # round() de Python, pas np.round : mêmes arrondis que `public_bullets`
+        columns = [[round(v, 2) for v in a[:n].tolist()] for a in (self.x, self.y, self.vx, self.vy)]
+        return [{'x': x, 'y': y, 'vx': vx, 'vy': vy} for x, y, vx, vy in zip(*columns)]
+
+    # ==================== SIMULATION ====================
+
+    def _keep(self, keep):
+        """Compacter les tableaux en ne gardant que les balles du masque"""
+        n = self.n
+        kept = int(np.count_nonzero(keep))
+        if kept == n:
+            return
+        slots, counts = np.unique(self.owner[:n][~keep], return_counts=True)
+        for slot, count in zip(slots.tolist(), counts.tolist()):
+            self._owned[slot] -= count
+        for name in self._COLUMNS:
+            column = getattr(self, name)
+            column[:kept] = column[:n][keep]
+        self.n = kept
+        if len(self._owner_ids) > 4 * max(kept, 256):
+            self._compact_owners()
+
+    def step(self, dt: float, players) -> List[Tuple[str, str, int]]:
+        """
+        Avancer toutes les balles d'un tick en une passe balayée : le premier
+        contact le long du segment (obstacle ou joueur) décide entre rebond
+        et impact, puis sortie de map et durée de vie max.
+
+        Comme dans le moteur, les balles sont traitées dans l'ordre de tir :
+        une balle qui atteint un joueur tué par une balle précédente du tick
+        continue sa route. Retourne les impacts
+        [(player_id, owner_id, damage), ...] dans l'ordre des balles ; le
+        moteur applique les dégâts et les morts.
+        """
+        n = self.n
+        self.pair_tests = 0
+        if n == 0:
+            return []
+
+        # Joueurs figés en tableaux pour ce tick
+        player_ids = list(players.keys())
+        count = len(player_ids)
+        px = np.fromiter((p.x for p in players.values()), dtype=np.float64, count=count)
+        py = np.fromiter((p.y for p in players.values()), dtype=np.float64, count=count)
+        public = np.fromiter((p.public_id for p in players.values()), dtype=np.int64, count=count)
+        health = [p.health for p in players.values()]
+        # Index owner de chaque joueur (-1 s'il n'a jamais tiré)
+        powner = np.array([self._owner_index.get(pid, -1) for pid in player_ids], dtype=np.int32)
+        alive = np.ones(count, dtype=bool)
+
+        keep = np.ones(n, dtype=bool)
+        target = np.full(n, -1, dtype=np.int64)
+        saved = [getattr(self, name)[:n].copy() for name in self._MOVING]
+        self._advance(np.arange(n), dt, keep, target, px, py, public, powner,
+                      self._index_players(px, py, alive))
+
+        # Dégâts dans l'ordre des balles. Une balle qui vise un joueur déjà
+        # tué est rejouée sans les morts (seul son impact pouvait changer),
+        # avec les autres balles suivantes dans le même cas.
+        hits = []
+        hit_rows = np.nonzero(target >= 0)[0]
+        k = 0
+        while k < len(hit_rows):
+            row = int(hit_rows[k])
+            p = int(target[row])
+            if not alive[p]:
+                later = hit_rows[k:]
+                redo = later[~alive[target[later]]]
+                for name, column in zip(self._MOVING, saved):
+                    getattr(self, name)[redo] = column[redo]
+                keep[redo] = True
+                target[redo] = -1
+                self._advance(redo, dt, keep, target, px, py, public, powner,
+                              self._index_players(px, py, alive))
+                hit_rows = np.nonzero(target[row:] >= 0)[0] + row
+                k = 0
+                continue
+            damage = int(self.damage[row])
+            hits.append((player_ids[p], self._owner_ids[self.owner[row]], damage))
+            health[p] -= damage
+            if health[p] <= 0:
+                alive[p] = False
+            k += 1
+
+        x, y = self.x[:n], self.y[:n]
+        keep &= (x >= 0) & (x <= config.MAP_WIDTH) & (y >= 0) & (y <= config.MAP_HEIGHT)
+        keep &= ~(self.clock() - self.created_at[:n] > config.BULLET_LIFETIME)
+        self._keep(keep)
+        return hits
+
+    def _advance(self, rows, dt, keep, target, px, py, public, powner, grid):
+        """
+        Balayer le tick des balles `rows` (indices croissants) contre les
+        joueurs de `grid` : positions, vitesses et rebonds mis à jour, balles
+        à retirer dans `keep`, joueur touché dans `target`.
+        """
+        remaining = np.ones(len(rows))
+        active = rows
+        pos = np.arange(len(rows))  # position de chaque balle active dans `remaining`
+
+        # Au plus un segment par rebond autorisé, plus le dernier
+        for _ in range(config.BULLET_MAX_BOUNCES + 2):
+            if len(active) == 0:
+                break
+            x0, y0 = self.x[active], self.y[active]
+            dx = self.vx[active] * dt * remaining[pos]
+            dy = self.vy[active] * dt * remaining[pos]
+
+            obs_t, obs_nx, obs_ny, obs_idx, obs_tests = self._sweep_obstacles(x0, y0, dx, dy)
+            pl_t, pl_idx, pl_tests = self._sweep_players(self.owner[active], x0, y0, dx, dy,
+                                                         px, py, public, powner, grid)
+            self.pair_tests += obs_tests + pl_tests
+
+            hit_player = np.isfinite(pl_t) & (pl_t <= obs_t)
+            hit_obstacle = np.isfinite(obs_t) & ~hit_player
+            free = ~hit_player & ~hit_obstacle
+
+            # Impact joueur : la balle disparaît
+            hit_rows = active[hit_player]
+            target[hit_rows] = pl_idx[hit_player]
+            keep[hit_rows] = False
+
+            # Trajet libre : fin du segment
+            free_rows = active[free]
+            self.x[free_rows] = x0[free] + dx[free]
+            self.y[free_rows] = y0[free] + dy[free]
+
+            # Obstacle : rebond au point de contact, ou disparition si usée
+            worn = hit_obstacle & (self.bounces[active] >= config.BULLET_MAX_BOUNCES)
+            keep[active[worn]] = False
+            bouncing = hit_obstacle & ~worn
+            t = obs_t[bouncing]
+            moving = t != 0.0
+            rows_t = active[bouncing][moving]
+            b = np.nonzero(bouncing)[0][moving]
+            self.x[rows_t] = x0[b] + dx[b] * t[moving]
+            self.y[rows_t] = y0[b] + dy[b] * t[moving]
+            dot = self.vx[rows_t] * obs_nx[b] + self.vy[rows_t] * obs_ny[b]
+            self.vx[rows_t] -= 2 * dot * obs_nx[b]
+            self.vy[rows_t] -= 2 * dot * obs_ny[b]
+            # Contact dès le départ : sortir de l'obstacle, comme `_bounce_bullet_off_obstacle`
+            self._push_out(active[bouncing][~moving], obs_idx[bouncing][~moving])
+
+            rows_b = active[bouncing]
+            self.bounces[rows_b] += 1
+            pos = pos[bouncing]
+            remaining[pos] *= 1.0 - t
+            active = rows_b
+
+    def _push_out(self, rows, obs):
+        """`GameEngine._bounce_bullet_off_obstacle` : sortir de l'obstacle puis réfléchir"""
+        if len(rows) == 0:
+            return
+        r = config.BULLET_RADIUS
+        x, y = self.x[rows], self.y[rows]
+        ox, oy, ox2, oy2 = self._ox[obs], self._oy[obs], self._ox2[obs], self._oy2[obs]
+        cdx = x - np.maximum(ox, np.minimum(x, ox2))
+        cdy = y - np.maximum(oy, np.minimum(y, oy2))
+        inside = (cdx == 0.0) & (cdy == 0.0)
+
+        # Centre dans l'obstacle : poser la balle contre le côté le moins pénétré
+        side = np.argmin(np.stack([np.abs(x - ox), np.abs(ox2 - x),
+                                   np.abs(y - oy), np.abs(oy2 - y)]), axis=0)
+        x = np.where(inside & (side == 0), ox - r, np.where(inside & (side == 1), ox2 + r, x))
+        y = np.where(inside & (side == 2), oy - r, np.where(inside & (side == 3), oy2 + r, y))
+
+        # Sinon : repousser le long de la normale
+        with np.errstate(divide='ignore', invalid='ignore'):
+            dist = np.sqrt(cdx * cdx + cdy * cdy)
+            nx = np.where(inside, _SIDE_NORMALS[side, 0], cdx / dist)
+            ny = np.where(inside, _SIDE_NORMALS[side, 1], cdy / dist)
+            penetration = r - dist
+        push = ~inside & (penetration > 0)
+        self.x[rows] = np.where(push, x + nx * penetration, x)
+        self.y[rows] = np.where(push, y + ny * penetration, y)
+
+        # Réfléchir seulement si la balle se dirige vers l'obstacle
+        vx, vy = self.vx[rows], self.vy[rows]
+        dot = vx * nx + vy * ny
+        toward = dot < 0
+        self.vx[rows] = np.where(toward, vx - 2 * dot * nx, vx)
+        self.vy[rows] = np.where(toward, vy - 2 * dot * ny, vy)
+
+    # ==================== CULLING SPATIAL ====================
+
+    def _cell_pairs(self, x, y, radius, start, items):
+        """
+        Paires (segment, entité) des cellules recouvertes par le carré
+        englobant de chaque cercle (x, y, radius) : même filtre grossier que
+        `SpatialHash.query` / `ObstacleGrid.query`, pour tous les segments
+        à la fois. `start`/`items` : entités de chaque cellule (CSR).
+        Retourne (segment, entité, cellule x, cellule y) par paire.
+        """
+        inv = self._inv_cell
+        lo_x = np.maximum(np.floor((x - radius) * inv), 0).astype(np.int64)
+        hi_x = np.minimum(np.floor((x + radius) * inv), self._grid_w - 1).astype(np.int64)
+        lo_y = np.maximum(np.floor((y - radius) * inv), 0).astype(np.int64)
+        hi_y = np.minimum(np.floor((y + radius) * inv), self._grid_h - 1).astype(np.int64)
+        span_x = np.maximum(hi_x - lo_x + 1, 0)
+        cells = span_x * np.maximum(hi_y - lo_y + 1, 0)
+
+        # Une ligne par (segment, cellule recouverte)
+        seg = np.repeat(np.arange(len(x)), cells)
+        offset = np.arange(len(seg)) - np.repeat(np.cumsum(cells) - cells, cells)
+        cx = lo_x[seg] + offset % span_x[seg]
+        cy = lo_y[seg] + offset // span_x[seg]
+        cell = cx * self._grid_h + cy
+
+        # Puis une ligne par (segment, entité de la cellule)
+        first = start[cell]
+        counts = start[cell + 1] - first
+        row = np.repeat(np.arange(len(cell)), counts)
+        k = np.arange(len(row)) - np.repeat(np.cumsum(counts) - counts, counts) + first[row]
+        return seg[row], items[k], cx[row], cy[row]
+
+    def _index_players(self, px, py, alive):
+        """Joueurs vivants du tick rangés par cellule (CSR), comme `SpatialHash`"""
+        inv = self._inv_cell
+        cells = (np.clip(np.floor(px * inv), 0, self._grid_w - 1).astype(np.int64) * self._grid_h +
+                 np.clip(np.floor(py * inv), 0, self._grid_h - 1).astype(np.int64))
+        order = np.nonzero(alive)[0]
+        cells = cells[order]
+        order = order[np.argsort(cells, kind='stable')]
+        cells = np.sort(cells, kind='stable')
+        start = np.searchsorted(cells, np.arange(self._grid_w * self._grid_h + 1))
+        return start, order
+
+    @staticmethod
+    def _first_contact(m, seg, key, t):
+        """
+        Premier contact de chaque segment parmi ses paires : plus petit t,
+        à égalité la plus petite clé (id d'obstacle ou public_id, comme le
+        moteur). Retourne (t par segment, masque de la paire retenue).
+        """
+        best_t = np.full(m, np.inf)
+        np.minimum.at(best_t, seg, t)
+        first = np.isfinite(t) & (t == best_t[seg])
+        best = np.full(m, np.iinfo(np.int64).max)
+        np.minimum.at(best, seg[first], key[first])
+        return best_t, first & (key == best[seg])
+
+    def _sweep_obstacles(self, x0, y0, dx, dy):
+        """
+        Premier obstacle rencontré par chaque segment, parmi les obstacles
+        des cellules voisines. Retourne (t, nx, ny, index obstacle, paires
+        testées), t = inf sans contact.
+        """
+        m = len(x0)
+        mid_x = x0 + dx * 0.5
+        mid_y = y0 + dy * 0.5
+        reach = np.sqrt(dx * dx + dy * dy) * 0.5
+        seg, obs, cx, cy = self._cell_pairs(mid_x, mid_y, reach + config.BULLET_RADIUS,
+                                            self._obs_start, self._obs_items)
+        # Un obstacle sur plusieurs cellules : paire gardée dans la première commune
+        lo_x, lo_y = self._cell_of(mid_x - (reach + config.BULLET_RADIUS), mid_y - (reach + config.BULLET_RADIUS))
+        unique = ((cx == np.maximum(lo_x[seg], self._obs_cx[obs])) &
+                  (cy == np.maximum(lo_y[seg], self._obs_cy[obs])))
+        seg, obs = seg[unique], obs[unique]
+
+        t, nx, ny = segment_aabb_toi(x0[seg], y0[seg], dx[seg], dy[seg], config.BULLET_RADIUS,
+                                     self._ox[obs], self._oy[obs], self._ox2[obs], self._oy2[obs])
+        # Index croissant = obstacle_id croissant (ordre de `ObstacleGrid.query`)
+        best_t, chosen = self._first_contact(m, seg, obs, t)
+        best_nx = np.zeros(m)
+        best_ny = np.zeros(m)
+        best_o = np.full(m, -1, dtype=np.int64)
+        best_nx[seg[chosen]] = nx[chosen]
+        best_ny[seg[chosen]] = ny[chosen]
+        best_o[seg[chosen]] = obs[chosen]
+        return best_t, best_nx, best_ny, best_o, len(seg)
+
+    def _sweep_players(self, owners, x0, y0, dx, dy, px, py, public, powner, grid):
+        """
+        Premier joueur touché par chaque segment (sauf le tireur), parmi les
+        joueurs des cellules voisines. Retourne (t, index joueur, paires
+        testées), t = inf sans impact.
+        """
+        m = len(x0)
+        hit_r = config.BULLET_RADIUS + config.PLAYER_RADIUS
+        reach = np.sqrt(dx * dx + dy * dy) * 0.5
+        seg, player, _, _ = self._cell_pairs(x0 + dx * 0.5, y0 + dy * 0.5, reach + hit_r, *grid)
+        # Pas se tirer dessus soi-même
+        others = owners[seg] != powner[player]
+        seg, player = seg[others], player[others]
+
+        t = segment_circle_toi(x0[seg], y0[seg], dx[seg], dy[seg], px[player], py[player], hit_r)
+        best_t, chosen = self._first_contact(m, seg, public[player], t)
+        best_p = np.full(m, -1, dtype=np.int64)
+        best_p[seg[chosen]] = player[chosen]
+        return best_t, best_p, len(seg)
+
+    def _cell_of(self, x, y):
+        """Cellule (non bornée) de chaque point, comme `SpatialHash._cell_of`"""
+        inv = self._inv_cell
+        return np.floor(x * inv).astype(np.int64), np.floor(y * inv).astype(np.int64)
+
+
+# ==================== TESTS BALAYÉS VECTORISÉS ====================
+# Mêmes opérations, dans le même ordre, que physics.segment_circle_toi et
+# physics.segment_aabb_toi : les deux stockages calculent les mêmes flottants.
+
+def segment_circle_toi(x0, y0, dx, dy, cx, cy, radius):
+    """`physics.segment_circle_toi` par paire ; t = inf sans contact"""
+    with np.errstate(divide='ignore', invalid='ignore'):
+        fx = x0 - cx
+        fy = y0 - cy
+        c = fx * fx + fy * fy - radius * radius
+        a = dx * dx + dy * dy
+        b = 2 * (fx * dx + fy * dy)
+        disc = b * b - 4 * a * c
+        t = (-b - np.sqrt(disc)) / (2 * a)
+        hit = (a != 0) & (disc >= 0) & (t >= 0) & (t <= 1)
+    return np.where(c <= 0, 0.0, np.where(hit, t, np.inf))
+
+
+def _normalize(x, y):
+    """`physics.normalize_vector` par paire"""
+    with np.errstate(divide='ignore', invalid='ignore'):
+        magnitude = np.sqrt(x * x + y * y)
+        zero = magnitude == 0
+        return np.where(zero, 0.0, x / magnitude), np.where(zero, 0.0, y / magnitude)
+
+
+def _slab(p0, d, lo, hi):
+    """`physics._slab` par paire"""
+    with np.errstate(divide='ignore', invalid='ignore'):
+        t1 = (lo - p0) / d
+        t2 = (hi - p0) / d
+    inside = (lo <= p0) & (p0 <= hi)
+    still = d == 0
+    near = np.where(still, np.where(inside, -np.inf, np.inf), np.minimum(t1, t2))
+    far = np.where(still, np.inf, np.maximum(t1, t2))
+    return near, far
+
+
+def segment_aabb_toi(x0, y0, dx, dy, radius, rx, ry, rx2, ry2):
+    """`physics.segment_aabb_toi` par paire : (t, nx, ny), t = inf sans contact"""
+    # Déjà en contact au départ (physics.circle_rect_collision)
+    closest_x = np.maximum(rx, np.minimum(x0, rx2))
+    closest_y = np.maximum(ry, np.minimum(y0, ry2))
+    overlap = np.sqrt((closest_x - x0) * (closest_x - x0) + (closest_y - y0) * (closest_y - y0)) < radius
+    inside = (x0 == closest_x) & (y0 == closest_y)
+    onx, ony = _normalize(x0 - closest_x, y0 - closest_y)
+    # Centre dans l'obstacle : normale du côté le moins pénétré
+    side = np.argmin(np.stack([np.abs(x0 - rx), np.abs(rx2 - x0), np.abs(y0 - ry), np.abs(ry2 - y0)]), axis=0)
+    onx = np.where(inside, _SIDE_NORMALS[side, 0], onx)
+    ony = np.where(inside, _SIDE_NORMALS[side, 1], ony)
+    overlap_hit = inside | (dx * onx + dy * ony < 0)
+
+    # Slabs du rectangle élargi du rayon
+    near_x, far_x = _slab(x0, dx, rx - radius, rx2 + radius)
+    near_y, far_y = _slab(y0, dy, ry - radius, ry2 + radius)
+    x_face = near_x >= near_y
+    fnx = np.where(x_face, -np.copysign(1.0, dx), 0.0)
+    fny = np.where(x_face, 0.0, -np.copysign(1.0, dy))
+    t_enter = np.maximum(np.maximum(near_x, near_y), 0.0)
+    t_exit = np.minimum(far_x, far_y)
+    enters = (t_exit > 0) & (t_enter <= np.minimum(t_exit, 1.0))
+    with np.errstate(invalid='ignore'):
+        px = x0 + dx * t_enter
+        py = y0 + dy * t_enter
+    face = ((rx <= px) & (px <= rx2)) | ((ry <= py) & (py <= ry2))
+
+    # Contact dans un coin arrondi : test contre le cercle du coin
+    corner_x = np.where(px < rx, rx, rx2)
+    corner_y = np.where(py < ry, ry, ry2)
+    tc = segment_circle_toi(x0, y0, dx, dy, corner_x, corner_y, radius)
+    with np.errstate(invalid='ignore'):
+        cnx, cny = _normalize(x0 + dx * tc - corner_x, y0 + dy * tc - corner_y)
+
+    t = np.where(overlap, np.where(overlap_hit, 0.0, np.inf),
+                 np.where(enters, np.where(face, t_enter, tc), np.inf))
+    nx = np.where(overlap, onx, np.where(face, fnx, cnx))
+    ny = np.where(overlap, ony, np.where(face, fny, cny))
+    return t, nx, ny
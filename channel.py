@@ -0,0 +1,99 @@
+"""
+Canal requête/réponse entre processus (sur une `Connection` multiprocessing)
+
+L'appelant numérote chaque requête et reçoit un `Future` ; le serveur
+répond `(req_id, ok, valeur)`, dans n'importe quel ordre et depuis
+n'importe quel thread. Utilisé par les rooms et la simulation partagée.
+"""
+import itertools
+import threading
+from concurrent.futures import Future
+from typing import Callable, Dict, Optional, Type
+
+
+class RemoteError(Exception):
+    """Erreur signalée par le processus distant"""
+
+
+class RequestChannel:
+    """Côté appelant : envoie les requêtes, un thread lit les réponses"""
+
+    def __init__(self, conn, name: str, error: Type[Exception] = RemoteError):
+        self.conn = conn
+        self.name = name
+        self.error = error  # type des exceptions remontées aux appelants
+        self._ids = itertools.count()
+        self._pending: Dict[int, Future] = {}
+        self._send_lock = threading.Lock()
+        self._reader = threading.Thread(target=self._read_replies, name=f"{name}-reader", daemon=True)
+        self._reader.start()
+
+    def request(self, *message) -> Future:
+        """Envoyer `(req_id, *message)` ; le Future porte la réponse"""
+        future = Future()
+        with self._send_lock:
+            req_id = next(self._ids)
+            self._pending[req_id] = future
+            try:
+                self.conn.send((req_id, *message))
+            except (OSError, ValueError) as e:
+                del self._pending[req_id]
+                future.set_exception(self.error(f"{self.name} unavailable: {e}"))
+        return future
+
+    def _read_replies(self):
+        while True:
+            try:
+                req_id, ok, value = self.conn.recv()
+            except (EOFError, OSError):
+                break
+            future = self._pending.pop(req_id, None)
+            if future is None:
+                continue
+            if ok:
+                future.set_result(value)
+            else:
+                future.set_exception(self.error(value))
+
+        # Processus distant arrêté : ne laisser personne en attente
+        for future in list(self._pending.values()):
+            future.set_exception(self.error(f"{self.name} stopped"))
+        self._pending.clear()
+
+    def close(self, farewell: Optional[tuple] = None):
+        """Fermer la connexion, après un dernier message sans réponse (`farewell`)"""
+        with self._send_lock:
+            if farewell is not None:
+                try:
+                    self.conn.send((-1, *farewell))
+                except (OSError, ValueError):
+                    pass
+            self.conn.close()
+
+
+class Replier:
+    """Côté serveur : réponses sérialisées (plusieurs threads peuvent répondre)"""
+
+    def __init__(self, conn):
+        self.conn = conn
+        self._lock = threading.Lock()
+
+    def send(self, req_id: int, ok: bool, value):
+        with self._lock:
+            try:
+                self.conn.send((req_id, ok, value))
+            except (OSError, ValueError):
+                pass  # appelant parti
+
+    def fail(self, req_id: int, error: BaseException):
+        self.send(req_id, False, f"{type(error).__name__}: {error}")
+
+    def resolve(self, req_id: int) -> Callable[[Future], None]:
+        """Callback de Future qui renvoie son résultat (ou son erreur) à l'appelant"""
+        def callback(future: Future):
+            error = future.exception()
+            if error is None:
+                self.send(req_id, True, future.result())
+            else:
+                self.fail(req_id, error)
+        return callback
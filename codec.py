@@ -0,0 +1,248 @@
+"""
+Format binaire compact de l'état du jeu
+
+Alternative au JSON pour /state et /ws/state (`?format=binary`). Tout est
+en little-endian :
+
+    en-tête   '2s B B I I'   magic b'BA', version, flags, tick, tick de base (deltas)
+    corps     (compressé zlib si FLAG_DEFLATE)
+      noms    H count, puis count × (I index, B longueur, utf-8)
+      joueurs H count, puis count × 'I I H H B H' (id, nom, x, y, vie, kills)
+              H count, puis count × I (ids retirés)
+      balles  H count, puis count × 'I H H h h' (id, x, y, vx×100, vy×100)
+              H count, puis count × I (ids retirés)
+      statique (si FLAG_STATIC) 'f f' (largeur, hauteur de la map),
+              H count, puis count × 'H H H H H' (id, x, y, largeur, hauteur)
+
+Les coordonnées sont quantifiées sur la map en uint16 (pas ≈ 0.0015 unité).
+Les usernames passent par une table de chaînes : un nom n'est envoyé
+qu'avec la keyframe ou le delta où son joueur apparaît.
+
+Ce module ne dépend que de la bibliothèque standard : `FrameDecoder` sert
+de décodeur de référence pour les clients (cf. visualizer.py).
+"""
+import struct
+import threading
+import zlib
+from typing import Dict, Iterable, List, Optional
+
+import config
+
+
+MAGIC = b'BA'
+VERSION = 1
+MEDIA_TYPE = "application/x-battle-arena"
+
+# Formats négociables (`?format=` de /state et /ws/state)
+FORMAT_JSON = "json"
+FORMAT_BINARY = "binary"
+FORMAT_BINARY_DEFLATE = "binary-deflate"
+FORMATS = (FORMAT_JSON, FORMAT_BINARY, FORMAT_BINARY_DEFLATE)
+
+FLAG_KEYFRAME = 0x01
+FLAG_STATIC = 0x02
+FLAG_DEFLATE = 0x80
+
+_HEADER = struct.Struct('<2sBBII')
+_COUNT = struct.Struct('<H')
+_ID = struct.Struct('<I')
+_NAME = struct.Struct('<IB')
+_PLAYER = struct.Struct('<IIHHBH')
+_BULLET = struct.Struct('<IHHhh')
+_MAP = struct.Struct('<ff')
+_OBSTACLE = struct.Struct('<HHHHH')
+
+_Q = 65535
+_VELOCITY_SCALE = 100
+
+
+def _qx(x: float) -> int:
+    return min(_Q, max(0, round(x / config.MAP_WIDTH * _Q)))
+
+
+def _qy(y: float) -> int:
+    return min(_Q, max(0, round(y / config.MAP_HEIGHT * _Q)))
+
+
+def _dx(q: int) -> float:
+    return round(q * config.MAP_WIDTH / _Q, 3)
+
+
+def _dy(q: int) -> float:
+    return round(q * config.MAP_HEIGHT / _Q, 3)
+
+
+def _qv(v: float) -> int:
+    return min(32767, max(-32768, round(v * _VELOCITY_SCALE)))
+
+
+class StringTable:
+    """Index stable des usernames déjà vus (partagé par toutes les frames)"""
+
+    def __init__(self):
+        self._index: Dict[str, int] = {}
+        self._lock = threading.Lock()  # seulement pour les nouveaux noms
+
+    def index(self, name: str) -> int:
+        idx = self._index.get(name)
+        if idx is None:
+            with self._lock:
+                idx = self._index.setdefault(name, len(self._index))
+        return idx
+
+
+def encode_frame(tick: int, names: StringTable,
+                 players: Iterable[dict] = (), removed_players: Iterable[int] = (),
+                 bullets: Iterable[dict] = (), removed_bullets: Iterable[int] = (),
+                 announce: Iterable[str] = (), keyframe: bool = False,
+                 base: int = 0, static: Optional[dict] = None,
+                 compress: bool = False) -> bytes:
+    """
+    Encoder une frame. `players` et `bullets` sont des enregistrements
+    publics portant un 'id' ; `announce` liste les usernames à inclure
+    dans la table de chaînes de cette frame.
+    """
+    parts: List[bytes] = []
+
+    announce = list(dict.fromkeys(announce))
+    parts.append(_COUNT.pack(len(announce)))
+    for name in announce:
+        raw = name.encode()
+        parts.append(_NAME.pack(names.index(name), len(raw)))
+        parts.append(raw)
+
+    players = list(players)
+    parts.append(_COUNT.pack(len(players)))
+    pack = _PLAYER.pack
+    for p in players:
+        parts.append(pack(p['id'], names.index(p['username']), _qx(p['x']), _qy(p['y']),
+                          min(255, max(0, p['health'])), min(_Q, p['kills'])))
+    removed_players = list(removed_players)
+    parts.append(_COUNT.pack(len(removed_players)))
+    parts.extend(_ID.pack(i) for i in removed_players)
+
+    bullets = list(bullets)
+    parts.append(_COUNT.pack(len(bullets)))
+    pack = _BULLET.pack
+    for b in bullets:
+        parts.append(pack(b['id'], _qx(b['x']), _qy(b['y']), _qv(b['vx']), _qv(b['vy'])))
+    removed_bullets = list(removed_bullets)
+    parts.append(_COUNT.pack(len(removed_bullets)))
+    parts.extend(_ID.pack(i) for i in removed_bullets)
+
+    flags = FLAG_KEYFRAME if keyframe else 0
+    if static is not None:
+        flags |= FLAG_STATIC
+        parts.append(_MAP.pack(static['map']['width'], static['map']['height']))
+        parts.append(_COUNT.pack(len(static['obstacles'])))
+        for o in static['obstacles']:
+            parts.append(_OBSTACLE.pack(o['id'], _qx(o['x']), _qy(o['y']),
+                                        _qx(o['width']), _qy(o['height'])))
+
+    body = b''.join(parts)
+    if compress:
+        flags |= FLAG_DEFLATE
+        body = zlib.compress(body)
+    return _HEADER.pack(MAGIC, VERSION, flags, tick, base) + body
+
+
+def encode_state(tick: int, names: StringTable, players: Dict[int, dict],
+                 bullets: Dict[int, dict], static: dict, compress: bool = False) -> bytes:
+    """Frame autonome équivalente à GET /state (keyframe avec obstacles)"""
+    return encode_frame(
+        tick, names,
+        players=[dict(r, id=k) for k, r in players.items()],
+        bullets=[dict(r, id=k) for k, r in bullets.items()],
+        announce=[r['username'] for r in players.values()],
+        keyframe=True, static=static, compress=compress
+    )
+
+
+def encode_delta(tick: int, base: int, names: StringTable, players: dict,
+                 bullets: dict, compress: bool = False) -> bytes:
+    """Frame delta à partir des diffs de `stream.diff_entities`"""
+    return encode_frame(
+        tick, names,
+        players=players['added'] + players['changed'],
+        removed_players=players['removed'],
+        bullets=bullets['added'] + bullets['changed'],
+        removed_bullets=bullets['removed'],
+        announce=[r['username'] for r in players['added']],
+        base=base, compress=compress
+    )
+
+
+# ==================== DÉCODEUR DE RÉFÉRENCE ====================
+
+class FrameDecoder:
+    """
+    Décode les frames binaires en dicts au format JSON de l'API.
+
+    Garde la table des usernames d'une frame à l'autre : utiliser une
+    instance par connexion (ou par client qui interroge /state).
+    """
+
+    def __init__(self):
+        self.names: Dict[int, str] = {}
+
+    def decode(self, payload: bytes) -> dict:
+        magic, version, flags, tick, base = _HEADER.unpack_from(payload, 0)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError("Frame Battle Arena invalide")
+        body = payload[_HEADER.size:]
+        if flags & FLAG_DEFLATE:
+            body = zlib.decompress(body)
+
+        offset = 0
+
+        def count() -> int:
+            nonlocal offset
+            (n,) = _COUNT.unpack_from(body, offset)
+            offset += _COUNT.size
+            return n
+
+        def records(fmt: struct.Struct) -> List[tuple]:
+            nonlocal offset
+            n = count()
+            out = [fmt.unpack_from(body, offset + i * fmt.size) for i in range(n)]
+            offset += n * fmt.size
+            return out
+
+        for _ in range(count()):
+            idx, length = _NAME.unpack_from(body, offset)
+            offset += _NAME.size
+            self.names[idx] = body[offset:offset + length].decode()
+            offset += length
+
+        players = [
+            {'id': pid, 'username': self.names.get(name, '?'), 'x': _dx(x), 'y': _dy(y),
+             'health': health, 'kills': kills}
+            for pid, name, x, y, health, kills in records(_PLAYER)
+        ]
+        removed_players = [i for (i,) in records(_ID)]
+        bullets = [
+            {'id': bid, 'x': _dx(x), 'y': _dy(y),
+             'vx': vx / _VELOCITY_SCALE, 'vy': vy / _VELOCITY_SCALE}
+            for bid, x, y, vx, vy in records(_BULLET)
+        ]
+        removed_bullets = [i for (i,) in records(_ID)]
+
+        if flags & FLAG_KEYFRAME:
+            frame = {'type': 'keyframe', 'tick': tick, 'players': players, 'bullets': bullets}
+        else:
+            frame = {
+                'type': 'delta', 'tick': tick, 'base': base,
+                # Côté client, ajout et modification s'appliquent de la même façon
+                'players': {'added': [], 'changed': players, 'removed': removed_players},
+                'bullets': {'added': [], 'changed': bullets, 'removed': removed_bullets},
+            }
+
+        if flags & FLAG_STATIC:
+            width, height = _MAP.unpack_from(body, offset)
+            offset += _MAP.size
+            frame['map'] = {'width': width, 'height': height}
+            frame['obstacles'] = [
+                {'id': oid, 'x': _dx(x), 'y': _dy(y), 'width': _dx(w), 'height': _dy(h)}
+                for oid, x, y, w, h in records(_OBSTACLE)
+            ]
+        return frame
@@ -24,6 +24,9 @@ BULLET_SPEED = 15.0  # unités/seconde
 BULLET_DAMAGE = 10
 BULLET_COOLDOWN = 0.5  # secondes
 MAX_BULLETS_PER_PLAYER = 5
+BULLET_MAX_BOUNCES = 3
+BULLET_LIFETIME = 10.0  # secondes
+BULLET_STORE = "dict"  # "dict" (pool d'objets) ou "numpy" (tableaux, nécessite numpy : plus rapide au-delà de ~1000 balles)
 
 # Respawn
 DEATH_COOLDOWN = 10.0  # secondes
@@ -32,14 +35,52 @@ DEATH_COOLDOWN = 10.0  # secondes
 MOVE_RATE_LIMIT = 0.05  # 50ms minimum entre moves (20/sec)
 SHOOT_RATE_LIMIT = 0.5  # 500ms minimum entre tirs (2/sec)
 INACTIVITY_TIMEOUT = 120.0  # secondes (2 minutes)
+RATE_LIMIT_IP = 100  # requêtes/seconde par IP
+RATE_LIMIT_IP_BURST = 100  # rafale max
+RATE_LIMIT_PLAYER = 50  # requêtes/seconde par player_id (0 = désactivé)
+RATE_LIMIT_PLAYER_BURST = 50
+RATE_LIMIT_MAX_KEYS = 100_000  # clés suivies au plus (LRU)
 
 # Game Engine
 TICK_RATE = 60  # FPS
 TICK_DURATION = 1.0 / TICK_RATE
+MAX_CATCHUP_TICKS = 5  # ticks rattrapés d'affilée avant d'abandonner le retard
+SCHEDULER_SPIN_THRESHOLD = 0.001  # attente active sur la dernière milliseconde
+# Hibernation : sans balle ni changement d'état, le game loop s'endort
+# jusqu'à la prochaine commande (monde vide) ou au plus IDLE_TICK_INTERVAL
+IDLE_AFTER_TICKS = TICK_RATE  # ticks calmes avant de s'endormir (≈ 1s)
+IDLE_TICK_INTERVAL = 1.0  # secondes entre deux ticks avec des joueurs immobiles (kicks d'inactivité)
+
+# Index spatial (spatial hash)
+SPATIAL_CELL_SIZE = 4.0  # côté d'une cellule, en unités de map
 
 # Serveur
 SERVER_PORT = 8000
 MAX_PLAYERS = 100  # limite joueurs simultanés
+MAX_BATCH_ACTIONS = 200  # entrées max par requête /actions
+
+# Rooms (arènes multiples, cf. rooms.py)
+ROOM_WORKERS = 0  # processus workers (0 = nombre de cœurs)
+MAX_ROOMS = 64
+ROOM_ID_PATTERN = r'^[a-zA-Z0-9_-]{1,32}$'
+ROOM_REBALANCE_INTERVAL = 10.0  # secondes entre deux rééquilibrages
+ROOM_REQUEST_TIMEOUT = 5.0  # attente max d'une réponse de worker (secondes)
+
+# Simulation partagée (python simulation.py, cf. simulation.py)
+API_WORKERS = 4  # workers uvicorn qui lisent l'état en mémoire partagée
+SHARED_SNAPSHOT_SIZE = 8 * 1024 * 1024  # octets max d'une publication
+SIMULATION_REQUEST_TIMEOUT = 5.0  # connexion au processus de simulation (secondes)
+SHARED_STATS_INTERVAL = 0.25  # secondes entre deux publications de /stats et /leaderboard
+
+# Flux WebSocket /ws/state
+STREAM_TICK_INTERVAL = 2  # une frame tous les N ticks (30/s à 60 FPS)
+WS_SEND_QUEUE_SIZE = 8  # frames en attente max par connexion avant resynchro
+
+# Vue par joueur /me (zone d'intérêt)
+AOI_RADIUS = 25.0  # rayon par défaut
+AOI_MAX_RADIUS = 50.0
+AOI_CELL_SIZE = 10.0  # cellule des grilles de la vue (plus grosse que SPATIAL_CELL_SIZE)
+AOI_FAR_INTERVAL = 30  # joueurs lointains rafraîchis tous les N ticks (0.5s à 60 FPS)
 
 # Username
 USERNAME_MIN_LENGTH = 3
@@ -48,3 +89,20 @@ USERNAME_PATTERN = r'^[a-zA-Z0-9_]+$'
 
 # Stats persistence
 STATS_FILE = "game_stats.json"
+STATS_FLUSH_INTERVAL = 5.0  # secondes entre deux écritures (modifications regroupées)
+
+# Enregistrement des parties (cf. recording.py, rejeu : python replay.py)
+RECORDING_DIR = None  # dossier des enregistrements (un fichier par moteur), None = désactivé
+RECORDING_CHECK_INTERVAL = TICK_RATE  # ticks entre deux empreintes de l'état (≈ 1s)
+
+# Métriques /metrics (format Prometheus, cf. metrics.py)
+METRICS_TICK_BUCKETS = (0.0005, 0.001, 0.002, 0.004, 0.008, TICK_DURATION, 0.033, 0.066, 0.1, 0.25)  # secondes
+METRICS_PAIR_TESTS_BUCKETS = (10, 100, 1_000, 10_000, 100_000, 1_000_000)  # tests balle/obstacle ou joueur par tick
+METRICS_LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)  # secondes
+
+# Administration (POST /admin/profile, cf. profiler.py)
+ADMIN_TOKEN = None  # jeton attendu dans l'en-tête X-Admin-Token, None = endpoints d'admin désactivés
+PROFILE_DIR = "profiles"  # résultats des captures
+PROFILE_MAX_SECONDS = 60.0
+PROFILE_SAMPLE_INTERVAL = 0.001  # secondes entre deux relevés de pile (mode sampling)
+PROFILE_TRACEMALLOC_FRAMES = 10  # profondeur des piles d'allocation
@@ -8,55 +8,126 @@ import uuid
 import json
 import os
 import math
-from typing import Dict, List, Optional, Tuple
-from entities import Player, Bullet, Obstacle, GameStats
+import itertools
+from collections import deque
+from concurrent.futures import Future
+from typing import Callable, Deque, Dict, List, Optional, Tuple
+from entities import Player, Bullet, Obstacle, GameStats, public_players, public_bullets
+from spatial import SpatialHash, ObstacleGrid
+from bullet_store import BulletPool, ArrayBulletStore
+from scheduler import FixedTimestepScheduler, TickStats, TickClock, VirtualClock
+from snapshot import SnapshotBuilder, StateSnapshot, encode_json
+from stream import StateStream
+from persistence import WriteBehind
+from leaderboard import Leaderboard
+from recording import Recorder
 from physics import (
-    normalize_vector, check_bullet_player_collision,
-    check_bullet_obstacle_collision,
+    normalize_vector, segment_circle_toi, segment_aabb_toi,
     find_valid_spawn_position, is_position_valid, clamp_to_map
 )
 import config
 
 
+def action_result(player_id: str, move: Optional[dict] = None, shoot: Optional[dict] = None) -> dict:
+    """
+    Résultat d'une entrée de /actions, refusée ou appliquée : toujours les
+    mêmes champs (`move`/`shoot` au format de /move et /shoot, None si
+    l'action n'était pas demandée)
+    """
+    return {'player_id': player_id, 'move': move, 'shoot': shoot}
+
+
 class GameEngine:
     """Moteur de jeu - État autoritaire en RAM"""
     
-    def __init__(self):
+    # Commandes appelables par nom (`call`), depuis un autre processus
+    COMMANDS = frozenset({'join_game', 'leave_game', 'player_move', 'player_shoot', 'player_actions'})
+    
+    def __init__(self, stats_file: Optional[str] = config.STATS_FILE, seed: Optional[int] = None,
+                 clock: Callable[[], float] = time.time, obstacle_count: int = config.OBSTACLE_COUNT,
+                 record_dir: Optional[str] = config.RECORDING_DIR):
+        self.stats_file = stats_file  # None : stats non persistées (arènes des rooms, harnais)
+        # Horloge du jeu (cooldowns, durée de vie des balles) ; une
+        # VirtualClock rend le moteur pas à pas (cf. step)
+        self.headless = isinstance(clock, VirtualClock)
+        # Partie enregistrée (game loop seulement) : seed connu, horloge figée par tick
+        recording = record_dir is not None and not self.headless
+        if recording:
+            seed = random.getrandbits(32) if seed is None else seed
+            clock = TickClock(clock)
+        self.clock = clock
+        self.rng = random.Random(seed)  # obstacles et spawns, reproductibles avec `seed`
         self.players: Dict[str, Player] = {}
-        self.bullets: Dict[str, Bullet] = {}
+        self.player_grid = SpatialHash()  # index spatial des joueurs (clé: player_id)
+        self.bullets = BulletPool(clock=clock)  # balles vivantes (handles recyclés)
         self.obstacles: List[Obstacle] = []
+        self.obstacle_index = ObstacleGrid([])  # remplacé par _generate_obstacles
         self.death_cooldowns: Dict[str, float] = {}  # {username: timestamp_mort}
         self.stats = GameStats()
+        self.leaderboard = Leaderboard()  # kills de la session (clé: public_id)
+        self.tournament = None  # classement du tournoi, branché par tournament.py
+        self.exporter = None  # copie de chaque snapshot hors processus, branchée par simulation.py
+        self.recorder: Optional[Recorder] = None  # journal des commandes (cf. recording.py)
+        self._stats_cache: Optional[Tuple[int, dict, bytes]] = None  # (tick, stats, JSON)
+        self._pair_tests = 0  # tests de collision du tick en cours (cf. _sweep_bullet)
+        self.tick = 0  # numéro du tick courant
+        self._public_ids = itertools.count(1)  # handles publics des entités
+        self.tick_stats = TickStats()
+        self.scheduler = FixedTimestepScheduler()
+        # Commandes des clients, exécutées au début du tick suivant (deque :
+        # append/popleft atomiques, pas de verrou)
+        self._commands: Deque[Tuple[Future, Callable, tuple]] = deque()
+        # Hibernation (cf. _hibernate) : ticks consécutifs sans balle ni
+        # changement d'état, réveil du game loop endormi par `submit`
+        self._quiet_ticks = 0
+        self._wake = threading.Event()
+        self.hibernating = False
+        self._asleep_since = 0.0  # perf_counter au début du sommeil en cours
         
         self.running = False
         self.game_thread: Optional[threading.Thread] = None
-        self.start_time = time.time()
+        self.start_time = clock()
         
         # Générer obstacles
-        self._generate_obstacles()
+        self._generate_obstacles(obstacle_count)
+        if recording:
+            self.recorder = Recorder.create(record_dir, seed, clock, obstacle_count, self.obstacles)
+        
+        # Stockage des balles : pool de Bullet, ou tableaux NumPy (optionnel)
+        self.bullet_store: Optional[ArrayBulletStore] = None
+        if config.BULLET_STORE == "numpy":
+            self.bullet_store = ArrayBulletStore(self.obstacles, clock=clock)
         
-        # Charger stats persistantes
+        # Snapshot public publié à chaque tick (obstacles encodés une fois)
+        self.snapshots = SnapshotBuilder(self.obstacles)
+        self.stream = StateStream(self.snapshots.static, self.snapshots.names)
+        self._publish_snapshot()
+        
+        # Charger stats persistantes (sauvegardées en différé, hors game loop)
         self._load_stats()
+        self.stats_writer = WriteBehind(stats_file, lambda: self.stats.to_dict())
         
         print(f"🎮 Game Engine initialisé")
         print(f"   Map: {config.MAP_WIDTH}×{config.MAP_HEIGHT}")
         print(f"   Obstacles: {len(self.obstacles)}")
         print(f"   Tick rate: {config.TICK_RATE} FPS")
+        print(f"   Balles: stockage {config.BULLET_STORE}")
     
-    def _generate_obstacles(self):
+    def _generate_obstacles(self, count: int):
         """Générer obstacles aléatoires au démarrage"""
         spawn_x_min, spawn_x_max, spawn_y_min, spawn_y_max = config.SPAWN_SAFE_ZONE
+        rng = self.rng
         
-        for i in range(config.OBSTACLE_COUNT):
+        for i in range(count):
             # Taille aléatoire
-            width = random.uniform(config.OBSTACLE_MIN_SIZE, config.OBSTACLE_MAX_SIZE)
-            height = random.uniform(config.OBSTACLE_MIN_SIZE, config.OBSTACLE_MAX_SIZE)
+            width = rng.uniform(config.OBSTACLE_MIN_SIZE, config.OBSTACLE_MAX_SIZE)
+            height = rng.uniform(config.OBSTACLE_MIN_SIZE, config.OBSTACLE_MAX_SIZE)
             
             # Position aléatoire
             max_attempts = 50
             for _ in range(max_attempts):
-                x = random.uniform(0, config.MAP_WIDTH - width)
-                y = random.uniform(0, config.MAP_HEIGHT - height)
+                x = rng.uniform(0, config.MAP_WIDTH - width)
+                y = rng.uniform(0, config.MAP_HEIGHT - height)
                 
                 # Éviter la zone de spawn
                 if (spawn_x_min < x + width < spawn_x_max and 
@@ -67,13 +138,16 @@ class GameEngine:
                 self.obstacles.append(Obstacle(i, x, y, width, height))
                 break
         
+        # Les obstacles ne bougent plus : index construit une fois pour toutes
+        self.obstacle_index = ObstacleGrid(self.obstacles)
+        
         print(f"✅ {len(self.obstacles)} obstacles générés")
     
     def _load_stats(self):
         """Charger stats depuis fichier JSON"""
-        if os.path.exists(config.STATS_FILE):
+        if self.stats_file and os.path.exists(self.stats_file):
             try:
-                with open(config.STATS_FILE, 'r') as f:
+                with open(self.stats_file, 'r') as f:
                     data = json.load(f)
                     self.stats = GameStats(**data)
                 print(f"📊 Stats chargées: {self.stats.total_kills_all_time} kills all-time")
@@ -81,19 +155,18 @@ class GameEngine:
                 print(f"⚠️ Erreur chargement stats: {e}")
     
     def _save_stats(self):
-        """Sauvegarder stats dans fichier JSON"""
-        try:
-            with open(config.STATS_FILE, 'w') as f:
-                json.dump(self.stats.to_dict(), f, indent=2)
-        except Exception as e:
-            print(f"⚠️ Erreur sauvegarde stats: {e}")
+        """Marquer les stats à sauvegarder (écrites par le thread du WriteBehind)"""
+        self.stats_writer.mark_dirty()
     
     def start(self):
         """Démarrer le game loop"""
         if self.running:
             return
+        if self.headless:
+            raise RuntimeError("Horloge virtuelle : avancer avec step(), pas de game loop")
         
         self.running = True
+        self.stats_writer.start()
         self.game_thread = threading.Thread(target=self._game_loop, daemon=True)
         self.game_thread.start()
         print("▶️ Game loop démarré")
@@ -104,65 +177,234 @@ class GameEngine:
             return
         
         self.running = False
+        self._wake.set()
         if self.game_thread:
             self.game_thread.join(timeout=2.0)
         
+        # Ne laisser aucun appelant en attente
+        self._drain_commands()
+        if self.recorder is not None:
+            self.recorder.close(self.snapshot)
+        
         # Sauvegarder stats
-        self._save_stats()
+        self.stats_writer.stop()
         print("⏹️ Game loop arrêté")
     
     def _game_loop(self):
-        """Boucle principale - 60 FPS"""
-        while self.running:
-            tick_start = time.time()
-            
+        """Boucle principale - 60 FPS, pas fixe"""
+        self.scheduler.run(self._run_tick, lambda: self.running, self.tick_stats, self._hibernate)
+    
+    def _hibernate(self) -> bool:
+        """
+        Endormir le game loop quand rien ne peut changer sans commande (appelé
+        par le scheduler avant chaque tour). Les joueurs ne bougent que sur
+        commande : sans balle et après IDLE_AFTER_TICKS ticks sans changement,
+        on attend la prochaine commande (`submit` réveille), au plus
+        IDLE_TICK_INTERVAL s'il reste des joueurs à surveiller (inactivité).
+        Vrai si le game loop a dormi : le tick suivant part aussitôt.
+        """
+        if self._quiet_ticks < config.IDLE_AFTER_TICKS or self._commands:
+            return False
+        timeout = config.IDLE_TICK_INTERVAL if self.players else None
+        start = self._asleep_since = time.perf_counter()
+        self.hibernating = True
+        self._wake.clear()
+        # Commande arrivée avant `clear` : déjà en file, on ne dort pas
+        if not self._commands and self.running:
+            self._wake.wait(timeout)
+        self.hibernating = False
+        self.tick_stats.record_hibernation(time.perf_counter() - start)
+        return True
+    
+    def _run_tick(self):
+        """Exécuter un tick en mesurant chaque phase"""
+        stats = self.tick_stats
+        clock = time.perf_counter
+        tick_start = clock()
+        recorder = self.recorder
+        previous = self.snapshot
+        
+        try:
+            if recorder is not None:
+                recorder.begin_tick()
+            for name, phase in (('commands', self._drain_commands),
+                                ('bullets', self._update_bullets),
+                                ('cleanup', self._cleanup),
+                                ('snapshot', self._publish_snapshot)):
+                phase_start = clock()
+                phase()
+                stats.record_phase(name, clock() - phase_start)
+            if recorder is not None:
+                recorder.end_tick(self.tick, self.snapshot)
+        except Exception as e:
+            print(f"❌ Erreur game loop: {e}")
+        self.tick += 1
+        if self.snapshot is previous and not self.bullet_count():
+            self._quiet_ticks += 1
+        else:
+            self._quiet_ticks = 0
+        
+        stats.record_tick(clock() - tick_start)
+    
+    def step(self, ticks: int = 1, dt: float = config.TICK_DURATION):
+        """
+        Exécuter `ticks` ticks immédiatement, sans game loop ni attente
+        (harnais, benchmarks, rejeu). Une VirtualClock avance de `dt` avant
+        chacun : la partie se rejoue à l'identique avec le même `seed` et
+        les mêmes commandes.
+        """
+        if self.running:
+            raise RuntimeError("step() impossible pendant le game loop")
+        for _ in range(ticks):
+            if self.headless:
+                self.clock.advance(dt)
+            self._run_tick()
+    
+    def submit(self, command: Callable, *args) -> Future:
+        """
+        Mettre une commande en file (depuis n'importe quel thread).
+        
+        `command` (ex. `engine.player_move`) s'exécute dans le thread du game
+        loop au début du prochain tick, dans l'ordre d'arrivée ; le Future
+        porte son résultat. Game loop endormi (cf. _hibernate) : réveillé
+        pour un tick immédiat. Game loop arrêté : exécution immédiate, sauf
+        avec une horloge virtuelle (au prochain `step`).
+        """
+        future = Future()
+        self._commands.append((future, command, args))
+        if self.hibernating:
+            self._wake.set()
+        elif not self.running and not self.headless:
+            self._drain_commands()
+        return future
+    
+    def call(self, method: str, *args) -> Future:
+        """`submit` d'une commande désignée par son nom (cf. COMMANDS)"""
+        if method not in self.COMMANDS:
+            raise ValueError(f"Unknown command {method}")
+        return self.submit(getattr(self, method), *args)
+    
+    def _drain_commands(self):
+        """Exécuter les commandes en file (celles arrivées pendant le tick attendront le suivant)"""
+        commands = self._commands
+        for _ in range(len(commands)):
+            try:
+                future, command, args = commands.popleft()
+            except IndexError:
+                break  # vidée par un autre thread (arrêt)
+            if not future.set_running_or_notify_cancel():
+                continue  # appelant parti (client déconnecté)
             try:
-                self._update_physics()
-                self._check_collisions()
-                self._cleanup()
+                future.set_result(command(*args))
             except Exception as e:
-                print(f"❌ Erreur game loop: {e}")
-            
-            # Maintenir tick rate
-            elapsed = time.time() - tick_start
-            sleep_time = max(0, config.TICK_DURATION - elapsed)
-            time.sleep(sleep_time)
+                future.set_exception(e)
     
-    def _update_physics(self):
-        """Mise à jour physique - déplacement des balles"""
+    def _update_bullets(self):
+        """
+        Passe unique sur les balles : déplacement, rebonds et impacts.
+        
+        Chaque balle balaie son segment du tick (tests continus) : le premier
+        contact, obstacle ou joueur, décide entre rebond et impact. Aucune
+        balle ne traverse un joueur ou un mur fin, même à faible tick rate.
+        """
+        if self.bullet_store is not None:
+            self._update_bullets_store()
+            return
+        
         bullets_to_remove = []
+        dt = config.TICK_DURATION
+        now = self.clock()
+        self._pair_tests = 0  # compté par _sweep_bullet
         
-        for bullet_id, bullet in self.bullets.items():
-            # Déplacer balle
-            bullet.x += bullet.vx * config.TICK_DURATION
-            bullet.y += bullet.vy * config.TICK_DURATION
-
-            # Vérifier rebonds sur obstacles
-            for obstacle in self.obstacles:
-                if check_bullet_obstacle_collision(bullet, obstacle):
-                    if bullet.bounces >= 3:
-                        bullets_to_remove.append(bullet_id)
-                        break
-                    self._bounce_bullet_off_obstacle(bullet, obstacle)
-                    bullet.bounces += 1
-                    break
-
-
+        for bullet in self.bullets:
+            if self._sweep_bullet(bullet, dt):
+                bullets_to_remove.append(bullet)
+                continue
             
             # Vérifier limites map
             if (bullet.x < 0 or bullet.x > config.MAP_WIDTH or
                 bullet.y < 0 or bullet.y > config.MAP_HEIGHT):
-                bullets_to_remove.append(bullet_id)
+                bullets_to_remove.append(bullet)
                 continue
             
-            # Lifetime max 10 secondes
-            if time.time() - bullet.created_at > 10:
-                bullets_to_remove.append(bullet_id)
-        
-        # Supprimer balles
-        for bullet_id in bullets_to_remove:
-            del self.bullets[bullet_id]
-
+            # Durée de vie max
+            if now - bullet.created_at > config.BULLET_LIFETIME:
+                bullets_to_remove.append(bullet)
+        
+        # Rendre les balles au pool
+        for bullet in bullets_to_remove:
+            self.bullets.release(bullet)
+        self.tick_stats.record_pair_tests(self._pair_tests)
+    
+    def _sweep_bullet(self, bullet: Bullet, dt: float) -> bool:
+        """
+        Faire avancer une balle de `dt` secondes avec rebonds.
+        Retourne True si la balle doit disparaître (impact ou rebonds épuisés).
+        """
+        bullet_r = config.BULLET_RADIUS
+        hit_r = bullet_r + config.PLAYER_RADIUS
+        remaining = 1.0
+        
+        # Au plus un segment par rebond autorisé, plus le dernier
+        for _ in range(config.BULLET_MAX_BOUNCES + 2):
+            dx = bullet.vx * dt * remaining
+            dy = bullet.vy * dt * remaining
+            mid_x = bullet.x + dx * 0.5
+            mid_y = bullet.y + dy * 0.5
+            reach = math.sqrt(dx * dx + dy * dy) * 0.5
+            
+            # Premier obstacle rencontré sur le segment
+            obs_t, obs_hit = None, None
+            obstacles = self.obstacle_index.query(mid_x, mid_y, reach + bullet_r)
+            tests = len(obstacles)
+            for obs in obstacles:
+                contact = segment_aabb_toi(bullet.x, bullet.y, dx, dy, bullet_r,
+                                           obs.x, obs.y, obs.width, obs.height)
+                if contact and (obs_t is None or contact[0] < obs_t):
+                    obs_t, obs_hit = contact[0], (obs, contact[1], contact[2])
+            
+            # Premier joueur rencontré sur le segment (sauf le tireur)
+            player_t, target = None, None
+            for player in self.player_grid.query(mid_x, mid_y, reach + hit_r):
+                if player.entity_id == bullet.owner_id:
+                    continue
+                tests += 1
+                t = segment_circle_toi(bullet.x, bullet.y, dx, dy, player.x, player.y, hit_r)
+                # À égalité, le plus petit public_id (indépendant de l'ordre de la grille)
+                if t is not None and (player_t is None or t < player_t or
+                                      (t == player_t and player.public_id < target.public_id)):
+                    player_t, target = t, player
+            self._pair_tests += tests
+            
+            if target is not None and (obs_t is None or player_t <= obs_t):
+                # Impact joueur
+                target.health -= bullet.damage
+                if target.health <= 0:
+                    self._handle_player_death(target.entity_id, bullet.owner_id)
+                return True
+            
+            if obs_hit is None:
+                bullet.x += dx
+                bullet.y += dy
+                return False
+            
+            # Rebond sur obstacle
+            if bullet.bounces >= config.BULLET_MAX_BOUNCES:
+                return True
+            obstacle, nx, ny = obs_hit
+            if obs_t == 0.0:
+                self._bounce_bullet_off_obstacle(bullet, obstacle)
+            else:
+                bullet.x += dx * obs_t
+                bullet.y += dy * obs_t
+                dot = bullet.vx * nx + bullet.vy * ny
+                bullet.vx -= 2 * dot * nx
+                bullet.vy -= 2 * dot * ny
+            bullet.bounces += 1
+            remaining *= 1.0 - obs_t
+        
+        return False
+    
     def _bounce_bullet_off_obstacle(self, bullet: Bullet, obstacle: Obstacle):
         """Résoudre collision balle-obstacle puis réfléchir la vitesse."""
         ox, oy = obstacle.x, obstacle.y
@@ -202,42 +444,22 @@ class GameEngine:
                 bullet.x += nx * penetration
                 bullet.y += ny * penetration
 
+        # Réfléchir seulement si la balle se dirige vers l'obstacle
         dot = bullet.vx * nx + bullet.vy * ny
-        bullet.vx -= 2 * dot * nx
-        bullet.vy -= 2 * dot * ny
+        if dot < 0:
+            bullet.vx -= 2 * dot * nx
+            bullet.vy -= 2 * dot * ny
     
-    def _check_collisions(self):
-        """Détection collisions balles-joueurs"""
-        bullets_to_remove = []
-        
-        for bullet_id, bullet in self.bullets.items():
-            hit = False
-            
-            for player_id, player in self.players.items():
-                # Pas se tirer dessus soi-même
-                if bullet.owner_id == player_id:
-                    continue
-                
-                # Check collision
-                if check_bullet_player_collision(bullet, player):
-                    # Appliquer dégâts
-                    player.health -= bullet.damage
-                    
-                    # Mort?
-                    if player.health <= 0:
-                        self._handle_player_death(player_id, bullet.owner_id)
-                    
-                    hit = True
-                    bullets_to_remove.append(bullet_id)
-                    break
-            
-            if hit:
-                continue
-        
-        # Supprimer balles
-        for bullet_id in bullets_to_remove:
-            if bullet_id in self.bullets:
-                del self.bullets[bullet_id]
+    def _update_bullets_store(self):
+        """Passe vectorisée du stockage NumPy, puis dégâts et morts (mêmes règles que `_sweep_bullet`)"""
+        hits = self.bullet_store.step(config.TICK_DURATION, self.players)
+        self.tick_stats.record_pair_tests(self.bullet_store.pair_tests)
+        for player_id, owner_id, damage in hits:
+            # Jamais un joueur déjà tué : le stockage rejoue les balles suivantes sans lui
+            player = self.players[player_id]
+            player.health -= damage
+            if player.health <= 0:
+                self._handle_player_death(player_id, owner_id)
     
     def _handle_player_death(self, player_id: str, killer_id: str):
         """Gérer la mort d'un joueur"""
@@ -249,6 +471,7 @@ class GameEngine:
         killer = self.players.get(killer_id)
         if killer:
             killer.kills += 1
+            self.leaderboard.set(killer.public_id, killer.kills)
         
         # Stats globales
         self.stats.total_kills_all_time += 1
@@ -256,16 +479,16 @@ class GameEngine:
         self._save_stats()
         
         # Cooldown respawn
-        self.death_cooldowns[player.username] = time.time()
+        self.death_cooldowns[player.username] = self.clock()
         
         # Supprimer joueur
-        del self.players[player_id]
+        self._remove_player(player_id)
         
         print(f"💀 {player.username} tué par {killer.username if killer else 'unknown'}")
     
     def _cleanup(self):
         """Nettoyage - joueurs inactifs"""
-        current_time = time.time()
+        current_time = self.clock()
         players_to_remove = []
         
         for player_id, player in self.players.items():
@@ -274,8 +497,7 @@ class GameEngine:
                 players_to_remove.append(player_id)
         
         for player_id in players_to_remove:
-            username = self.players[player_id].username
-            del self.players[player_id]
+            username = self._remove_player(player_id).username
             print(f"⏱️ {username} kick (inactivité)")
         
         # Nettoyer death cooldowns expirés
@@ -284,11 +506,39 @@ class GameEngine:
         for username in expired:
             del self.death_cooldowns[username]
     
+    def _add_player(self, username: str, x: float, y: float) -> Player:
+        """Ajouter un joueur à l'état et aux index (sans vérification)"""
+        current_time = self.clock()
+        # ID secret : jamais tiré de `rng` (prévisible avec un seed)
+        player_id = f"{username}_{uuid.uuid4().hex[:8]}"
+        player = Player(
+            entity_id=player_id,
+            username=username,
+            x=x,
+            y=y,
+            health=config.PLAYER_MAX_HEALTH,
+            last_move=current_time,
+            last_shoot=current_time,
+            last_activity=current_time,
+            public_id=next(self._public_ids)
+        )
+        self.players[player_id] = player
+        self.player_grid.insert(player_id, player, x, y)
+        self.leaderboard.set(player.public_id, 0)
+        return player
+    
+    def _remove_player(self, player_id: str) -> Player:
+        """Retirer un joueur de l'état et des index"""
+        player = self.players.pop(player_id)
+        self.player_grid.remove(player_id)
+        self.leaderboard.remove(player.public_id)
+        return player
+    
     # ==================== API PUBLIQUE ====================
     
     def join_game(self, username: str) -> dict:
         """Un joueur rejoint la partie"""
-        current_time = time.time()
+        current_time = self.clock()
         
         # Vérifier cooldown mort
         if username in self.death_cooldowns:
@@ -306,28 +556,12 @@ class GameEngine:
         if len(self.players) >= config.MAX_PLAYERS:
             return {'success': False, 'error': 'Server full'}
         
-        # Générer ID unique
-        player_id = f"{username}_{uuid.uuid4().hex[:8]}"
-        
         # Trouver position spawn
-        spawn_x, spawn_y = find_valid_spawn_position(
-            self.obstacles, 
-            list(self.players.values())
-        )
-        
-        # Créer joueur
-        player = Player(
-            entity_id=player_id,
-            username=username,
-            x=spawn_x,
-            y=spawn_y,
-            health=config.PLAYER_MAX_HEALTH,
-            last_move=current_time,
-            last_shoot=current_time,
-            last_activity=current_time
-        )
-        
-        self.players[player_id] = player
+        spawn_x, spawn_y = find_valid_spawn_position(self.obstacle_index, self.player_grid, self.rng)
+        player = self._add_player(username, spawn_x, spawn_y)
+        player_id = player.entity_id
+        if self.recorder is not None:
+            self.recorder.join(username)
         
         print(f"✅ {username} rejoint ({player_id}) à ({spawn_x:.1f}, {spawn_y:.1f})")
         
@@ -341,15 +575,16 @@ class GameEngine:
     def leave_game(self, player_id: str) -> dict:
         """Un joueur quitte la partie volontairement"""
         if player_id in self.players:
-            username = self.players[player_id].username
-            del self.players[player_id]
-            print(f"👋 {username} a quitté la partie ({player_id})")
+            player = self._remove_player(player_id)
+            if self.recorder is not None:
+                self.recorder.leave(player.public_id)
+            print(f"👋 {player.username} a quitté la partie ({player_id})")
             return {'success': True}
         return {'success': False, 'error': 'Player not found'}
 
     def player_move(self, player_id: str, direction_x: float, direction_y: float) -> dict:
         """Déplacer un joueur"""
-        current_time = time.time()
+        current_time = self.clock()
         
         # Vérifier joueur existe
         if player_id not in self.players:
@@ -360,13 +595,15 @@ class GameEngine:
         # Rate limiting
         if current_time - player.last_move < config.MOVE_RATE_LIMIT:
             return {'success': False, 'error': 'Move too fast'}
+        if self.recorder is not None:
+            self.recorder.move(player.public_id, direction_x, direction_y)
         
         # Normaliser direction
         norm_x, norm_y = normalize_vector(direction_x, direction_y)
         
         if norm_x == 0 and norm_y == 0:
             # Pas de mouvement
-            player.update_activity()
+            player.update_activity(current_time)
             return {'success': True, 'position': [round(player.x, 2), round(player.y, 2)]}
         
         # Calculer nouvelle position
@@ -378,14 +615,15 @@ class GameEngine:
         new_x, new_y = clamp_to_map(new_x, new_y)
         
         # Vérifier si position valide (pas de collision)
-        if is_position_valid(new_x, new_y, self.obstacles, 
-                            list(self.players.values()), player_id):
+        if is_position_valid(new_x, new_y, self.obstacle_index, 
+                            self.player_grid, player_id):
             player.x = new_x
             player.y = new_y
+            self.player_grid.move(player_id, player, new_x, new_y)
         # Sinon, on reste à l'ancienne position (bloqué)
         
         player.last_move = current_time
-        player.update_activity()
+        player.update_activity(current_time)
         
         return {
             'success': True,
@@ -394,7 +632,7 @@ class GameEngine:
     
     def player_shoot(self, player_id: str, direction_x: float, direction_y: float) -> dict:
         """Tirer une balle"""
-        current_time = time.time()
+        current_time = self.clock()
         
         # Vérifier joueur existe
         if player_id not in self.players:
@@ -413,37 +651,52 @@ class GameEngine:
         if norm_x == 0 and norm_y == 0:
             return {'success': False, 'error': 'Invalid direction'}
         
-        # Vérifier limite balles
-        player_bullets = [b for b in self.bullets.values() if b.owner_id == player_id]
-        if len(player_bullets) >= config.MAX_BULLETS_PER_PLAYER:
+        # Vérifier limite balles (compteur par joueur, O(1))
+        store = self.bullet_store if self.bullet_store is not None else self.bullets
+        owned = store.count_owned(player_id)
+        if owned >= config.MAX_BULLETS_PER_PLAYER:
             return {'success': False, 'error': 'Too many bullets'}
         
-        # Créer balle
-        bullet_id = f"bullet_{uuid.uuid4().hex[:12]}"
-        bullet = Bullet(
-            entity_id=bullet_id,
-            owner_id=player_id,
-            x=player.x,
-            y=player.y,
-            vx=norm_x * config.BULLET_SPEED,
-            vy=norm_y * config.BULLET_SPEED,
-            damage=config.BULLET_DAMAGE
-        )
-        
-        self.bullets[bullet_id] = bullet
+        if self.recorder is not None:
+            self.recorder.shoot(player.public_id, direction_x, direction_y)
         player.last_shoot = current_time
-        player.update_activity()
-        
-        # Stats
+        player.update_activity(current_time)
         self.stats.total_shots_all_time += 1
+        self._save_stats()
         
-        return {'success': True, 'bullet_id': bullet_id}
+        handle = self._spawn_bullet(player_id, player.x, player.y,
+                                    norm_x * config.BULLET_SPEED, norm_y * config.BULLET_SPEED)
+        return {'success': True, 'bullet_id': handle}
+    
+    def _spawn_bullet(self, owner_id: str, x: float, y: float, vx: float, vy: float) -> int:
+        """Activer une balle (sans vérification), retourne son handle public"""
+        if self.bullet_store is not None:
+            return self.bullet_store.spawn(owner_id, x, y, vx, vy, config.BULLET_DAMAGE, next(self._public_ids))
+        # Activer une balle du pool
+        bullet = self.bullets.spawn(owner_id, x, y, vx, vy, config.BULLET_DAMAGE, next(self._public_ids))
+        return bullet.public_id
+    
+    def player_actions(self, actions: List[dict]) -> List[dict]:
+        """
+        Appliquer un lot d'actions `{player_id, move, shoot}` (directions
+        (x, y) ou None) : déplacement puis tir, un résultat par entrée.
+        """
+        results = []
+        for action in actions:
+            player_id = action['player_id']
+            move = shoot = None
+            if action.get('move') is not None:
+                move = self.player_move(player_id, *action['move'])
+            if action.get('shoot') is not None:
+                shoot = self.player_shoot(player_id, *action['shoot'])
+            results.append(action_result(player_id, move, shoot))
+        return results
     
     def get_state(self) -> dict:
         """Récupérer l'état complet du jeu (version publique)"""
         return {
-            'players': [p.to_public_dict() for p in self.players.values()],
-            'bullets': [b.to_public_dict() for b in self.bullets.values()],
+            'players': list(public_players(self.players.values()).values()),
+            'bullets': list(self._public_bullets_by_handle().values()),
             'obstacles': [o.to_dict() for o in self.obstacles],
             'map': {
                 'width': config.MAP_WIDTH,
@@ -451,31 +704,119 @@ class GameEngine:
             }
         }
     
+    def _publish_snapshot(self):
+        """Publier l'état du tick pour /state et le flux /ws/state"""
+        snapshot = self.snapshots.publish(self.tick, public_players(self.players.values()),
+                                          self._public_bullets_by_handle())
+        self.stream.publish(snapshot, self.tick)
+        if self.exporter is not None:
+            self.exporter.publish(snapshot)
+    
+    @property
+    def snapshot(self) -> StateSnapshot:
+        """Dernier snapshot publié (immuable, partageable entre threads)"""
+        return self.snapshots.latest
+    
+    def get_view(self, player_id: str, radius: float, far: bool = False) -> Optional[bytes]:
+        """Vue du joueur depuis le dernier snapshot (JSON encodé), None si inconnu"""
+        player = self.players.get(player_id)
+        if player is None:
+            return None
+        return self.snapshots.view(self.snapshot, player.public_id, radius, far)
+    
+    def _public_bullets_by_handle(self) -> Dict[int, dict]:
+        """Enregistrements publics des balles, par handle public"""
+        if self.bullet_store is not None:
+            return dict(zip(self.bullet_store.handles(), self.bullet_store.to_public_list()))
+        return public_bullets(self.bullets)
+    
+    def bullet_count(self) -> int:
+        """Nombre de balles en vol, quel que soit le stockage"""
+        if self.bullet_store is not None:
+            return len(self.bullet_store)
+        return len(self.bullets)
+    
+    def top_players(self, limit: int = 10) -> List[dict]:
+        """Meilleurs joueurs connectés par kills (classement incrémental)"""
+        records = self.snapshot.players
+        top = []
+        for public_id, _ in self.leaderboard.top(limit):
+            record = records.get(public_id)
+            if record is not None:  # pas encore publié (rejoint pendant ce tick)
+                top.append({
+                    'username': record['username'],
+                    'kills': record['kills'],
+                    'health': record['health']
+                })
+        return top
+    
+    def get_leaderboard(self, limit: int = 10) -> dict:
+        """Classement de la session (et du tournoi s'il est actif)"""
+        result = {
+            'tick': self.tick,
+            'players': [dict(rank=i + 1, **entry) for i, entry in enumerate(self.top_players(limit))]
+        }
+        if self.tournament is not None:
+            result['tournament'] = [
+                {'rank': i + 1, 'username': username, 'kills': s['kills'], 'deaths': s['deaths']}
+                for i, (username, s) in enumerate(self.tournament.standings(limit))
+            ]
+        return result
+    
     def get_stats(self) -> dict:
-        """Récupérer statistiques du jeu"""
-        current_time = time.time()
-        
-        # Top joueurs actuels
-        top_players = sorted(self.players.values(), key=lambda p: p.kills, reverse=True)[:10]
+        """Récupérer statistiques du jeu (calculées au plus une fois par tick)"""
+        return self._cached_stats()[1]
+    
+    def get_stats_json(self) -> bytes:
+        """Statistiques déjà encodées en JSON (pour /stats)"""
+        return self._cached_stats()[2]
+    
+    def _cached_stats(self) -> Tuple[int, dict, bytes]:
+        tick = self.tick
+        cached = self._stats_cache
+        if cached is None or cached[0] != tick or not self.running or self.hibernating:
+            stats = self._build_stats()
+            cached = self._stats_cache = (tick, stats, encode_json(stats))
+        return cached
+    
+    def get_metrics(self) -> dict:
+        """Compteurs et histogrammes pour /metrics (lus sans verrou, cf. metrics.py)"""
+        stats = self.tick_stats
+        return {
+            'tick_seconds': stats.tick_histogram.snapshot(),
+            'phase_seconds': {name: h.snapshot() for name, h in list(stats.phase_histograms.items())},
+            'pair_tests_per_tick': stats.pair_tests_histogram.snapshot(),
+            'ticks': stats.ticks,
+            'overruns': stats.overruns,
+            'catchup_ticks': stats.catchup_ticks,
+            'dropped_ticks': stats.dropped_ticks,
+            'lag_seconds': stats.lag,
+            'pair_tests': stats.pair_tests,
+            'hibernated_seconds': stats.hibernated + (
+                time.perf_counter() - self._asleep_since if self.hibernating else 0.0),
+            'hibernating': int(self.hibernating),
+            'players': len(self.players),
+            'bullets': self.bullet_count(),
+            'obstacles': len(self.obstacles),
+        }
+    
+    def _build_stats(self) -> dict:
+        """Construire les statistiques du jeu"""
+        current_time = self.clock()
         
         return {
             'server': {
                 'uptime_seconds': int(current_time - self.start_time),
-                'tick_rate': config.TICK_RATE
+                'tick_rate': config.TICK_RATE,
+                'tick': self.tick_stats.to_dict()
             },
             'game': {
                 'players_online': len(self.players),
-                'bullets_active': len(self.bullets),
+                'bullets_active': self.bullet_count(),
                 'obstacles_count': len(self.obstacles),
                 'total_kills_all_time': self.stats.total_kills_all_time,
                 'total_deaths_all_time': self.stats.total_deaths_all_time,
                 'total_shots_all_time': self.stats.total_shots_all_time
             },
-            'top_players_current': [
-                {
-                    'username': p.username,
-                    'kills': p.kills,
-                    'health': p.health
-                } for p in top_players
-            ]
+            'top_players_current': self.top_players(10)
         }
@@ -0,0 +1,65 @@
+"""
+Classements - Tenus à jour incrémentalement (pas de tri à la lecture)
+"""
+import bisect
+from typing import Dict, Hashable, List, Tuple
+
+
+class Leaderboard:
+    """
+    Scores par clé, maintenus triés (score décroissant, puis clé).
+
+    Une mise à jour retire l'ancienne entrée et insère la nouvelle par
+    dichotomie ; lire le top K ne coûte que K.
+    """
+
+    def __init__(self):
+        self._scores: Dict[Hashable, int] = {}
+        self._order: List[Tuple[int, Hashable]] = []  # (-score, clé), trié
+
+    def __len__(self) -> int:
+        return len(self._scores)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._scores
+
+    def score(self, key: Hashable) -> int:
+        return self._scores.get(key, 0)
+
+    def set(self, key: Hashable, score: int):
+        """Fixer le score de `key` (l'ajoute si besoin)"""
+        old = self._scores.get(key)
+        if old == score:
+            return
+        if old is not None:
+            self._discard(old, key)
+        self._scores[key] = score
+        bisect.insort(self._order, (-score, key))
+
+    def add(self, key: Hashable, delta: int = 1) -> int:
+        """Ajouter `delta` au score de `key`, retourne le nouveau score"""
+        score = self._scores.get(key, 0) + delta
+        self.set(key, score)
+        return score
+
+    def remove(self, key: Hashable):
+        """Retirer `key` (no-op si absente)"""
+        old = self._scores.pop(key, None)
+        if old is not None:
+            self._discard(old, key)
+
+    def _discard(self, score: int, key: Hashable):
+        order = self._order
+        i = bisect.bisect_left(order, (-score, key))
+        del order[i]
+
+    def top(self, limit: int = 10) -> List[Tuple[Hashable, int]]:
+        """Les `limit` meilleurs (clé, score)"""
+        return [(key, -neg) for neg, key in self._order[:limit]]
+
+    def rank(self, key: Hashable) -> int:
+        """Rang de `key`, à partir de 1 (0 si absente)"""
+        score = self._scores.get(key)
+        if score is None:
+            return 0
+        return bisect.bisect_left(self._order, (-score, key)) + 1
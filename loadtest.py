@@ -0,0 +1,463 @@
+"""
+Test de charge - Essaim de bots HTTP contre un serveur local
+Lancer avec : python loadtest.py --bots 200 --ramp-up 20 --duration 30
+
+Démarre le serveur (uvicorn main:app) sur un port libre de 127.0.0.1,
+dans un dossier temporaire, puis y lâche N bots asyncio : chacun
+rejoint, se déplace au rythme permis, tire, consulte l'état et quitte
+à la fin. Rapporte les latences p50/p95/p99 par endpoint, les taux de
+4xx / 429 / erreurs et la santé des ticks du serveur (/stats), en
+texte et en JSON ; les seuils `--max-*` donnent un code de sortie
+utilisable pour valider une release.
+
+Tous les bots partagent 127.0.0.1 : le serveur lancé ici lève la limite
+par IP (chaque bot représente un client distinct) et MAX_PLAYERS, la
+limite par player_id reste celle de config.py.
+"""
+import argparse
+import asyncio
+import json
+import math
+import os
+import random
+import signal
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from collections import Counter, defaultdict
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+import config
+from benchmark import percentile
+
+LOCAL_HOSTS = {'127.0.0.1', 'localhost', '::1'}
+REQUEST_TIMEOUT = 10.0  # secondes avant de compter une requête en erreur
+
+# Lanceur du serveur : surcharge config avant l'import de main
+SERVER_BOOTSTRAP = """
+import json, sys
+import config
+for name, value in json.loads(sys.argv[1]).items():
+    setattr(config, name, value)
+import uvicorn
+uvicorn.run('main:app', host='127.0.0.1', port=int(sys.argv[2]), log_level='warning')
+"""
+
+
+# ==================== CLIENT HTTP ====================
+
+class HTTPConnection:
+    """Connexion HTTP/1.1 keep-alive minimale : un bot, une connexion, requêtes en série"""
+
+    def __init__(self, host: str, port: int):
+        self.host = host
+        self.port = port
+        self.reader: Optional[asyncio.StreamReader] = None
+        self.writer: Optional[asyncio.StreamWriter] = None
+
+    async def request(self, method: str, path: str, body=None,
+                      headers: Optional[Dict[str, str]] = None) -> Tuple[int, Dict[str, str], bytes]:
+        """(statut, en-têtes en minuscules, corps) ; ferme la connexion sur erreur"""
+        if self.writer is None:
+            self.reader, self.writer = await asyncio.open_connection(self.host, self.port)
+        payload = json.dumps(body).encode() if body is not None else b''
+        lines = [f"{method} {path} HTTP/1.1", f"Host: {self.host}", f"Content-Length: {len(payload)}"]
+        if body is not None:
+            lines.append("Content-Type: application/json")
+        lines.extend(f"{name}: {value}" for name, value in (headers or {}).items())
+        try:
+            self.writer.write(('\r\n'.join(lines) + '\r\n\r\n').encode() + payload)
+            return await self._read_response()
+        except BaseException:
+            self.close()
+            raise
+
+    async def _read_response(self) -> Tuple[int, Dict[str, str], bytes]:
+        reader = self.reader
+        status_line = await reader.readline()
+        if not status_line:
+            raise ConnectionError("connection closed")
+        status = int(status_line.split()[1])
+        headers = {}
+        while True:
+            line = await reader.readline()
+            if line in (b'\r\n', b'\n', b''):
+                break
+            name, _, value = line.decode('latin-1').partition(':')
+            headers[name.strip().lower()] = value.strip()
+
+        if headers.get('transfer-encoding', '').lower() == 'chunked':
+            chunks = []
+            while True:
+                size = int((await reader.readline()).split(b';')[0], 16)
+                chunk = await reader.readexactly(size + 2)  # + CRLF
+                if size == 0:
+                    break
+                chunks.append(chunk[:-2])
+            data = b''.join(chunks)
+        else:
+            data = await reader.readexactly(int(headers.get('content-length', 0)))
+
+        if headers.get('connection', '').lower() == 'close':
+            self.close()
+        return status, headers, data
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+            self.reader = self.writer = None
+
+
+# ==================== MESURES ====================
+
+class Recorder:
+    """Latences et statuts par endpoint, et une chronologie par seconde"""
+
+    def __init__(self):
+        self.start = time.monotonic()
+        self.latencies: Dict[str, List[float]] = defaultdict(list)
+        self.statuses: Dict[str, Counter] = defaultdict(Counter)  # 0 : erreur de transport / timeout
+        self.rejections: Dict[str, Counter] = defaultdict(Counter)  # motifs des 4xx
+        self.timeline: Dict[int, dict] = defaultdict(lambda: {'requests': 0, 'errors': 0, 'latencies': []})
+        self.active_bots = 0
+        self.ticks: List[dict] = []  # relevés de /stats
+
+    def record(self, endpoint: str, status: int, seconds: float):
+        self.latencies[endpoint].append(seconds)
+        self.statuses[endpoint][status] += 1
+        second = self.timeline[int(time.monotonic() - self.start)]
+        second['requests'] += 1
+        second['errors'] += status == 0 or status >= 500
+        second['latencies'].append(seconds)
+        second['bots'] = self.active_bots
+
+
+async def timed(conn: HTTPConnection, recorder: Recorder, endpoint: str, method: str, path: str,
+                body=None, headers=None) -> Tuple[int, Dict[str, str], bytes]:
+    """Requête mesurée ; statut 0 si la connexion échoue ou dépasse REQUEST_TIMEOUT"""
+    start = time.monotonic()
+    try:
+        response = await asyncio.wait_for(conn.request(method, path, body, headers), REQUEST_TIMEOUT)
+    except (OSError, ConnectionError, asyncio.IncompleteReadError, asyncio.TimeoutError, ValueError):
+        conn.close()
+        response = (0, {}, b'')
+    recorder.record(endpoint, response[0], time.monotonic() - start)
+    if 400 <= response[0] < 500:
+        try:
+            detail = json.loads(response[2]).get('detail')
+        except ValueError:
+            detail = None
+        recorder.rejections[endpoint][str(detail or response[0])] += 1
+    return response
+
+
+# ==================== BOTS ====================
+
+async def bot(index: int, host: str, port: int, recorder: Recorder, start_delay: float,
+              stop_at: float, poll_path: str, poll_interval: float, rng: random.Random):
+    """Un client : rejoindre, bouger, tirer, consulter l'état jusqu'à `stop_at`, puis quitter"""
+    await asyncio.sleep(start_delay)
+    conn = HTTPConnection(host, port)
+    username = f"load_{index}"
+    player_id = None
+    etag = None
+    recorder.active_bots += 1
+    loop = asyncio.get_running_loop()
+    next_move = next_shoot = next_poll = next_join = loop.time()
+
+    try:
+        while loop.time() < stop_at:
+            now = loop.time()
+            if player_id is None:
+                if now >= next_join:
+                    status, _, data = await timed(conn, recorder, 'POST /join', 'POST', '/join', {'username': username})
+                    if status == 200:
+                        player_id = json.loads(data)['player_id']
+                        # join arme les deux cooldowns
+                        next_move = loop.time() + config.MOVE_RATE_LIMIT
+                        next_shoot = loop.time() + config.SHOOT_RATE_LIMIT
+                    else:
+                        next_join = now + 1.0  # serveur plein, cooldown de mort...
+                if player_id is None:
+                    await asyncio.sleep(max(0.0, min(next_join, stop_at) - loop.time()))
+                continue
+
+            if now >= next_move:
+                angle = rng.uniform(0, 2 * math.pi)
+                status, _, data = await timed(conn, recorder, 'POST /move', 'POST', '/move', {
+                    'player_id': player_id, 'direction_x': math.cos(angle), 'direction_y': math.sin(angle)})
+                # Compté depuis la réponse : la requête précédente est déjà exécutée,
+                # l'écart vu par le serveur ne descend jamais sous la limite
+                next_move = loop.time() + config.MOVE_RATE_LIMIT
+                if status == 400 and b'Player not found' in data:
+                    player_id = None  # mort : rejoindre après le cooldown
+                    next_join = loop.time() + config.DEATH_COOLDOWN
+                    continue
+            if now >= next_shoot:
+                angle = rng.uniform(0, 2 * math.pi)
+                status, _, data = await timed(conn, recorder, 'POST /shoot', 'POST', '/shoot', {
+                    'player_id': player_id, 'direction_x': math.cos(angle), 'direction_y': math.sin(angle)})
+                next_shoot = loop.time() + config.SHOOT_RATE_LIMIT
+                if status == 400 and b'Player not found' in data:
+                    player_id = None
+                    next_join = loop.time() + config.DEATH_COOLDOWN
+                    continue
+            if now >= next_poll:
+                if poll_path == '/me':
+                    await timed(conn, recorder, 'GET /me', 'GET', f'/me?player_id={player_id}')
+                else:
+                    status, headers, _ = await timed(conn, recorder, 'GET /state', 'GET', '/state',
+                                                     headers={'If-None-Match': etag} if etag else None)
+                    etag = headers.get('etag', etag)
+                next_poll = max(next_poll + poll_interval, now)
+
+            await asyncio.sleep(max(0.0, min(next_move, next_shoot, next_poll) - loop.time()))
+
+        if player_id is not None:
+            await timed(conn, recorder, 'POST /leave', 'POST', '/leave', {'player_id': player_id})
+    finally:
+        recorder.active_bots -= 1
+        conn.close()
+
+
+def start_delays(bots: int, ramp_up: float, steps: int) -> List[float]:
+    """Délai de démarrage de chaque bot : rampe linéaire, par paliers (`steps`), ou tous d'un coup"""
+    if bots == 0 or ramp_up <= 0:
+        return [0.0] * bots
+    if steps <= 0:
+        return [i * ramp_up / bots for i in range(bots)]
+    return [(i * steps // bots) * ramp_up / steps for i in range(bots)]
+
+
+async def watch_ticks(host: str, port: int, recorder: Recorder, stop_at: float, interval: float = 1.0):
+    """Relever la santé des ticks du serveur (/stats) chaque seconde"""
+    conn = HTTPConnection(host, port)
+    loop = asyncio.get_running_loop()
+    while loop.time() < stop_at:
+        try:
+            status, _, data = await asyncio.wait_for(conn.request('GET', '/stats'), REQUEST_TIMEOUT)
+            if status == 200:
+                stats = json.loads(data)
+                recorder.ticks.append(dict(stats['server']['tick'], at=round(time.monotonic() - recorder.start, 1),
+                                           players=stats['game']['players_online'],
+                                           bullets=stats['game']['bullets_active']))
+        except (OSError, ConnectionError, asyncio.IncompleteReadError, asyncio.TimeoutError, ValueError):
+            conn.close()
+        await asyncio.sleep(interval)
+    conn.close()
+
+
+# ==================== SERVEUR LOCAL ====================
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def start_server(port: int, bots: int, log_path: Optional[str]) -> subprocess.Popen:
+    """Lancer main:app dans un dossier temporaire (stats du jeu isolées)"""
+    overrides = {
+        'RATE_LIMIT_IP': 1e9,  # tous les bots viennent de 127.0.0.1
+        'RATE_LIMIT_IP_BURST': 1e9,
+        'MAX_PLAYERS': max(config.MAX_PLAYERS, bots),
+    }
+    env = dict(os.environ, PYTHONPATH=os.path.dirname(os.path.abspath(__file__)))
+    env.pop('BATTLE_ARENA_SIMULATION', None)
+    log = open(log_path, 'w') if log_path else subprocess.DEVNULL
+    return subprocess.Popen([sys.executable, '-c', SERVER_BOOTSTRAP, json.dumps(overrides), str(port)],
+                            cwd=tempfile.mkdtemp(prefix='battle-arena-load-'), env=env,
+                            stdout=log, stderr=subprocess.STDOUT)
+
+
+def wait_healthy(host: str, port: int, timeout: float = 20.0):
+    async def probe():
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            conn = HTTPConnection(host, port)
+            try:
+                status, _, _ = await conn.request('GET', '/health')
+                if status == 200:
+                    return
+            except (OSError, ConnectionError, asyncio.IncompleteReadError):
+                pass
+            finally:
+                conn.close()
+            await asyncio.sleep(0.2)
+        raise RuntimeError(f"Serveur injoignable sur {host}:{port}")
+    asyncio.run(probe())
+
+
+def stop_server(process: subprocess.Popen):
+    process.send_signal(signal.SIGINT)  # arrêt propre (lifespan)
+    try:
+        process.wait(timeout=10.0)
+    except subprocess.TimeoutExpired:
+        process.kill()
+
+
+# ==================== RAPPORT ====================
+
+def summarize(recorder: Recorder, wall_time: float) -> dict:
+    endpoints = {}
+    totals = Counter()
+    for endpoint, latencies in sorted(recorder.latencies.items()):
+        latencies = sorted(latencies)
+        statuses = recorder.statuses[endpoint]
+        count = len(latencies)
+        errors = statuses[0] + sum(n for s, n in statuses.items() if s >= 500)
+        client_errors = sum(n for s, n in statuses.items() if 400 <= s < 500 and s != 429)
+        totals.update(requests=count, errors=errors, rate_limited=statuses[429], client_errors=client_errors)
+        endpoints[endpoint] = {
+            'requests': count,
+            'per_second': round(count / wall_time, 1),
+            'latency_ms': {
+                'p50': round(percentile(latencies, 0.50) * 1000, 2),
+                'p95': round(percentile(latencies, 0.95) * 1000, 2),
+                'p99': round(percentile(latencies, 0.99) * 1000, 2),
+                'max': round(latencies[-1] * 1000, 2),
+            },
+            'statuses': {str(s): n for s, n in sorted(statuses.items())},
+            'rejections': dict(recorder.rejections[endpoint].most_common(5)),
+            'error_rate': round(errors / count, 4),
+            'rate_limited_rate': round(statuses[429] / count, 4),
+            'client_error_rate': round(client_errors / count, 4),
+        }
+
+    ticks = recorder.ticks
+    tick_health = {}
+    if len(ticks) >= 2:
+        first, last = ticks[0], ticks[-1]
+        elapsed = last['at'] - first['at']
+        tick_health = {
+            'tick_rate': round((last['ticks'] - first['ticks']) / elapsed, 1) if elapsed else None,
+            'overruns': last['overruns'] - first['overruns'],
+            'dropped_ticks': last['dropped_ticks'] - first['dropped_ticks'],
+            'max_tick_ms': last['max_tick_ms'],  # depuis le démarrage du serveur
+            'max_lag_ms': max(t['lag_ms'] for t in ticks),
+            'max_players': max(t['players'] for t in ticks),
+            'max_bullets': max(t['bullets'] for t in ticks),
+        }
+
+    requests = max(totals['requests'], 1)
+    timeline = [
+        {'second': second, 'bots': bucket.get('bots', 0), 'requests': bucket['requests'],
+         'errors': bucket['errors'],
+         'p95_ms': round(percentile(sorted(bucket['latencies']), 0.95) * 1000, 2)}
+        for second, bucket in sorted(recorder.timeline.items())
+    ]
+    return {
+        'wall_time_s': round(wall_time, 1),
+        'requests': totals['requests'],
+        'requests_per_second': round(totals['requests'] / wall_time, 1),
+        'error_rate': round(totals['errors'] / requests, 4),
+        'rate_limited_rate': round(totals['rate_limited'] / requests, 4),
+        'client_error_rate': round(totals['client_errors'] / requests, 4),
+        'endpoints': endpoints,
+        'server_ticks': tick_health,
+        'timeline': timeline,
+    }
+
+
+def print_report(summary: dict):
+    print(f"\n📊 {summary['requests']} requêtes en {summary['wall_time_s']}s "
+          f"({summary['requests_per_second']}/s) — erreurs {summary['error_rate']:.2%}, "
+          f"429 {summary['rate_limited_rate']:.2%}, 4xx {summary['client_error_rate']:.2%}")
+    print(f"   {'Endpoint':<14} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'erreurs':>8} {'429':>7} {'4xx':>7}")
+    for endpoint, e in summary['endpoints'].items():
+        lat = e['latency_ms']
+        print(f"   {endpoint:<14} {e['per_second']:>8} {lat['p50']:>8} {lat['p95']:>8} {lat['p99']:>8} "
+              f"{e['error_rate']:>8.2%} {e['rate_limited_rate']:>7.2%} {e['client_error_rate']:>7.2%}")
+    ticks = summary['server_ticks']
+    if ticks:
+        print(f"⏱️ Serveur : {ticks['tick_rate']} ticks/s, tick max {ticks['max_tick_ms']} ms, "
+              f"{ticks['overruns']} dépassements, {ticks['dropped_ticks']} ticks abandonnés, "
+              f"jusqu'à {ticks['max_players']} joueurs / {ticks['max_bullets']} balles")
+
+
+def check_gates(summary: dict, args) -> List[str]:
+    """Seuils non respectés (vide si la release peut passer)"""
+    failures = []
+    if summary['error_rate'] > args.max_error_rate:
+        failures.append(f"taux d'erreur {summary['error_rate']:.2%} > {args.max_error_rate:.2%}")
+    if args.max_p99_ms is not None:
+        for endpoint, e in summary['endpoints'].items():
+            if e['latency_ms']['p99'] > args.max_p99_ms:
+                failures.append(f"{endpoint} p99 {e['latency_ms']['p99']} ms > {args.max_p99_ms} ms")
+    ticks = summary['server_ticks']
+    if args.max_tick_ms is not None and ticks and ticks['max_tick_ms'] > args.max_tick_ms:
+        failures.append(f"tick max {ticks['max_tick_ms']} ms > {args.max_tick_ms} ms")
+    return failures
+
+
+# ==================== LANCEMENT ====================
+
+async def run(host: str, port: int, args) -> Recorder:
+    recorder = Recorder()
+    loop = asyncio.get_running_loop()
+    stop_at = loop.time() + args.ramp_up + args.duration
+    rng = random.Random(args.seed)
+    poll_path = '/me' if args.poll == 'me' else '/state'
+    tasks = [
+        bot(i, host, port, recorder, delay, stop_at, poll_path, args.poll_interval, random.Random(rng.random()))
+        for i, delay in enumerate(start_delays(args.bots, args.ramp_up, args.steps))
+    ]
+    await asyncio.gather(watch_ticks(host, port, recorder, stop_at), *tasks)
+    return recorder
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Test de charge HTTP de Battle Arena (localhost uniquement)")
+    parser.add_argument('--bots', type=int, default=100)
+    parser.add_argument('--ramp-up', type=float, default=10.0, help="secondes pour démarrer tous les bots (0 : d'un coup)")
+    parser.add_argument('--steps', type=int, default=0, help="démarrage par paliers (0 : rampe linéaire)")
+    parser.add_argument('--duration', type=float, default=30.0, help="secondes à pleine charge après la rampe")
+    parser.add_argument('--poll', choices=('state', 'me'), default='state', help="lecture d'état des bots")
+    parser.add_argument('--poll-interval', type=float, default=0.2, help="secondes entre deux lectures d'état")
+    parser.add_argument('--url', help="serveur local déjà lancé (sinon démarré ici)")
+    parser.add_argument('--server-log', help="fichier où écrire la sortie du serveur démarré")
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--output', default='loadtest_results.json', help="fichier JSON des résultats")
+    parser.add_argument('--max-error-rate', type=float, default=0.01, help="erreurs (5xx, transport) tolérées")
+    parser.add_argument('--max-p99-ms', type=float, help="p99 max de chaque endpoint")
+    parser.add_argument('--max-tick-ms', type=float, help="durée max d'un tick serveur")
+    args = parser.parse_args(argv)
+
+    process = None
+    if args.url:
+        url = urlsplit(args.url)
+        host, port = url.hostname, url.port or 80
+        if host not in LOCAL_HOSTS:
+            parser.error("--url doit désigner un serveur local")
+    else:
+        host, port = '127.0.0.1', free_port()
+        process = start_server(port, args.bots, args.server_log)
+
+    try:
+        wait_healthy(host, port)
+        print(f"🤖 {args.bots} bots sur {host}:{port} (rampe {args.ramp_up}s"
+              f"{f' en {args.steps} paliers' if args.steps else ''}, puis {args.duration}s)")
+        start = time.monotonic()
+        recorder = asyncio.run(run(host, port, args))
+        summary = summarize(recorder, time.monotonic() - start)
+    finally:
+        if process is not None:
+            stop_server(process)
+
+    print_report(summary)
+    summary['parameters'] = {k: v for k, v in vars(args).items() if k not in ('output',)}
+    with open(args.output, 'w') as f:
+        json.dump(summary, f, indent=2)
+    print(f"💾 Résultats écrits dans {args.output}")
+
+    failures = check_gates(summary, args)
+    for failure in failures:
+        print(f"❌ {failure}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
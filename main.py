@@ -1,16 +1,26 @@
 """
 API FastAPI - Point d'entrée pour les clients
 """
-from fastapi import FastAPI, HTTPException, Request
+from fastapi import Depends, FastAPI, HTTPException, Query, Request, Response, WebSocket, WebSocketDisconnect
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse
 from pydantic import BaseModel, field_validator
 from contextlib import asynccontextmanager
-from typing import Optional
+from contextvars import ContextVar
+from typing import List, Optional
+import asyncio
 import re
+import secrets
 import time
-from collections import defaultdict
 import config
-from engine import GameEngine
+import profiler
+from engine import GameEngine, action_result
+from metrics import RequestMetrics, render as render_metrics
+from ratelimit import TokenBucketLimiter
+from rooms import RoomManager, RoomError
+from simulation import RemoteRooms, SimulationClient
+from channel import RemoteError
+from codec import FORMATS, FORMAT_JSON, FORMAT_BINARY, MEDIA_TYPE
 
 
 # Modèles de requêtes
@@ -45,32 +55,89 @@ class LeaveRequest(BaseModel):
     player_id: str
 
 
-# Initialiser Game Engine
-game = GameEngine()
+class Direction(BaseModel):
+    direction_x: float
+    direction_y: float
 
-# Rate limiting par IP (simple)
-rate_limit_store = defaultdict(list)  # {ip: [timestamps]}
-GLOBAL_RATE_LIMIT = 100  # requêtes/seconde
-RATE_LIMIT_WINDOW = 1.0  # secondes
 
+class ActionRequest(BaseModel):
+    player_id: str
+    move: Optional[Direction] = None
+    shoot: Optional[Direction] = None
 
-def check_rate_limit(ip: str) -> bool:
-    """Vérifier rate limit global par IP"""
-    current_time = time.time()
-    
-    # Nettoyer vieux timestamps
-    rate_limit_store[ip] = [
-        t for t in rate_limit_store[ip]
-        if current_time - t < RATE_LIMIT_WINDOW
-    ]
-    
-    # Vérifier limite
-    if len(rate_limit_store[ip]) >= GLOBAL_RATE_LIMIT:
-        return False
+
+class CreateRoomRequest(BaseModel):
+    room_id: str
     
-    # Ajouter timestamp
-    rate_limit_store[ip].append(current_time)
-    return True
+    @field_validator('room_id')
+    @classmethod
+    def validate_room_id(cls, v: str) -> str:
+        if not re.match(config.ROOM_ID_PATTERN, v):
+            raise ValueError('Room id must be 1-32 alphanumeric, underscore or dash characters')
+        return v
+
+
+# Arène par défaut : simulation partagée si lancée par simulation.py
+# (plusieurs workers uvicorn), sinon Game Engine dans ce processus
+game = SimulationClient.from_env()
+if game is None:
+    game = GameEngine()
+
+# Arènes supplémentaires, sur des processus workers (démarrés à la première room) ;
+# hébergées par la simulation partagée : les mêmes pour tous les workers uvicorn
+rooms = RemoteRooms(game) if isinstance(game, SimulationClient) else RoomManager()
+
+# Rate limiting par IP (toutes les requêtes) et par player_id (actions, vue),
+# propre à ce processus : sous simulation.py, chaque worker API a ses seaux
+ip_limiter = TokenBucketLimiter(config.RATE_LIMIT_IP, config.RATE_LIMIT_IP_BURST)
+player_limiter = (TokenBucketLimiter(config.RATE_LIMIT_PLAYER, config.RATE_LIMIT_PLAYER_BURST)
+                  if config.RATE_LIMIT_PLAYER else None)
+
+# Latences et statuts par route (écrits par le middleware, dans la boucle asyncio)
+request_metrics = RequestMetrics()
+
+# Refus du rate limit par player_id pendant la requête en cours, comptés par
+# le middleware (seul écrivain de request_metrics) ; constatés aussi dans le
+# threadpool (/me) et dans les lots /actions (réponse 200)
+player_rejections: ContextVar[Optional[List[int]]] = ContextVar('player_rejections', default=None)
+
+
+def check_player_rate_limit(player_id: str) -> bool:
+    """Vérifier rate limit par player_id (toujours vrai si désactivé)"""
+    if player_limiter is None or player_limiter.check(player_id):
+        return True
+    rejections = player_rejections.get()
+    if rejections is not None:
+        rejections[0] += 1
+    return False
+
+
+RATE_LIMIT_ERROR = "Rate limit exceeded"
+
+
+def require_player_rate_limit(player_id: str):
+    if not check_player_rate_limit(player_id):
+        raise HTTPException(status_code=429, detail=RATE_LIMIT_ERROR)
+
+
+def rate_limited() -> dict:
+    """Résultat d'une action refusée par le rate limit, au format de /move et /shoot"""
+    return {'success': False, 'error': RATE_LIMIT_ERROR}
+
+
+async def in_tick(method: str, *args):
+    """Exécuter une commande du moteur au prochain tick et attendre son résultat"""
+    return await asyncio.wrap_future(game.call(method, *args))
+
+
+def negotiate_format(request, fmt: Optional[str]) -> str:
+    """Format demandé via `?format=` ou l'en-tête Accept (JSON par défaut)"""
+    if fmt is None:
+        accept = request.headers.get("accept", "")
+        fmt = FORMAT_BINARY if MEDIA_TYPE in accept else FORMAT_JSON
+    if fmt not in FORMATS:
+        raise HTTPException(status_code=400, detail=f"Unknown format (expected one of {', '.join(FORMATS)})")
+    return fmt
 
 
 # ==================== LIFESPAN ====================
@@ -84,6 +151,7 @@ async def lifespan(app: FastAPI):
     yield
     print("🛑 Arrêt du serveur...")
     game.stop()
+    rooms.stop()
     print("✅ Serveur arrêté proprement")
 
 
@@ -107,15 +175,29 @@ app.add_middleware(
 
 @app.middleware("http")
 async def rate_limit_middleware(request: Request, call_next):
-    """Middleware de rate limiting"""
+    """Middleware de rate limiting et de mesure des requêtes (/metrics)"""
     # Récupérer IP
     ip = request.client.host if request.client else "unknown"
     
-    # Vérifier rate limit
-    if not check_rate_limit(ip):
-        raise HTTPException(status_code=429, detail="Rate limit exceeded")
+    # Vérifier rate limit (une exception levée ici ne deviendrait pas un 429)
+    if not ip_limiter.check(ip):
+        request_metrics.reject("ip")
+        return JSONResponse(status_code=429, content={"detail": RATE_LIMIT_ERROR})
     
-    response = await call_next(request)
+    start = time.perf_counter()
+    status = 500
+    rejections = [0]  # incrémenté par check_player_rate_limit (contexte copié vers l'endpoint)
+    player_rejections.set(rejections)
+    try:
+        response = await call_next(request)
+        status = response.status_code
+    finally:
+        # Route déclarée (/rooms/{room_id}/join), pas le chemin : cardinalité bornée
+        route = request.scope.get("route")
+        request_metrics.observe(request.method, route.path if route else "unmatched",
+                                status, time.perf_counter() - start)
+        if rejections[0]:
+            request_metrics.reject("player", rejections[0])
     return response
 
 
@@ -135,7 +217,7 @@ def root():
 
 
 @app.post("/join")
-def join_game(request: JoinRequest):
+async def join_game(request: JoinRequest):
     """
     Rejoindre la partie
     
@@ -143,7 +225,7 @@ def join_game(request: JoinRequest):
     
     Retourne player_id, position de spawn, et HP
     """
-    result = game.join_game(request.username)
+    result = await in_tick('join_game', request.username)
     
     if not result.get('success', False):
         raise HTTPException(status_code=400, detail=result.get('error'))
@@ -152,13 +234,14 @@ def join_game(request: JoinRequest):
 
 
 @app.post("/leave")
-def leave_game(request: LeaveRequest):
+async def leave_game(request: LeaveRequest):
     """
     Quitter la partie volontairement
     
     - **player_id**: ID du joueur (obtenu via /join)
     """
-    result = game.leave_game(request.player_id)
+    require_player_rate_limit(request.player_id)
+    result = await in_tick('leave_game', request.player_id)
     
     if not result.get('success', False):
         raise HTTPException(status_code=400, detail=result.get('error'))
@@ -167,7 +250,7 @@ def leave_game(request: LeaveRequest):
 
 
 @app.post("/move")
-def move_player(request: MoveRequest):
+async def move_player(request: MoveRequest):
     """
     Déplacer son joueur
     
@@ -178,7 +261,8 @@ def move_player(request: MoveRequest):
     Le vecteur est automatiquement normalisé côté serveur.
     Retourne la nouvelle position.
     """
-    result = game.player_move(request.player_id, request.direction_x, request.direction_y)
+    require_player_rate_limit(request.player_id)
+    result = await in_tick('player_move', request.player_id, request.direction_x, request.direction_y)
     
     if not result.get('success', False):
         raise HTTPException(status_code=400, detail=result.get('error'))
@@ -187,7 +271,7 @@ def move_player(request: MoveRequest):
 
 
 @app.post("/shoot")
-def shoot(request: ShootRequest):
+async def shoot(request: ShootRequest):
     """
     Tirer une balle
     
@@ -198,7 +282,8 @@ def shoot(request: ShootRequest):
     Cooldown: 0.5 secondes entre tirs
     Max 5 balles simultanées par joueur
     """
-    result = game.player_shoot(request.player_id, request.direction_x, request.direction_y)
+    require_player_rate_limit(request.player_id)
+    result = await in_tick('player_shoot', request.player_id, request.direction_x, request.direction_y)
     
     if not result.get('success', False):
         raise HTTPException(status_code=400, detail=result.get('error'))
@@ -206,8 +291,49 @@ def shoot(request: ShootRequest):
     return result
 
 
+@app.post("/actions")
+async def batch_actions(actions: List[ActionRequest]):
+    """
+    Appliquer les actions de plusieurs joueurs en une requête
+    
+    Corps : liste de `{player_id, move?, shoot?}`, `move` et `shoot` étant
+    des directions `{direction_x, direction_y}` (max 200 entrées).
+    Pour chaque entrée, le déplacement est appliqué avant le tir.
+    
+    Retourne un résultat par entrée, dans l'ordre, au format de /move et
+    /shoot : une action refusée n'empêche pas les suivantes.
+    """
+    return await run_actions(actions, lambda entries: in_tick('player_actions', entries))
+
+
+async def run_actions(actions: List[ActionRequest], apply) -> dict:
+    """Valider un lot d'actions, l'appliquer via `apply(entries)` et fusionner les résultats"""
+    if len(actions) > config.MAX_BATCH_ACTIONS:
+        raise HTTPException(status_code=400, detail=f'Too many actions (max {config.MAX_BATCH_ACTIONS})')
+    
+    # Rate limit par joueur : une entrée limitée est refusée seule
+    allowed = [check_player_rate_limit(action.player_id) for action in actions]
+    applied = iter(await apply([
+        {
+            'player_id': action.player_id,
+            'move': (action.move.direction_x, action.move.direction_y) if action.move else None,
+            'shoot': (action.shoot.direction_x, action.shoot.direction_y) if action.shoot else None
+        } for action, ok in zip(actions, allowed) if ok
+    ]))
+    # Entrée limitée : chaque action demandée refusée comme le ferait un 429
+    results = [
+        next(applied) if ok else
+        action_result(action.player_id,
+                      move=rate_limited() if action.move else None,
+                      shoot=rate_limited() if action.shoot else None)
+        for action, ok in zip(actions, allowed)
+    ]
+    
+    return {'success': True, 'results': results}
+
+
 @app.get("/state")
-def get_game_state():
+def get_game_state(request: Request, fmt: Optional[str] = Query(None, alias="format")):
     """
     Récupérer l'état complet du jeu
     
@@ -218,8 +344,89 @@ def get_game_state():
     - Dimensions de la map
     
     Utilisé pour observer le jeu ou développer un client.
+    Servi depuis le snapshot du dernier tick ; l'en-tête ETag permet de
+    renvoyer If-None-Match et d'obtenir un 304 si rien n'a changé.
+    
+    - **format**: `json` (défaut), `binary` ou `binary-deflate` (cf. codec.py) ;
+      `Accept: application/x-battle-arena` vaut `binary`
+    """
+    fmt = negotiate_format(request, fmt)
+    snapshot = game.snapshot
+    headers = {"ETag": snapshot.etag, "Vary": "Accept"}
+    if snapshot.matches(request.headers.get("if-none-match")):
+        return Response(status_code=304, headers=headers)
+    if fmt == FORMAT_JSON:
+        return Response(content=snapshot.body, media_type="application/json", headers=headers)
+    return Response(content=game.snapshots.binary(snapshot, fmt), media_type=MEDIA_TYPE, headers=headers)
+
+
+@app.get("/me")
+def get_my_view(player_id: str,
+                radius: float = Query(config.AOI_RADIUS, gt=0, le=config.AOI_MAX_RADIUS),
+                far: bool = False):
+    """
+    Vue de son joueur (zone d'intérêt)
+    
+    - **player_id**: ID du joueur
+    - **radius**: Rayon de la zone d'intérêt (défaut 25, max 50)
+    - **far**: Ajouter tous les joueurs de la map, rafraîchis moins souvent
+    
+    Retourne son état (`me`) puis seulement les joueurs et balles proches,
+    avec leur `id` public : bien moins cher que /state pour un bot.
+    """
+    require_player_rate_limit(player_id)
+    body = game.get_view(player_id, radius, far)
+    
+    if body is None:
+        raise HTTPException(status_code=400, detail='Player not found')
+    
+    return Response(content=body, media_type="application/json")
+
+
+@app.websocket("/ws/state")
+async def stream_state(websocket: WebSocket, fmt: Optional[str] = Query(None, alias="format")):
+    """
+    Flux de l'état du jeu en temps réel
+    
+    Envoie une keyframe (joueurs, balles, obstacles, map) puis un delta par
+    frame : entités `added` / `changed` / `removed` identifiées par un `id`
+    public (jamais le player_id). Les obstacles ne sont envoyés qu'une fois.
+    Un client trop lent perd les frames en retard et reçoit une nouvelle
+    keyframe (sans obstacles).
+    
+    - **format**: `json` (défaut, frames texte), `binary` ou `binary-deflate`
+      (frames binaires, cf. codec.py)
     """
-    return game.get_state()
+    fmt = fmt or FORMAT_JSON
+    if fmt not in FORMATS:
+        await websocket.close(code=1003)
+        return
+    await websocket.accept()
+    subscriber = game.stream.subscribe(asyncio.get_running_loop(), game.snapshot, fmt)
+    
+    async def drain_incoming():
+        # Détecter la déconnexion (le client n'envoie rien d'utile)
+        while True:
+            await websocket.receive_text()
+    
+    reader = asyncio.create_task(drain_incoming())
+    try:
+        while True:
+            getter = asyncio.ensure_future(subscriber.queue.get())
+            done, _ = await asyncio.wait({getter, reader}, return_when=asyncio.FIRST_COMPLETED)
+            if reader in done:
+                getter.cancel()
+                break
+            frame = getter.result()
+            if fmt == FORMAT_JSON:
+                await websocket.send_text(frame.decode())
+            else:
+                await websocket.send_bytes(frame)
+    except (WebSocketDisconnect, RuntimeError):
+        pass
+    finally:
+        reader.cancel()
+        game.stream.unsubscribe(subscriber)
 
 
 @app.get("/stats")
@@ -231,9 +438,144 @@ def get_stats():
     - Stats serveur (uptime, tick rate)
     - Stats jeu (joueurs, balles, kills all-time)
     - Top 10 joueurs actuels (par kills)
+    
+    Calculées au plus une fois par tick, quel que soit le nombre de clients.
+    """
+    return Response(content=game.get_stats_json(), media_type="application/json")
+
+
+@app.get("/leaderboard")
+def get_leaderboard(limit: int = Query(10, ge=1, le=100)):
+    """
+    Classement des joueurs connectés par kills
+    
+    - **limit**: Nombre d'entrées (1-100, défaut 10)
+    
+    Tenu à jour à chaque kill, join et départ : aucun tri à la requête.
+    En mode tournoi, ajoute le classement du tournoi (`tournament`).
+    """
+    return game.get_leaderboard(limit)
+
+
+# ==================== ROOMS ====================
+
+async def in_room(room_id: str, method: str, *args):
+    """Exécuter une commande dans une room (sur son worker) et attendre le résultat"""
+    # KeyError : levée tout de suite en local, au résultat via la simulation partagée
+    try:
+        return await asyncio.wrap_future(rooms.call(room_id, method, *args))
+    except KeyError:
+        raise HTTPException(status_code=404, detail='Room not found')
+    except RoomError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+def room_result(result: dict) -> dict:
+    if not result.get('success', False):
+        raise HTTPException(status_code=400, detail=result.get('error'))
+    return result
+
+
+@app.get("/rooms")
+def list_rooms():
     """
-    return game.get_stats()
+    Lister les rooms (arènes supplémentaires)
+    
+    Retourne l'id, le nombre de joueurs (dernier relevé) et le worker de chaque room.
+    """
+    return {'rooms': rooms.rooms()}
+
 
+@app.post("/rooms")
+def create_room(request: CreateRoomRequest):
+    """
+    Créer une room
+    
+    - **room_id**: Nom de la room (1-32 caractères alphanumériques, `_` ou `-`)
+    
+    La room est placée sur le processus worker le moins chargé.
+    """
+    try:
+        rooms.create(request.room_id)
+    except RoomError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {'success': True, 'room_id': request.room_id}
+
+
+@app.delete("/rooms/{room_id}")
+def close_room(room_id: str):
+    """Fermer une room (seulement si elle est vide)"""
+    try:
+        closed = rooms.close(room_id)
+    except KeyError:
+        raise HTTPException(status_code=404, detail='Room not found')
+    if not closed:
+        raise HTTPException(status_code=400, detail='Room is not empty')
+    return {'success': True}
+
+
+@app.post("/rooms/{room_id}/join")
+async def join_room(room_id: str, request: JoinRequest):
+    """Rejoindre une room (mêmes règles que /join)"""
+    return room_result(await in_room(room_id, 'join_game', request.username))
+
+
+@app.post("/rooms/{room_id}/leave")
+async def leave_room(room_id: str, request: LeaveRequest):
+    """Quitter une room"""
+    require_player_rate_limit(request.player_id)
+    return room_result(await in_room(room_id, 'leave_game', request.player_id))
+
+
+@app.post("/rooms/{room_id}/move")
+async def move_in_room(room_id: str, request: MoveRequest):
+    """Déplacer son joueur dans une room (cf. /move)"""
+    require_player_rate_limit(request.player_id)
+    return room_result(await in_room(room_id, 'player_move', request.player_id,
+                                     request.direction_x, request.direction_y))
+
+
+@app.post("/rooms/{room_id}/shoot")
+async def shoot_in_room(room_id: str, request: ShootRequest):
+    """Tirer dans une room (cf. /shoot)"""
+    require_player_rate_limit(request.player_id)
+    return room_result(await in_room(room_id, 'player_shoot', request.player_id,
+                                     request.direction_x, request.direction_y))
+
+
+@app.post("/rooms/{room_id}/actions")
+async def room_actions(room_id: str, actions: List[ActionRequest]):
+    """Lot d'actions dans une room (cf. /actions)"""
+    return await run_actions(actions, lambda entries: in_room(room_id, 'player_actions', entries))
+
+
+@app.get("/rooms/{room_id}/state")
+async def room_state(room_id: str, request: Request):
+    """État d'une room (format JSON de /state, avec ETag)"""
+    try:
+        etag, body = await asyncio.wrap_future(rooms.state(room_id, request.headers.get("if-none-match")))
+    except KeyError:
+        raise HTTPException(status_code=404, detail='Room not found')
+    except RoomError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if body is None:
+        return Response(status_code=304, headers={"ETag": etag})
+    return Response(content=body, media_type="application/json", headers={"ETag": etag})
+
+
+@app.get("/rooms/{room_id}/stats")
+async def room_stats(room_id: str):
+    """Statistiques d'une room (format de /stats)"""
+    try:
+        body = await asyncio.wrap_future(rooms.stats(room_id))
+    except KeyError:
+        raise HTTPException(status_code=404, detail='Room not found')
+    except RoomError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return Response(content=body, media_type="application/json")
+
+
+# ==================== MONITORING ====================
 
 @app.get("/health")
 def health_check():
@@ -241,6 +583,90 @@ def health_check():
     return {"status": "healthy", "game_running": game.running}
 
 
+@app.get("/metrics")
+def get_metrics():
+    """
+    Métriques au format Prometheus
+    
+    - Par arène (label `arena` : `main`, `room/<id>`) : histogrammes des
+      durées de tick et de chaque phase, tests de collision par tick,
+      dépassements et retard du game loop, joueurs, balles, obstacles
+    - Par route : histogramme des latences, réponses par statut, refus 429
+    """
+    arenas = {"main": game.get_metrics()}
+    arenas.update((f"room/{room_id}", m) for room_id, m in rooms.metrics().items())
+    return Response(content=render_metrics(arenas, request_metrics),
+                    media_type="text/plain; version=0.0.4")
+
+
+# ==================== ADMIN ====================
+
+class ProfileRequest(BaseModel):
+    mode: str = "sampling"
+    seconds: float = 10.0
+    top: int = 20
+    tracemalloc: bool = False
+    room_id: Optional[str] = None  # None : arène principale
+    
+    @field_validator('mode')
+    @classmethod
+    def validate_mode(cls, v: str) -> str:
+        if v not in profiler.MODES:
+            raise ValueError(f"Mode must be one of {', '.join(profiler.MODES)}")
+        return v
+    
+    @field_validator('seconds')
+    @classmethod
+    def validate_seconds(cls, v: float) -> float:
+        if not 0 < v <= config.PROFILE_MAX_SECONDS:
+            raise ValueError(f'Duration must be between 0 and {config.PROFILE_MAX_SECONDS} seconds')
+        return v
+    
+    @field_validator('top')
+    @classmethod
+    def validate_top(cls, v: int) -> int:
+        if not 1 <= v <= 200:
+            raise ValueError('Top must be between 1 and 200')
+        return v
+
+
+def require_admin(request: Request):
+    """Endpoints d'admin : introuvables sans ADMIN_TOKEN, refusés sans le bon jeton (avant validation du corps)"""
+    if config.ADMIN_TOKEN is None:
+        raise HTTPException(status_code=404, detail="Not Found")
+    token = request.headers.get("x-admin-token", "")
+    if not secrets.compare_digest(token.encode(), config.ADMIN_TOKEN.encode()):
+        raise HTTPException(status_code=403, detail="Invalid admin token")
+
+
+@app.post("/admin/profile", dependencies=[Depends(require_admin)])
+async def profile_game_loop(body: ProfileRequest):
+    """
+    Profiler le game loop pendant `seconds` secondes (en-tête X-Admin-Token)
+    
+    - **mode**: `sampling` (relevés de pile, sans toucher au game loop) ou `cprofile`
+    - **tracemalloc**: ajouter les allocations encore vivantes en fin de capture
+    - **room_id**: room à profiler (arène principale par défaut)
+    
+    Le résultat complet est écrit dans PROFILE_DIR (machine qui fait
+    tourner l'arène) ; la réponse en résume les `top` premières entrées.
+    Une capture à la fois par processus (409 sinon).
+    """
+    options = {"mode": body.mode, "seconds": body.seconds, "top": body.top, "trace_memory": body.tracemalloc}
+    try:
+        if body.room_id is not None:
+            future = rooms.profile(body.room_id, dict(options, label=f"room/{body.room_id}"))
+        elif isinstance(game, SimulationClient):
+            future = game.profile(options)
+        else:
+            return await asyncio.to_thread(profiler.capture, game, **options)
+        return await asyncio.wrap_future(future)
+    except KeyError:
+        raise HTTPException(status_code=404, detail='Room not found')
+    except (profiler.ProfilerError, RemoteError) as e:
+        raise HTTPException(status_code=409, detail=str(e))
+
+
 # Point d'entrée pour uvicorn
 if __name__ == "__main__":
     import uvicorn
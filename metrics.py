@@ -0,0 +1,148 @@
+"""
+Métriques - Compteurs, histogrammes et export au format Prometheus (/metrics)
+
+Chaque compteur n'a qu'un thread écrivain (le game loop pour les ticks,
+la boucle asyncio de l'API pour les requêtes) : pas de verrou sur le
+chemin critique. Les lecteurs copient les valeurs ; une lecture pendant
+une écriture peut manquer la dernière observation, jamais corrompre.
+"""
+import os
+from bisect import bisect_left
+from typing import Dict, Iterable, List, Sequence, Tuple
+
+import config
+
+PREFIX = "battle_arena_"
+
+HistogramData = Tuple[Tuple[float, ...], List[int], float]  # (bornes, comptes par seau, somme)
+
+
+class Histogram:
+    """Histogramme à seaux fixes (`le` Prometheus : valeur <= borne)"""
+    __slots__ = ('bounds', 'counts', 'sum')
+
+    def __init__(self, bounds: Sequence[float]):
+        self.bounds = tuple(bounds)
+        self.counts = [0] * (len(self.bounds) + 1)  # dernier seau : +Inf
+        self.sum = 0.0
+
+    def observe(self, value: float):
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.sum += value
+
+    def snapshot(self) -> HistogramData:
+        return self.bounds, list(self.counts), self.sum
+
+
+class RequestMetrics:
+    """Latences et statuts des requêtes HTTP par route, refus du rate limiting"""
+
+    def __init__(self, buckets: Sequence[float] = config.METRICS_LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.latency: Dict[Tuple[str, str], Histogram] = {}  # {(méthode, route): histogramme}
+        self.responses: Dict[Tuple[str, str, int], int] = {}  # {(méthode, route, statut): nombre}
+        self.rate_limited: Dict[str, int] = {}  # {limiteur: refus}
+
+    def observe(self, method: str, route: str, status: int, seconds: float):
+        key = (method, route)
+        histogram = self.latency.get(key)
+        if histogram is None:
+            histogram = self.latency[key] = Histogram(self.buckets)
+        histogram.observe(seconds)
+        key = (method, route, status)
+        self.responses[key] = self.responses.get(key, 0) + 1
+
+    def reject(self, limiter: str, count: int = 1):
+        self.rate_limited[limiter] = self.rate_limited.get(limiter, 0) + count
+
+
+# ==================== FORMAT TEXTE ====================
+
+def _escape(value) -> str:
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(labels: Dict[str, object]) -> str:
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{k}="{_escape(v)}"' for k, v in labels.items()) + '}'
+
+
+def _family(lines: List[str], name: str, kind: str, help_text: str):
+    lines.append(f"# HELP {PREFIX}{name} {help_text}")
+    lines.append(f"# TYPE {PREFIX}{name} {kind}")
+
+
+def _samples(lines: List[str], name: str, samples: Iterable[Tuple[Dict[str, object], float]]):
+    for labels, value in samples:
+        lines.append(f"{PREFIX}{name}{_labels(labels)} {value}")
+
+
+def _histogram(lines: List[str], name: str, labels: Dict[str, object], data: HistogramData):
+    bounds, counts, total = data
+    cumulative = 0
+    for bound, count in zip(bounds, counts):
+        cumulative += count
+        lines.append(f"{PREFIX}{name}_bucket{_labels(dict(labels, le=bound))} {cumulative}")
+    cumulative += counts[-1]
+    lines.append(f"{PREFIX}{name}_bucket{_labels(dict(labels, le='+Inf'))} {cumulative}")
+    lines.append(f"{PREFIX}{name}_sum{_labels(labels)} {total}")
+    lines.append(f"{PREFIX}{name}_count{_labels(labels)} {cumulative}")
+
+
+# Valeurs simples de GameEngine.get_metrics : (clé, nom, type, description)
+ARENA_VALUES = [
+    ('ticks', 'ticks_total', 'counter', "Ticks exécutés"),
+    ('overruns', 'tick_overruns_total', 'counter', "Ticks plus longs que TICK_DURATION"),
+    ('catchup_ticks', 'tick_catchup_total', 'counter', "Ticks exécutés en rattrapage"),
+    ('dropped_ticks', 'ticks_dropped_total', 'counter', "Ticks abandonnés (retard > MAX_CATCHUP_TICKS)"),
+    ('lag_seconds', 'tick_lag_seconds', 'gauge', "Retard courant de la simulation sur le temps réel"),
+    ('pair_tests', 'collision_tests_total', 'counter', "Tests de collision balle/obstacle ou joueur"),
+    ('hibernated_seconds', 'hibernated_seconds_total', 'counter', "Temps passé endormi (monde vide ou immobile)"),
+    ('hibernating', 'hibernating', 'gauge', "1 si le game loop est endormi"),
+    ('players', 'players', 'gauge', "Joueurs connectés"),
+    ('bullets', 'bullets', 'gauge', "Balles en vol"),
+    ('obstacles', 'obstacles', 'gauge', "Obstacles"),
+]
+
+
+def render(arenas: Dict[str, dict], requests: RequestMetrics) -> str:
+    """Texte Prometheus : métriques de chaque arène (label `arena`) et des requêtes"""
+    lines: List[str] = []
+
+    _family(lines, 'tick_duration_seconds', 'histogram', "Durée d'un tick")
+    for arena, m in arenas.items():
+        _histogram(lines, 'tick_duration_seconds', {'arena': arena}, m['tick_seconds'])
+
+    _family(lines, 'tick_phase_duration_seconds', 'histogram', "Durée de chaque phase du tick")
+    for arena, m in arenas.items():
+        for phase, data in m['phase_seconds'].items():
+            _histogram(lines, 'tick_phase_duration_seconds', {'arena': arena, 'phase': phase}, data)
+
+    _family(lines, 'collision_tests_per_tick', 'histogram', "Tests de collision par tick")
+    for arena, m in arenas.items():
+        _histogram(lines, 'collision_tests_per_tick', {'arena': arena}, m['pair_tests_per_tick'])
+
+    for key, name, kind, help_text in ARENA_VALUES:
+        _family(lines, name, kind, help_text)
+        _samples(lines, name, (({'arena': arena}, m[key]) for arena, m in arenas.items()))
+
+    # Chaque worker uvicorn a ses propres compteurs de requêtes
+    worker = os.getpid()
+    _family(lines, 'http_request_duration_seconds', 'histogram', "Latence des requêtes HTTP par route")
+    for (method, route), histogram in list(requests.latency.items()):
+        _histogram(lines, 'http_request_duration_seconds',
+                   {'method': method, 'route': route, 'worker': worker}, histogram.snapshot())
+
+    _family(lines, 'http_requests_total', 'counter', "Réponses HTTP par route et statut")
+    _samples(lines, 'http_requests_total', (
+        ({'method': method, 'route': route, 'status': status, 'worker': worker}, count)
+        for (method, route, status), count in list(requests.responses.items())
+    ))
+
+    _family(lines, 'http_rate_limited_total', 'counter', "Refus du rate limiting par limiteur (requêtes en 429, entrées de /actions)")
+    _samples(lines, 'http_rate_limited_total', (
+        ({'limiter': limiter, 'worker': worker}, count) for limiter, count in list(requests.rate_limited.items())
+    ))
+
+    return '\n'.join(lines) + '\n'
@@ -0,0 +1,211 @@
+"""
+Persistance - Écritures JSON atomiques et différées (write-behind)
+"""
+import json
+import os
+import threading
+from typing import Callable, List, Optional, Tuple
+
+import config
+
+
+def atomic_write_json(path: str, data, indent: Optional[int] = 2):
+    """Écrire `data` dans un fichier temporaire puis le renommer (jamais de fichier tronqué)"""
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump(data, f, indent=indent)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+class WriteBehind:
+    """
+    Sauvegarde différée d'un état JSON.
+
+    Le chemin critique (game loop) se contente de `mark_dirty()` ; un
+    thread d'arrière-plan regroupe les modifications et réécrit le fichier
+    au plus une fois par `interval`, ainsi qu'à l'arrêt (`stop`). Sans
+    `path`, rien n'est écrit.
+    """
+
+    def __init__(self, path: Optional[str], collect: Callable[[], dict],
+                 interval: float = config.STATS_FLUSH_INTERVAL, name: str = "stats",
+                 written: Optional[Callable[[], None]] = None):
+        self.path = path
+        self.collect = collect  # appelé dans le thread d'écriture
+        self.written = written  # appelé dans le thread d'écriture après chaque écriture réussie
+        self.interval = interval
+        self.name = name
+        self._dirty = False
+        self._stop = threading.Event()
+        self._write_lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+
+    def mark_dirty(self):
+        """Signaler une modification (O(1), sans I/O)"""
+        self._dirty = True
+
+    def start(self):
+        if self._thread is not None or self.path is None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name=f"{self.name}-writer", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Arrêter le thread et écrire les dernières modifications"""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=2.0)
+            self._thread = None
+        self.flush()
+
+    def flush(self):
+        """Écrire maintenant si des modifications sont en attente"""
+        with self._write_lock:
+            if not self._dirty or self.path is None:
+                return
+            # Remis à zéro avant la collecte : une modification pendant
+            # l'écriture sera reprise au prochain passage
+            self._dirty = False
+            try:
+                atomic_write_json(self.path, self.collect())
+            except Exception as e:
+                self._dirty = True
+                print(f"⚠️ Erreur sauvegarde {self.name}: {e}")
+                return
+            if self.written is not None:
+                self.written()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.flush()
+
+
+class JournalError(Exception):
+    """Snapshot illisible : refus de repartir d'un état vide"""
+
+
+class Journal:
+    """
+    Journal append-only (une ligne JSON par événement) et son snapshot.
+
+    Chaque événement reçoit un numéro de séquence. `compact` scelle le
+    journal (renommé en `<path>.sealed`, un nouveau est ouvert) et confie
+    l'état à un thread d'écriture (WriteBehind) : le snapshot est écrit,
+    atomique avec le dernier numéro, puis le journal scellé supprimé. Le
+    thread appelant (game loop) ne fait ni écriture complète ni fsync. Au
+    redémarrage, `load` rejoue seulement les événements postérieurs au
+    snapshot, même après un arrêt brutal entre deux étapes. Une dernière
+    ligne tronquée (crash pendant l'écriture) est ignorée ; un snapshot
+    illisible lève JournalError.
+    """
+
+    def __init__(self, path: str, snapshot_path: str, interval: float = 0.1):
+        self.path = path
+        self.snapshot_path = snapshot_path
+        self.sealed_path = f"{path}.sealed"  # journal en cours de compaction
+        self.seq = 0
+        self.pending = 0  # événements depuis le dernier scellement
+        self._file = None
+        self._snapshot: Optional[dict] = None  # {'seq', 'state'} à écrire
+        self._compacting = False  # journal scellé pas encore remplacé par le snapshot
+        self.writer = WriteBehind(snapshot_path, lambda: self._snapshot, interval=interval,
+                                  name="journal", written=self._compacted)
+
+    def load(self) -> Tuple[dict, List[dict]]:
+        """(état du snapshot, événements à rejouer) ; ouvre le journal en ajout"""
+        state, seq = {}, 0
+        if os.path.exists(self.snapshot_path):
+            try:
+                with open(self.snapshot_path, 'r') as f:
+                    data = json.load(f)
+                if 'seq' in data and 'state' in data:
+                    state, seq = data['state'], data['seq']
+                else:
+                    state = data  # ancien format : état seul
+            except Exception as e:
+                # Repartir de {} perdrait tout ce qui précède le journal
+                raise JournalError(f"Unreadable snapshot {self.snapshot_path} ({e}): "
+                                   f"fix or remove it to start over") from e
+
+        sealed = self._read_events(self.sealed_path)
+        current = self._read_events(self.path)
+        if sealed is not None:
+            # Compaction interrompue : journal scellé et journal courant réunis
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, 'wb') as f:
+                f.writelines(line for line, _ in sealed + (current or []))
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self.path)
+            os.remove(self.sealed_path)
+        elif current is not None:
+            valid = sum(len(line) for line, _ in current)  # octets avant une éventuelle ligne tronquée
+            if valid < os.path.getsize(self.path):
+                # Couper la ligne tronquée avant d'écrire à la suite
+                with open(self.path, 'r+b') as f:
+                    f.truncate(valid)
+
+        events = [event for _, event in (sealed or []) + (current or []) if event['seq'] > seq]
+        self.seq = events[-1]['seq'] if events else seq
+        self.pending = len(events)
+        self._file = open(self.path, 'a')
+        self.writer.start()
+        return state, events
+
+    @staticmethod
+    def _read_events(path: str) -> Optional[List[Tuple[bytes, dict]]]:
+        """Lignes valides (ligne, événement) de `path`, jusqu'à une éventuelle ligne tronquée ; None sans fichier"""
+        if not os.path.exists(path):
+            return None
+        lines = []
+        with open(path, 'rb') as f:
+            for line in f:
+                try:
+                    if not line.endswith(b'\n'):
+                        raise ValueError
+                    lines.append((line, json.loads(line)))
+                except ValueError:
+                    break
+        return lines
+
+    def append(self, event: dict):
+        """Ajouter un événement (une ligne, poussée vers l'OS sans fsync)"""
+        self.seq += 1
+        self.pending += 1
+        self._file.write(json.dumps(dict(event, seq=self.seq), separators=(',', ':')) + '\n')
+        self._file.flush()
+
+    def compact(self, state: dict) -> bool:
+        """
+        Remplacer snapshot + journal par un snapshot de `state` (copié par
+        l'appelant), écrit par le thread d'écriture. False si la compaction
+        précédente n'est pas terminée (réessayer plus tard).
+        """
+        if self._compacting:
+            return False
+        self._file.close()
+        os.replace(self.path, self.sealed_path)
+        self._file = open(self.path, 'w')
+        self._snapshot = {'seq': self.seq, 'state': state}
+        self._compacting = True
+        self.pending = 0
+        self.writer.mark_dirty()
+        return True
+
+    def _compacted(self):
+        """Snapshot écrit (thread d'écriture) : le journal scellé est inutile"""
+        try:
+            os.remove(self.sealed_path)
+        except FileNotFoundError:
+            pass
+        self._compacting = False
+
+    def close(self):
+        """Terminer la compaction en cours puis fermer le journal"""
+        self.writer.stop()
+        if self._file is not None:
+            self._file.close()
+            self._file = None
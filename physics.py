@@ -2,8 +2,10 @@
 Physique et détection de collisions
 """
 import math
+import random
 from typing import Tuple, Optional, List
 from entities import Player, Bullet, Obstacle
+from spatial import SpatialHash, ObstacleGrid
 import config
 
 def check_bullet_obstacle_collision(bullet, obstacle) -> bool:
@@ -23,7 +25,10 @@ def normalize_vector(x: float, y: float) -> Tuple[float, float]:
 
 def distance(x1: float, y1: float, x2: float, y2: float) -> float:
     """Distance euclidienne entre deux points"""
-    return math.sqrt((x2 - x1) ** 2 + (y2 - y1) ** 2)
+    dx = x2 - x1
+    dy = y2 - y1
+    # dx * dx et non dx ** 2 : pow() peut différer d'un ulp (cf. bullet_store)
+    return math.sqrt(dx * dx + dy * dy)
 
 
 def circle_circle_collision(x1: float, y1: float, r1: float,
@@ -46,6 +51,108 @@ def circle_rect_collision(cx: float, cy: float, radius: float,
     return dist < radius
 
 
+def find_obstacle_collision(cx: float, cy: float, radius: float,
+                            obstacles: ObstacleGrid) -> Optional[Obstacle]:
+    """Premier obstacle (par id) en collision avec le cercle, via l'index statique"""
+    for obs in obstacles.query(cx, cy, radius):
+        if circle_rect_collision(cx, cy, radius, obs.x, obs.y, obs.width, obs.height):
+            return obs
+    return None
+
+
+def segment_circle_toi(x0: float, y0: float, dx: float, dy: float,
+                       cx: float, cy: float, radius: float) -> Optional[float]:
+    """
+    Test balayé point-cercle : premier t dans [0, 1] où le point
+    (x0, y0) + t·(dx, dy) entre dans le cercle. 0 si déjà dedans.
+    """
+    fx = x0 - cx
+    fy = y0 - cy
+    c = fx * fx + fy * fy - radius * radius
+    if c <= 0:
+        return 0.0
+    a = dx * dx + dy * dy
+    if a == 0:
+        return None
+    b = 2 * (fx * dx + fy * dy)
+    disc = b * b - 4 * a * c
+    if disc < 0:
+        return None
+    t = (-b - math.sqrt(disc)) / (2 * a)
+    if 0 <= t <= 1:
+        return t
+    return None
+
+
+def _slab(p0: float, d: float, lo: float, hi: float) -> Tuple[float, float]:
+    """Intervalle [t_near, t_far] où p0 + t·d est dans [lo, hi] sur un axe"""
+    if d == 0:
+        if lo <= p0 <= hi:
+            return -math.inf, math.inf
+        return math.inf, math.inf
+    t1 = (lo - p0) / d
+    t2 = (hi - p0) / d
+    return (t1, t2) if t1 <= t2 else (t2, t1)
+
+
+def segment_aabb_toi(x0: float, y0: float, dx: float, dy: float, radius: float,
+                     rx: float, ry: float, width: float, height: float
+                     ) -> Optional[Tuple[float, float, float]]:
+    """
+    Test balayé cercle-rectangle (AABB) : le cercle de rayon `radius` suit
+    le segment (x0, y0) + t·(dx, dy). Retourne (t, nx, ny), premier contact
+    dans [0, 1] et normale sortante de l'obstacle, ou None.
+
+    Le contact ne compte que si le cercle se dirige vers l'obstacle : une
+    balle posée contre un mur et qui s'en éloigne n'est pas re-détectée.
+    Un centre déjà dans l'obstacle donne toujours t = 0, avec la normale
+    du côté le moins pénétré.
+    """
+    rx2 = rx + width
+    ry2 = ry + height
+
+    # Déjà en contact au départ
+    if circle_rect_collision(x0, y0, radius, rx, ry, width, height):
+        nx = x0 - max(rx, min(x0, rx2))
+        ny = y0 - max(ry, min(y0, ry2))
+        if nx == 0.0 and ny == 0.0:
+            pen = (abs(x0 - rx), abs(rx2 - x0), abs(y0 - ry), abs(ry2 - y0))
+            side = pen.index(min(pen))
+            return (0.0,) + ((-1.0, 0.0), (1.0, 0.0), (0.0, -1.0), (0.0, 1.0))[side]
+        nx, ny = normalize_vector(nx, ny)
+        if dx * nx + dy * ny >= 0:
+            return None
+        return 0.0, nx, ny
+
+    # Slabs du rectangle élargi du rayon (somme de Minkowski sans les coins)
+    near_x, far_x = _slab(x0, dx, rx - radius, rx2 + radius)
+    near_y, far_y = _slab(y0, dy, ry - radius, ry2 + radius)
+    if near_x >= near_y:
+        nx, ny = -math.copysign(1.0, dx), 0.0
+    else:
+        nx, ny = 0.0, -math.copysign(1.0, dy)
+    t_enter = max(near_x, near_y, 0.0)
+    t_exit = min(far_x, far_y)
+    # t_exit <= 0 : la balle quitte déjà le rectangle élargi
+    if t_exit <= 0 or t_enter > min(t_exit, 1.0):
+        return None
+
+    px = x0 + dx * t_enter
+    py = y0 + dy * t_enter
+    if rx <= px <= rx2 or ry <= py <= ry2:
+        # Contact sur une face
+        return t_enter, nx, ny
+
+    # Contact dans un coin arrondi : test contre le cercle du coin
+    corner_x = rx if px < rx else rx2
+    corner_y = ry if py < ry else ry2
+    t = segment_circle_toi(x0, y0, dx, dy, corner_x, corner_y, radius)
+    if t is None:
+        return None
+    nx, ny = normalize_vector(x0 + dx * t - corner_x, y0 + dy * t - corner_y)
+    return t, nx, ny
+
+
 def check_player_obstacle_collision(player: Player, obstacle: Obstacle) -> bool:
     """Vérifier collision joueur-obstacle"""
     return circle_rect_collision(
@@ -70,34 +177,28 @@ def check_player_player_collision(p1: Player, p2: Player) -> bool:
     )
 
 
-def find_valid_spawn_position(obstacles: List[Obstacle], players: List[Player]) -> Tuple[float, float]:
+def find_valid_spawn_position(obstacles: ObstacleGrid, players: SpatialHash,
+                              rng: random.Random = random) -> Tuple[float, float]:
     """
     Trouver une position de spawn valide
     - Loin des obstacles
     - Loin des autres joueurs
     - Dans la zone de spawn sécurisée
     """
-    import random
-    
     max_attempts = 100
     spawn_x_min, spawn_x_max, spawn_y_min, spawn_y_max = config.SPAWN_SAFE_ZONE
     
     for _ in range(max_attempts):
-        x = random.uniform(spawn_x_min, spawn_x_max)
-        y = random.uniform(spawn_y_min, spawn_y_max)
+        x = rng.uniform(spawn_x_min, spawn_x_max)
+        y = rng.uniform(spawn_y_min, spawn_y_max)
         
         # Vérifier collision avec obstacles
-        valid = True
-        for obs in obstacles:
-            if circle_rect_collision(x, y, config.PLAYER_RADIUS, obs.x, obs.y, obs.width, obs.height):
-                valid = False
-                break
-        
-        if not valid:
+        if find_obstacle_collision(x, y, config.PLAYER_RADIUS, obstacles):
             continue
         
-        # Vérifier distance avec autres joueurs
-        for player in players:
+        # Vérifier distance avec autres joueurs (voisins dans la grille)
+        valid = True
+        for player in players.query(x, y, config.PLAYER_SPAWN_MIN_DISTANCE):
             if distance(x, y, player.x, player.y) < config.PLAYER_SPAWN_MIN_DISTANCE:
                 valid = False
                 break
@@ -109,8 +210,8 @@ def find_valid_spawn_position(obstacles: List[Obstacle], players: List[Player])
     return 50.0, 50.0
 
 
-def is_position_valid(x: float, y: float, obstacles: List[Obstacle], 
-                      players: List[Player], exclude_player_id: Optional[str] = None) -> bool:
+def is_position_valid(x: float, y: float, obstacles: ObstacleGrid, 
+                      players: SpatialHash, exclude_player_id: Optional[str] = None) -> bool:
     """
     Vérifier si une position est valide (pas de collision)
     """
@@ -121,12 +222,11 @@ def is_position_valid(x: float, y: float, obstacles: List[Obstacle],
         return False
     
     # Vérifier collision avec obstacles
-    for obs in obstacles:
-        if circle_rect_collision(x, y, config.PLAYER_RADIUS, obs.x, obs.y, obs.width, obs.height):
-            return False
+    if find_obstacle_collision(x, y, config.PLAYER_RADIUS, obstacles):
+        return False
     
-    # Vérifier collision avec autres joueurs
-    for player in players:
+    # Vérifier collision avec autres joueurs (voisins dans la grille)
+    for player in players.query(x, y, 2 * config.PLAYER_RADIUS):
         if exclude_player_id and player.entity_id == exclude_player_id:
             continue
         if circle_circle_collision(x, y, config.PLAYER_RADIUS, player.x, player.y, config.PLAYER_RADIUS):
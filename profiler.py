@@ -0,0 +1,173 @@
+"""
+Profilage à la demande du game loop (POST /admin/profile)
+
+Rien n'est installé hors capture : coût nul quand le profilage est
+inactif. Deux modes :
+- `sampling` : un thread relève la pile du thread du game loop toutes
+  les PROFILE_SAMPLE_INTERVAL secondes (sans toucher au game loop) ;
+  fichier `.folded` (piles repliées, pour flamegraph.pl / speedscope) ;
+- `cprofile` : cProfile activé et désactivé par des commandes exécutées
+  dans le thread du game loop (cf. GameEngine.submit) ; fichier `.prof`
+  (pstats, snakeviz).
+Option `tracemalloc` : allocations encore vivantes à la fin de la capture
+(fichier `.tracemalloc`, relu avec `tracemalloc.Snapshot.load`).
+"""
+import cProfile
+import os
+import pstats
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from typing import List
+
+import config
+
+MODES = ('sampling', 'cprofile')
+COMMAND_TIMEOUT = 5.0  # attente max du tick qui active/désactive cProfile (secondes)
+
+_capture_lock = threading.Lock()  # une capture à la fois par processus
+
+
+class ProfilerError(Exception):
+    """Capture impossible (déjà en cours, moteur arrêté...)"""
+
+
+def capture(engine, mode: str = 'sampling', seconds: float = 10.0, top: int = 20,
+            trace_memory: bool = False, directory: str = config.PROFILE_DIR,
+            label: str = 'main') -> dict:
+    """
+    Profiler le game loop de `engine` pendant `seconds` (bloquant), écrire
+    le résultat dans `directory` et retourner un résumé des `top` entrées
+    """
+    if mode not in MODES:
+        raise ProfilerError(f"Unknown mode {mode} (expected one of {', '.join(MODES)})")
+    thread = engine.game_thread
+    if not engine.running or thread is None:
+        raise ProfilerError("Game loop not running")
+    if not _capture_lock.acquire(blocking=False):
+        raise ProfilerError("Profiling already running")
+
+    try:
+        os.makedirs(directory, exist_ok=True)
+        base = os.path.join(directory, f"{label.replace('/', '-')}-{time.strftime('%Y%m%d-%H%M%S')}-{mode}")
+        started_tracing = trace_memory and not tracemalloc.is_tracing()
+        if started_tracing:
+            tracemalloc.start(config.PROFILE_TRACEMALLOC_FRAMES)
+        ticks_before = engine.tick
+        try:
+            if mode == 'sampling':
+                summary = _sample(thread.ident, seconds, top, f"{base}.folded")
+            else:
+                summary = _cprofile(engine, seconds, top, f"{base}.prof")
+            if trace_memory:
+                summary['memory'] = _memory(top, f"{base}.tracemalloc")
+        finally:
+            if started_tracing:
+                tracemalloc.stop()
+        return dict(mode=mode, seconds=seconds, ticks=engine.tick - ticks_before, **summary)
+    finally:
+        _capture_lock.release()
+
+
+def _where(code) -> str:
+    return f"{os.path.basename(code.co_filename)}:{code.co_firstlineno}:{code.co_name}"
+
+
+def _sample(ident: int, seconds: float, top: int, path: str) -> dict:
+    """Échantillonner la pile du thread `ident` ; piles repliées dans `path`"""
+    stacks: Counter = Counter()  # {(code, ...) de la racine à la feuille: échantillons}
+    interval = config.PROFILE_SAMPLE_INTERVAL
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        frame = sys._current_frames().get(ident)
+        if frame is None:
+            break  # game loop arrêté
+        stack = []
+        while frame is not None:
+            stack.append(frame.f_code)
+            frame = frame.f_back
+        stacks[tuple(reversed(stack))] += 1
+        time.sleep(interval)
+
+    # Le fichier garde les piles complètes ; les résumés ne comptent que les
+    # échantillons pris pendant un tick (le reste : attente du prochain)
+    total = sum(stacks.values())
+    self_samples: Counter = Counter()
+    inclusive: Counter = Counter()
+    busy = 0
+    with open(path, 'w') as f:
+        for stack, count in stacks.most_common():
+            f.write(';'.join(_where(code) for code in stack) + f" {count}\n")
+            tick = next((i for i, code in enumerate(stack) if code.co_name == '_run_tick'), None)
+            if tick is None:
+                continue
+            busy += count
+            self_samples[stack[-1]] += count
+            for code in set(stack[tick:]):
+                inclusive[code] += count
+
+    def rows(counter: Counter) -> List[dict]:
+        return [{'function': _where(code), 'samples': n, 'percent': round(100 * n / busy, 1)}
+                for code, n in counter.most_common(top)]
+
+    return {
+        'file': path,
+        'samples': total,
+        'busy_percent': round(100 * busy / total, 1) if total else 0.0,
+        'top_self': rows(self_samples) if busy else [],  # % des échantillons pris pendant un tick
+        'top_inclusive': rows(inclusive) if busy else [],
+    }
+
+
+def _cprofile(engine, seconds: float, top: int, path: str) -> dict:
+    """cProfile du thread du game loop, activé entre deux ticks ; stats pstats dans `path`"""
+    profile = cProfile.Profile()
+    engine.submit(profile.enable).result(timeout=COMMAND_TIMEOUT)
+    try:
+        time.sleep(seconds)
+    finally:
+        engine.submit(profile.disable).result(timeout=COMMAND_TIMEOUT)
+    profile.dump_stats(path)
+
+    stats = pstats.Stats(profile).stats  # {(fichier, ligne, fonction): (cc, appels, tottime, cumtime, appelants)}
+
+    def cumtime(name: str) -> float:
+        return sum(s[3] for (_, _, function), s in stats.items() if function == name)
+
+    # L'attente du prochain tick (FixedTimestepScheduler._wait) n'est pas du travail
+    # (et ce qu'elle seule appelle : time.sleep)
+    waiting = {key for key, s in stats.items()
+               if key[2] == '_wait' or (s[4] and all(caller[2] == '_wait' for caller in s[4]))}
+    by_time = sorted((item for item in stats.items() if item[0] not in waiting),
+                     key=lambda item: item[1][2], reverse=True)[:top]
+    return {
+        'file': path,
+        'tick_ms': round(cumtime('_run_tick') * 1000, 1),
+        'idle_ms': round(cumtime('_wait') * 1000, 1),
+        'top': [
+            {'function': f"{os.path.basename(file)}:{line}:{name}", 'calls': calls,
+             'tottime_ms': round(tottime * 1000, 2), 'cumtime_ms': round(cumtime * 1000, 2)}
+            for (file, line, name), (_, calls, tottime, cumtime, _) in by_time
+        ],
+    }
+
+
+def _memory(top: int, path: str) -> dict:
+    """Allocations encore vivantes depuis le début de la capture"""
+    snapshot = tracemalloc.take_snapshot().filter_traces([
+        tracemalloc.Filter(False, tracemalloc.__file__),
+        tracemalloc.Filter(False, '<frozen importlib._bootstrap>'),
+    ])
+    snapshot.dump(path)
+    statistics = snapshot.statistics('lineno')
+    return {
+        'file': path,
+        'total_kb': round(sum(s.size for s in statistics) / 1024, 1),
+        'top': [
+            {'location': f"{os.path.basename(s.traceback[0].filename)}:{s.traceback[0].lineno}",
+             'size_kb': round(s.size / 1024, 1), 'count': s.count}
+            for s in statistics[:top]
+        ],
+    }
@@ -0,0 +1,67 @@
+"""
+Rate limiting - Seaux à jetons par clé (IP, player_id)
+"""
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Hashable, List, Optional
+
+import config
+
+
+class TokenBucketLimiter:
+    """
+    Un seau de `burst` jetons par clé, rechargé à `rate` jetons/seconde ;
+    chaque requête consomme un jeton. Vérification en O(1).
+
+    La table est bornée : les clés sont gardées dans l'ordre du dernier
+    accès (LRU), les plus anciennes sont évincées au-delà de `max_keys`,
+    et dès que leur seau est de nouveau plein (une entrée absente vaut un
+    seau plein, l'oublier ne change rien).
+    """
+
+    def __init__(self, rate: float, burst: Optional[float] = None,
+                 max_keys: int = config.RATE_LIMIT_MAX_KEYS,
+                 clock: Callable[[], float] = time.monotonic):
+        self.rate = rate
+        self.burst = burst if burst is not None else rate
+        self.max_keys = max_keys
+        self.clock = clock
+        self._refill_time = self.burst / rate  # seau vide -> plein
+        # {clé: [jetons, dernier accès]}, du plus ancien au plus récent
+        self._buckets: "OrderedDict[Hashable, List[float]]" = OrderedDict()
+        self._lock = threading.Lock()  # middleware asyncio + endpoints du threadpool
+
+    def __len__(self) -> int:
+        return len(self._buckets)
+
+    def check(self, key: Hashable) -> bool:
+        """Consommer un jeton pour `key` ; False si la limite est atteinte"""
+        now = self.clock()
+        with self._lock:
+            buckets = self._buckets
+            bucket = buckets.get(key)
+            if bucket is None:
+                bucket = buckets[key] = [self.burst, now]
+            else:
+                bucket[0] = min(self.burst, bucket[0] + (now - bucket[1]) * self.rate)
+                bucket[1] = now
+                buckets.move_to_end(key)
+
+            allowed = bucket[0] >= 1.0
+            if allowed:
+                bucket[0] -= 1.0
+
+            self._evict(now)
+        return allowed
+
+    def _evict(self, now: float):
+        """Retirer les entrées en trop et celles dont le seau est rechargé"""
+        buckets = self._buckets
+        while len(buckets) > self.max_keys:
+            buckets.popitem(last=False)
+        while buckets:
+            oldest = next(iter(buckets.values()))
+            if now - oldest[1] < self._refill_time:
+                break
+            buckets.popitem(last=False)
@@ -0,0 +1,216 @@
+"""
+Enregistrement des parties - Journal binaire des commandes acceptées
+
+Un moteur enregistré (config.RECORDING_DIR) écrit dans un fichier `.rec` :
+- un en-tête : seed, heure de départ, tick rate, disposition des obstacles ;
+- pour chaque tick, l'écart d'horloge depuis le tick précédent (cf.
+  scheduler.TickClock) puis les commandes acceptées pendant ce tick
+  (join/leave/move/shoot, joueurs désignés par leur id public) ;
+- toutes les RECORDING_CHECK_INTERVAL ticks et à l'arrêt, une empreinte
+  de l'état public.
+
+Avec le même seed, les mêmes heures et les mêmes commandes, le moteur
+refait exactement la même partie : replay.py la rejoue sans temps réel et
+compare les empreintes.
+"""
+import hashlib
+import os
+import struct
+import time
+from dataclasses import dataclass, field
+from typing import Iterator, List, Tuple
+
+import config
+from scheduler import TickClock
+from snapshot import StateSnapshot
+
+MAGIC = b'BAREC'
+VERSION = 1
+HEADER = struct.Struct('<5sBQdHII')  # magic, version, seed, départ, tick rate, obstacles demandés, générés
+OBSTACLE = struct.Struct('<4d')  # x, y, largeur, hauteur
+DIRECTION = struct.Struct('<dd')
+DIGEST_SIZE = 8
+
+# Enregistrements : un octet d'opération puis ses arguments
+OP_TICK = 1  # varint écart en µs
+OP_JOIN = 2  # varint longueur, username UTF-8
+OP_LEAVE = 3  # varint id public
+OP_MOVE = 4  # varint id public, direction (2 × f64)
+OP_SHOOT = 5  # varint id public, direction (2 × f64)
+OP_CHECK = 6  # empreinte de l'état après le dernier tick
+
+
+class RecordingError(Exception):
+    """Fichier d'enregistrement illisible"""
+
+
+def encode_varint(value: int) -> bytes:
+    out = bytearray()
+    while value >= 0x80:
+        out.append((value & 0x7F) | 0x80)
+        value >>= 7
+    out.append(value)
+    return bytes(out)
+
+
+def state_digest(snapshot: StateSnapshot) -> bytes:
+    """Empreinte de l'état public d'un tick (joueurs, balles, obstacles)"""
+    return hashlib.sha1(snapshot.body).digest()[:DIGEST_SIZE]
+
+
+class Recorder:
+    """
+    Écriture du journal depuis le thread du game loop.
+
+    Les enregistrements s'accumulent en mémoire et sont écrits avec
+    chaque empreinte (une écriture par seconde) : un arrêt brutal perd au
+    plus cet intervalle, la fin tronquée est ignorée à la lecture.
+    """
+
+    def __init__(self, path: str, seed: int, clock: TickClock, obstacle_count: int, obstacles: list,
+                 check_interval: int = config.RECORDING_CHECK_INTERVAL):
+        self.path = path
+        self.clock = clock
+        self.check_interval = check_interval
+        self._buffer = bytearray()
+        self._file = open(path, 'wb')
+        self._file.write(HEADER.pack(MAGIC, VERSION, seed, clock.now, config.TICK_RATE,
+                                     obstacle_count, len(obstacles)))
+        for o in obstacles:
+            self._file.write(OBSTACLE.pack(o.x, o.y, o.width, o.height))
+
+    @classmethod
+    def create(cls, directory: str, seed: int, clock: TickClock, obstacle_count: int,
+               obstacles: list) -> 'Recorder':
+        """Nouvel enregistrement dans `directory` (nommé d'après l'heure et le seed)"""
+        os.makedirs(directory, exist_ok=True)
+        name = f"arena-{time.strftime('%Y%m%d-%H%M%S')}-{seed:08x}.rec"
+        recorder = cls(os.path.join(directory, name), seed, clock, obstacle_count, obstacles)
+        print(f"🎥 Enregistrement de la partie dans {recorder.path}")
+        return recorder
+
+    def begin_tick(self):
+        """Début de tick : figer l'horloge et noter l'écart"""
+        self._buffer.append(OP_TICK)
+        self._buffer += encode_varint(self.clock.sync())
+
+    def end_tick(self, tick: int, snapshot: StateSnapshot):
+        if tick % self.check_interval == 0:
+            self.check(snapshot)
+
+    def join(self, username: str):
+        name = username.encode()
+        self._buffer.append(OP_JOIN)
+        self._buffer += encode_varint(len(name)) + name
+
+    def leave(self, public_id: int):
+        self._buffer.append(OP_LEAVE)
+        self._buffer += encode_varint(public_id)
+
+    def move(self, public_id: int, direction_x: float, direction_y: float):
+        self._buffer.append(OP_MOVE)
+        self._buffer += encode_varint(public_id) + DIRECTION.pack(direction_x, direction_y)
+
+    def shoot(self, public_id: int, direction_x: float, direction_y: float):
+        self._buffer.append(OP_SHOOT)
+        self._buffer += encode_varint(public_id) + DIRECTION.pack(direction_x, direction_y)
+
+    def check(self, snapshot: StateSnapshot):
+        """Noter l'empreinte de l'état et écrire ce qui est en attente"""
+        self._buffer.append(OP_CHECK)
+        self._buffer += state_digest(snapshot)
+        self._file.write(self._buffer)
+        self._file.flush()
+        self._buffer.clear()
+
+    def close(self, snapshot: StateSnapshot):
+        """Dernière empreinte (état à l'arrêt) puis fermeture"""
+        if self._file.closed:
+            return
+        self.check(snapshot)
+        self._file.close()
+
+
+# ==================== LECTURE ====================
+
+@dataclass
+class RecordingHeader:
+    version: int
+    seed: int
+    start_time: float
+    tick_rate: int
+    obstacle_count: int  # obstacles demandés au moteur
+    obstacles: List[Tuple[float, float, float, float]] = field(default_factory=list)
+
+
+@dataclass
+class Recording:
+    """Enregistrement décodé : en-tête et enregistrements `(op, *args)`"""
+    header: RecordingHeader
+    events: List[tuple]
+    truncated: bool = False  # fin de fichier incomplète (arrêt brutal)
+
+
+def read_recording(path: str) -> Recording:
+    with open(path, 'rb') as f:
+        data = f.read()
+    if len(data) < HEADER.size or data[:len(MAGIC)] != MAGIC:
+        raise RecordingError(f"{path} n'est pas un enregistrement")
+    magic, version, seed, start, tick_rate, requested, count = HEADER.unpack_from(data)
+    if version != VERSION:
+        raise RecordingError(f"Version d'enregistrement {version} non supportée")
+    offset = HEADER.size
+    header = RecordingHeader(version, seed, start, tick_rate, requested,
+                             [OBSTACLE.unpack_from(data, offset + i * OBSTACLE.size) for i in range(count)])
+    offset += count * OBSTACLE.size
+
+    events: List[tuple] = []
+    truncated = False
+    try:
+        for event in _decode(data, offset):
+            events.append(event)
+    except (IndexError, struct.error, UnicodeDecodeError):
+        truncated = True
+    return Recording(header, events, truncated)
+
+
+def _decode(data: bytes, offset: int) -> Iterator[tuple]:
+    """Enregistrements à partir de `offset` ; IndexError/struct.error si tronqué"""
+    def varint(pos: int) -> Tuple[int, int]:
+        value = shift = 0
+        while True:
+            byte = data[pos]
+            pos += 1
+            value |= (byte & 0x7F) << shift
+            if byte < 0x80:
+                return value, pos
+            shift += 7
+
+    end = len(data)
+    while offset < end:
+        op = data[offset]
+        offset += 1
+        if op == OP_TICK:
+            delta, offset = varint(offset)
+            event = (op, delta)
+        elif op == OP_JOIN:
+            length, offset = varint(offset)
+            if offset + length > end:
+                raise IndexError(offset)
+            event = (op, data[offset:offset + length].decode())
+            offset += length
+        elif op == OP_LEAVE:
+            public_id, offset = varint(offset)
+            event = (op, public_id)
+        elif op in (OP_MOVE, OP_SHOOT):
+            public_id, offset = varint(offset)
+            event = (op, public_id, *DIRECTION.unpack_from(data, offset))
+            offset += DIRECTION.size
+        elif op == OP_CHECK:
+            if offset + DIGEST_SIZE > end:
+                raise IndexError(offset)
+            event = (op, data[offset:offset + DIGEST_SIZE])
+            offset += DIGEST_SIZE
+        else:
+            raise RecordingError(f"Opération inconnue {op} à l'octet {offset - 1}")
+        yield event
@@ -0,0 +1,148 @@
+"""
+Rejeu d'une partie enregistrée - Sans temps réel, avec vérification
+Lancer avec : python replay.py enregistrements/arena-....rec [--output replay.json]
+
+Recrée le moteur avec le seed et l'heure de départ de l'enregistrement
+(horloge virtuelle), vérifie la disposition des obstacles, puis rejoue
+chaque tick aussi vite que possible avec ses commandes. Chaque empreinte
+enregistrée est comparée à l'état rejoué : la première différence donne
+le tick où la partie diverge (changement de physique, de config...).
+Code de sortie 1 en cas de divergence.
+"""
+import argparse
+import contextlib
+import json
+import os
+import sys
+import time
+from typing import Dict, Optional
+
+import config
+from engine import GameEngine
+from recording import (
+    OP_CHECK, OP_JOIN, OP_LEAVE, OP_MOVE, OP_SHOOT, OP_TICK,
+    RecordingError, read_recording, state_digest
+)
+from scheduler import VirtualClock
+
+
+class ReplayError(Exception):
+    """Enregistrement incompatible avec ce moteur"""
+
+
+def replay(path: str, stop_on_divergence: bool = True) -> dict:
+    """Rejouer un enregistrement ; rapport (vitesse, empreintes, divergence)"""
+    recording = read_recording(path)
+    header = recording.header
+    if header.tick_rate != config.TICK_RATE:
+        raise ReplayError(f"Enregistré à {header.tick_rate} FPS, moteur à {config.TICK_RATE} FPS")
+
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        engine = GameEngine(stats_file=None, seed=header.seed, clock=VirtualClock(header.start_time),
+                            obstacle_count=header.obstacle_count)
+    layout = [(o.x, o.y, o.width, o.height) for o in engine.obstacles]
+    if layout != header.obstacles:
+        raise ReplayError("Disposition des obstacles différente (génération modifiée ?)")
+
+    ids: Dict[int, str] = {}  # id public -> player_id du rejeu
+    counters = {'ticks': 0, 'commands': 0, 'rejected': 0, 'checks': 0}
+    divergence: Optional[dict] = None
+
+    def run(command, *args):
+        result = command(*args)
+        if not result['success']:
+            counters['rejected'] += 1  # accepté à l'enregistrement : la partie a déjà divergé
+        return result
+
+    def join(username: str):
+        result = run(engine.join_game, username)
+        if result['success']:
+            ids[engine.players[result['player_id']].public_id] = result['player_id']
+
+    commands = {
+        OP_JOIN: join,
+        OP_LEAVE: lambda public_id: run(engine.leave_game, ids.pop(public_id, '')),
+        OP_MOVE: lambda public_id, x, y: run(engine.player_move, ids.get(public_id, ''), x, y),
+        OP_SHOOT: lambda public_id, x, y: run(engine.player_shoot, ids.get(public_id, ''), x, y),
+    }
+
+    pending: Optional[int] = None  # écart (µs) du tick en cours de lecture, pas encore joué
+    start = time.perf_counter()
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        for op, *args in recording.events:
+            if op == OP_TICK or op == OP_CHECK:
+                if pending is not None:
+                    engine.step(dt=pending / 1_000_000)
+                    counters['ticks'] += 1
+                pending = args[0] if op == OP_TICK else None
+                if op == OP_CHECK:
+                    counters['checks'] += 1
+                    if state_digest(engine.snapshot) != args[0]:
+                        divergence = {'tick': engine.tick, 'check': counters['checks']}
+                        if stop_on_divergence:
+                            break
+            else:
+                counters['commands'] += 1
+                if pending is None:
+                    commands[op](*args)  # hors tick (avant le démarrage, à l'arrêt)
+                else:
+                    engine.submit(commands[op], *args)  # au début du tick, comme en direct
+        else:
+            if pending is not None:
+                engine.step(dt=pending / 1_000_000)
+                counters['ticks'] += 1
+    elapsed = time.perf_counter() - start
+
+    ticks = counters['ticks']
+    recorded = engine.clock() - header.start_time
+    return dict(
+        recording=path,
+        seed=header.seed,
+        truncated=recording.truncated,
+        recorded_seconds=round(recorded, 1),
+        replay_seconds=round(elapsed, 3),
+        ticks_per_second=round(ticks / elapsed, 1) if elapsed else None,
+        speedup=round(recorded / elapsed, 1) if elapsed else None,  # × temps réel
+        phases_avg_ms=engine.tick_stats.to_dict()['phases_avg_ms'],
+        final={'players': len(engine.players), 'bullets': engine.bullet_count(),
+               'kills': engine.stats.total_kills_all_time, 'shots': engine.stats.total_shots_all_time},
+        divergence=divergence,
+        **counters,
+    )
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Rejeu d'une partie enregistrée (config.RECORDING_DIR)")
+    parser.add_argument('recording', help="fichier .rec")
+    parser.add_argument('--keep-going', action='store_true', help="continuer après une divergence")
+    parser.add_argument('--output', help="fichier JSON du rapport")
+    args = parser.parse_args(argv)
+
+    try:
+        report = replay(args.recording, stop_on_divergence=not args.keep_going)
+    except (RecordingError, ReplayError) as e:
+        print(f"❌ {e}")
+        return 1
+
+    print(f"🎬 {report['ticks']} ticks, {report['commands']} commandes, {report['recorded_seconds']}s de partie "
+          f"rejouées en {report['replay_seconds']}s ({report['ticks_per_second']} ticks/s, ×{report['speedup']})")
+    if report['truncated']:
+        print("⚠️ Fin d'enregistrement tronquée (arrêt brutal) : rejoué jusqu'à la dernière donnée complète")
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"💾 Rapport écrit dans {args.output}")
+
+    if report['divergence'] is not None:
+        print(f"❌ Divergence au tick {report['divergence']['tick']} "
+              f"(empreinte n°{report['divergence']['check']})")
+        return 1
+    if report['rejected']:
+        print(f"❌ {report['rejected']} commandes refusées au rejeu")
+        return 1
+    print(f"✅ {report['checks']} empreintes identiques")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,340 @@
+"""
+Rooms - Arènes multiples réparties sur un pool de processus
+
+Chaque room est un `GameEngine` complet (game loop compris) hébergé par
+un processus worker ; un worker héberge plusieurs rooms. Le processus de
+l'API route commandes et snapshots vers le bon worker par un `Pipe`
+(cf. channel.py). Les simulations tournent ainsi sur autant de cœurs qu'il
+y a de workers.
+"""
+import multiprocessing
+import random
+import threading
+from concurrent.futures import Future, TimeoutError as FutureTimeout
+from typing import Dict, List, Optional, Set
+
+import config
+from channel import RemoteError, Replier, RequestChannel
+
+
+class RoomError(RemoteError):
+    """Erreur signalée par un worker (room inconnue, commande refusée...)"""
+
+
+# ==================== PROCESSUS WORKER ====================
+
+def _worker_main(conn):
+    """Boucle d'un worker : reçoit (req_id, op, room_id, args), répond (req_id, ok, valeur)"""
+    from engine import GameEngine  # importé dans le worker seulement
+
+    rooms: Dict[str, GameEngine] = {}
+    replier = Replier(conn)  # réponses envoyées aussi par les game loops
+
+    while True:
+        try:
+            req_id, op, room_id, args = conn.recv()
+        except (EOFError, OSError):
+            break  # processus API disparu
+        if op == 'shutdown':
+            break
+        try:
+            if op == 'create':
+                if room_id in rooms:
+                    raise RoomError(f"Room {room_id} already exists")
+                engine = GameEngine(stats_file=None, seed=args[0])
+                engine.start()
+                rooms[room_id] = engine
+                replier.send(req_id, True, None)
+                continue
+
+            engine = rooms.get(room_id) if room_id is not None else None
+            if room_id is not None and engine is None:
+                raise RoomError(f"Room {room_id} not found")
+
+            if op == 'call':
+                method, call_args = args
+                engine.call(method, *call_args).add_done_callback(replier.resolve(req_id))
+            elif op == 'state':
+                # (etag, body) ; body None si le client a déjà ce snapshot
+                snapshot = engine.snapshot
+                body = None if snapshot.matches(args[0]) else snapshot.body
+                replier.send(req_id, True, (snapshot.etag, body))
+            elif op == 'stats':
+                replier.send(req_id, True, engine.get_stats_json())
+            elif op == 'close':
+                # Refusé si la room n'est plus vide (args[0] : seulement si vide)
+                if args[0] and engine.players:
+                    replier.send(req_id, True, False)
+                    continue
+                del rooms[room_id]
+                engine.stop()
+                replier.send(req_id, True, True)
+            elif op == 'loads':
+                replier.send(req_id, True, {rid: len(e.players) for rid, e in rooms.items()})
+            elif op == 'metrics':
+                replier.send(req_id, True, {rid: e.get_metrics() for rid, e in rooms.items()})
+            elif op == 'profile':
+                # Capture de plusieurs secondes : dans un thread, le worker continue de répondre
+                threading.Thread(target=_profile_room, args=(replier, req_id, engine, args[0]),
+                                 daemon=True).start()
+            else:
+                raise RoomError(f"Unknown operation {op}")
+        except Exception as e:
+            replier.fail(req_id, e)
+
+    for engine in rooms.values():
+        engine.stop()
+
+
+def _profile_room(replier: Replier, req_id: int, engine, options: dict):
+    import profiler
+    try:
+        replier.send(req_id, True, profiler.capture(engine, **options))
+    except Exception as e:
+        replier.fail(req_id, e)
+
+
+# ==================== CÔTÉ API ====================
+
+class RoomWorker:
+    """Un processus worker et son canal de requêtes, vus depuis le processus de l'API"""
+
+    def __init__(self, ctx, index: int):
+        self.index = index
+        conn, child = ctx.Pipe()
+        self.process = ctx.Process(target=_worker_main, args=(child,),
+                                   name=f"room-worker-{index}", daemon=True)
+        self.process.start()
+        child.close()
+
+        self.rooms: Dict[str, int] = {}  # {room_id: joueurs au dernier relevé}
+        self.channel = RequestChannel(conn, f"Worker {index}", error=RoomError)
+
+    @property
+    def players(self) -> int:
+        return sum(self.rooms.values())
+
+    def request(self, op: str, room_id: Optional[str] = None, args: tuple = ()) -> Future:
+        """Envoyer une requête au worker ; le Future porte la réponse"""
+        return self.channel.request(op, room_id, args)
+
+    def close(self):
+        self.channel.close(farewell=('shutdown', None, ()))
+        self.process.join(timeout=5.0)
+        if self.process.is_alive():
+            self.process.terminate()
+
+
+class RoomManager:
+    """
+    Place les rooms sur les workers et y route les requêtes.
+
+    Une nouvelle room va au worker le moins chargé (joueurs, puis rooms).
+    Périodiquement, les rooms vides d'un worker chargé sont déplacées vers
+    un worker moins chargé : les joueurs qui les rejoindront tourneront
+    sur un cœur disponible.
+    """
+
+    def __init__(self, workers: int = config.ROOM_WORKERS,
+                 rebalance_interval: float = config.ROOM_REBALANCE_INTERVAL):
+        self.worker_count = workers or multiprocessing.cpu_count()
+        self.rebalance_interval = rebalance_interval
+        self.workers: List[RoomWorker] = []
+        self._placement: Dict[str, RoomWorker] = {}  # {room_id: worker}
+        self._seeds: Dict[str, int] = {}  # {room_id: seed}, même arène après migration
+        # Le verrou ne protège que l'état ci-dessus (jamais gardé pendant l'attente
+        # d'un worker : les handlers async de l'API le prennent aussi). Une room en
+        # cours de création, fermeture ou migration est réservée dans `_busy`.
+        self._lock = threading.RLock()
+        self._busy: Set[str] = set()
+        self._start_lock = threading.Lock()  # démarrage des workers (lent : spawn)
+        self._stop = threading.Event()
+        self._rebalancer: Optional[threading.Thread] = None
+
+    def start(self):
+        """Démarrer les workers (au premier besoin)"""
+        with self._start_lock:
+            if self.workers:
+                return
+            # 'spawn' : pas de fork d'un processus qui a déjà des threads
+            ctx = multiprocessing.get_context('spawn')
+            workers = [RoomWorker(ctx, i) for i in range(self.worker_count)]
+            with self._lock:
+                self.workers = workers
+            self._stop.clear()
+            self._rebalancer = threading.Thread(target=self._rebalance_loop, name="room-rebalancer", daemon=True)
+            self._rebalancer.start()
+        print(f"🏟️ {self.worker_count} workers de rooms démarrés")
+
+    def stop(self):
+        self._stop.set()
+        with self._start_lock:
+            with self._lock:
+                workers, self.workers = self.workers, []
+                self._placement.clear()
+                self._seeds.clear()
+            for worker in workers:
+                worker.close()
+
+    # ==================== ROOMS ====================
+
+    def rooms(self) -> List[dict]:
+        with self._lock:
+            return [
+                {'room_id': room_id, 'players': worker.rooms[room_id], 'worker': worker.index}
+                for room_id, worker in sorted(self._placement.items())
+            ]
+
+    def create(self, room_id: str):
+        """Créer une room (bloquant : le temps de générer l'arène)"""
+        self.start()
+        with self._lock:
+            if room_id in self._placement or room_id in self._busy:
+                raise RoomError(f"Room {room_id} already exists")
+            if len(self._placement.keys() | self._busy) >= config.MAX_ROOMS:
+                raise RoomError(f"Too many rooms (max {config.MAX_ROOMS})")
+            worker = min(self.workers, key=lambda w: (w.players, len(w.rooms)))
+            seed = random.getrandbits(32)
+            worker.rooms[room_id] = 0  # compte déjà dans la charge du worker
+            self._busy.add(room_id)
+        try:
+            worker.request('create', room_id, (seed,)).result(timeout=config.ROOM_REQUEST_TIMEOUT)
+        except BaseException:
+            with self._lock:
+                worker.rooms.pop(room_id, None)
+                self._busy.discard(room_id)
+            raise
+        with self._lock:
+            self._busy.discard(room_id)
+            self._placement[room_id] = worker
+            self._seeds[room_id] = seed
+
+    def close(self, room_id: str) -> bool:
+        """Fermer une room vide ; False si des joueurs y sont encore"""
+        with self._lock:
+            worker = self._worker(room_id)
+            if room_id in self._busy:
+                raise RoomError(f"Room {room_id} is busy (migration in progress)")
+            self._busy.add(room_id)
+        closed = False
+        try:
+            closed = worker.request('close', room_id, (True,)).result(timeout=config.ROOM_REQUEST_TIMEOUT)
+        finally:
+            with self._lock:
+                self._busy.discard(room_id)
+                if closed:
+                    del worker.rooms[room_id]
+                    del self._placement[room_id]
+                    del self._seeds[room_id]
+        return closed
+
+    def _worker(self, room_id: str) -> RoomWorker:
+        worker = self._placement.get(room_id)
+        if worker is None:
+            raise KeyError(room_id)
+        return worker
+
+    # ==================== REQUÊTES ROUTÉES ====================
+
+    def call(self, room_id: str, method: str, *args) -> Future:
+        """Exécuter une commande du moteur de la room à son prochain tick"""
+        with self._lock:
+            return self._worker(room_id).request('call', room_id, (method, args))
+
+    def state(self, room_id: str, if_none_match: Optional[str] = None) -> Future:
+        """(etag, body JSON ou None si `if_none_match` désigne le snapshot courant)"""
+        with self._lock:
+            return self._worker(room_id).request('state', room_id, (if_none_match,))
+
+    def stats(self, room_id: str) -> Future:
+        with self._lock:
+            return self._worker(room_id).request('stats', room_id)
+
+    def profile(self, room_id: str, options: dict) -> Future:
+        """Profiler le game loop d'une room (cf. profiler.capture)"""
+        with self._lock:
+            return self._worker(room_id).request('profile', room_id, (options,))
+
+    def metrics(self) -> Dict[str, dict]:
+        """Métriques de chaque room (GameEngine.get_metrics), une requête par worker"""
+        with self._lock:
+            workers = list(self.workers)
+        metrics = {}
+        for future in [w.request('metrics') for w in workers]:
+            try:
+                metrics.update(future.result(timeout=config.ROOM_REQUEST_TIMEOUT))
+            except (RoomError, FutureTimeout):
+                continue  # worker indisponible : ses rooms manquent à ce relevé
+        return metrics
+
+    # ==================== RÉÉQUILIBRAGE ====================
+
+    def _rebalance_loop(self):
+        while not self._stop.wait(self.rebalance_interval):
+            try:
+                self.rebalance()
+            except Exception as e:
+                print(f"⚠️ Erreur rééquilibrage rooms: {e}")
+
+    def refresh_loads(self):
+        """Relever le nombre de joueurs de chaque room"""
+        with self._lock:
+            workers = list(self.workers)
+        for worker, future in [(w, w.request('loads')) for w in workers]:
+            try:
+                loads = future.result(timeout=config.ROOM_REQUEST_TIMEOUT)
+            except (RoomError, FutureTimeout):
+                continue
+            with self._lock:
+                for room_id in worker.rooms:
+                    worker.rooms[room_id] = loads.get(room_id, 0)
+
+    def rebalance(self) -> int:
+        """Déplacer des rooms vides vers les workers moins chargés ; retourne le nombre déplacé"""
+        self.refresh_loads()
+        moved = 0
+        for _ in range(len(self._placement)):
+            with self._lock:
+                if len(self.workers) < 2:
+                    break
+                busiest = max(self.workers, key=lambda w: (w.players, len(w.rooms)))
+                idlest = min(self.workers, key=lambda w: (w.players, len(w.rooms)))
+                empty = sorted(room_id for room_id, players in busiest.rooms.items()
+                               if players == 0 and room_id not in self._busy)
+                # Utile seulement si le worker d'arrivée reste moins chargé
+                if (not empty or busiest is idlest or
+                        (busiest.players, len(busiest.rooms)) <= (idlest.players, len(idlest.rooms) + 1)):
+                    break
+                room_id = empty[0]
+                self._busy.add(room_id)
+            try:
+                migrated = self._migrate(room_id, busiest, idlest)
+            finally:
+                with self._lock:
+                    self._busy.discard(room_id)
+            if not migrated:
+                break
+            moved += 1
+        if moved:
+            print(f"🏟️ {moved} room(s) vide(s) déplacée(s)")
+        return moved
+
+    def _migrate(self, room_id: str, source: RoomWorker, target: RoomWorker) -> bool:
+        """
+        Recréer une room vide (même seed, mêmes obstacles) sur `target` puis la
+        fermer sur `source`. Room réservée par l'appelant ; les requêtes vont à
+        `source` jusqu'à la bascule, le verrou n'est pris que pour la bascule.
+        """
+        timeout = config.ROOM_REQUEST_TIMEOUT
+        target.request('create', room_id, (self._seeds[room_id],)).result(timeout=timeout)
+        if not source.request('close', room_id, (True,)).result(timeout=timeout):
+            # Un joueur est arrivé entre-temps : la room reste où elle est
+            target.request('close', room_id, (False,)).result(timeout=timeout)
+            with self._lock:
+                source.rooms[room_id] = max(source.rooms.get(room_id, 0), 1)
+            return False
+        with self._lock:
+            source.rooms.pop(room_id, None)
+            target.rooms[room_id] = 0
+            self._placement[room_id] = target
+        return True
@@ -0,0 +1,181 @@
+"""
+Ordonnanceur à pas fixe - cadence du game loop
+"""
+import time
+from dataclasses import dataclass, field
+from typing import Callable, Dict, Optional
+
+import config
+from metrics import Histogram
+
+
+@dataclass
+class TickStats:
+    """Durées des phases et retards du game loop"""
+    ticks: int = 0
+    overruns: int = 0  # ticks plus longs que TICK_DURATION
+    catchup_ticks: int = 0  # ticks exécutés en rattrapage
+    dropped_ticks: int = 0  # ticks abandonnés (retard > MAX_CATCHUP_TICKS)
+    last_tick_duration: float = 0.0
+    max_tick_duration: float = 0.0
+    total_tick_duration: float = 0.0
+    lag: float = 0.0  # retard courant de la simulation sur le temps réel
+    phase_last: Dict[str, float] = field(default_factory=dict)
+    phase_total: Dict[str, float] = field(default_factory=dict)
+    pair_tests: int = 0  # tests de collision balle/obstacle ou joueur
+    hibernations: int = 0  # sommeils du game loop (monde vide ou immobile)
+    hibernated: float = 0.0  # temps passé endormi (secondes)
+    # Histogrammes pour /metrics
+    tick_histogram: Histogram = field(default_factory=lambda: Histogram(config.METRICS_TICK_BUCKETS))
+    phase_histograms: Dict[str, Histogram] = field(default_factory=dict)
+    pair_tests_histogram: Histogram = field(default_factory=lambda: Histogram(config.METRICS_PAIR_TESTS_BUCKETS))
+
+    def record_phase(self, name: str, duration: float):
+        self.phase_last[name] = duration
+        self.phase_total[name] = self.phase_total.get(name, 0.0) + duration
+        histogram = self.phase_histograms.get(name)
+        if histogram is None:
+            histogram = self.phase_histograms[name] = Histogram(config.METRICS_TICK_BUCKETS)
+        histogram.observe(duration)
+
+    def record_pair_tests(self, count: int):
+        self.pair_tests += count
+        self.pair_tests_histogram.observe(count)
+
+    def record_hibernation(self, duration: float):
+        self.hibernations += 1
+        self.hibernated += duration
+
+    def record_tick(self, duration: float):
+        self.ticks += 1
+        self.tick_histogram.observe(duration)
+        self.last_tick_duration = duration
+        self.total_tick_duration += duration
+        if duration > self.max_tick_duration:
+            self.max_tick_duration = duration
+        if duration > config.TICK_DURATION:
+            self.overruns += 1
+
+    def to_dict(self) -> dict:
+        ticks = max(self.ticks, 1)
+        return {
+            'ticks': self.ticks,
+            'overruns': self.overruns,
+            'catchup_ticks': self.catchup_ticks,
+            'dropped_ticks': self.dropped_ticks,
+            'lag_ms': round(self.lag * 1000, 3),
+            'hibernations': self.hibernations,
+            'hibernated_seconds': round(self.hibernated, 3),
+            'last_tick_ms': round(self.last_tick_duration * 1000, 3),
+            'avg_tick_ms': round(self.total_tick_duration / ticks * 1000, 3),
+            'max_tick_ms': round(self.max_tick_duration * 1000, 3),
+            'phases_last_ms': {k: round(v * 1000, 3) for k, v in self.phase_last.items()},
+            'phases_avg_ms': {k: round(v / ticks * 1000, 3) for k, v in self.phase_total.items()},
+        }
+
+
+class VirtualClock:
+    """
+    Horloge simulée, qui n'avance que sur `advance` : remplace `time.time`
+    dans un moteur exécuté pas à pas (GameEngine.step).
+    """
+
+    def __init__(self, start: float = 0.0):
+        self.now = start
+
+    def __call__(self) -> float:
+        return self.now
+
+    def advance(self, seconds: float):
+        self.now += seconds
+
+
+class TickClock:
+    """
+    Horloge réelle figée pendant chaque tick (moteur enregistré, cf.
+    recording.py) : toutes les lectures d'un tick voient la même heure,
+    arrondie à la microseconde et jamais en recul. Le journal note l'écart
+    rendu par `sync` ; `VirtualClock.advance(écart / 1e6)` retrouve au rejeu
+    exactement les mêmes flottants.
+    """
+
+    def __init__(self, source: Callable[[], float] = time.time):
+        self.source = source
+        self.now = source()
+
+    def __call__(self) -> float:
+        return self.now
+
+    def sync(self) -> int:
+        """Avancer à l'heure réelle (début de tick) ; retourne l'écart en microsecondes"""
+        delta_us = max(0, round((self.source() - self.now) * 1_000_000))
+        self.now += delta_us / 1_000_000
+        return delta_us
+
+
+class FixedTimestepScheduler:
+    """
+    Boucle à pas fixe sans dérive.
+
+    Un accumulateur alimenté par `perf_counter` décide combien de ticks
+    exécuter : un tick en retard est rattrapé (au plus `max_catchup` par
+    tour), au-delà le retard est abandonné et compté. L'attente combine
+    `time.sleep` puis une attente active sur la dernière milliseconde.
+    Avant chaque tour, `hibernate` (optionnel) peut endormir la boucle :
+    s'il rend True, le temps passé ne compte pas comme du retard.
+    """
+
+    def __init__(self, tick_duration: float = config.TICK_DURATION,
+                 max_catchup: int = config.MAX_CATCHUP_TICKS,
+                 spin_threshold: float = config.SCHEDULER_SPIN_THRESHOLD,
+                 clock: Callable[[], float] = time.perf_counter):
+        self.tick_duration = tick_duration
+        self.max_catchup = max_catchup
+        self.spin_threshold = spin_threshold
+        self.clock = clock
+
+    def run(self, step: Callable[[], None], is_running: Callable[[], bool], stats: TickStats,
+            hibernate: Optional[Callable[[], bool]] = None):
+        """Appeler `step` toutes les `tick_duration` secondes tant que `is_running()`"""
+        dt = self.tick_duration
+        clock = self.clock
+        accumulator = dt  # premier tick immédiat
+        previous = clock()
+
+        while is_running():
+            if hibernate is not None and hibernate():
+                if not is_running():
+                    break
+                # Réveil : un tick immédiat, rien à rattraper
+                accumulator = dt
+                previous = clock()
+            now = clock()
+            accumulator += now - previous
+            previous = now
+
+            steps = 0
+            while accumulator >= dt and steps < self.max_catchup:
+                step()
+                accumulator -= dt
+                steps += 1
+            if steps > 1:
+                stats.catchup_ticks += steps - 1
+
+            # Trop de retard : abandonner plutôt que spiraler
+            stats.lag = accumulator
+            if accumulator >= dt:
+                dropped = int(accumulator // dt)
+                stats.dropped_ticks += dropped
+                accumulator -= dropped * dt
+
+            self._wait(dt - accumulator - (clock() - previous))
+
+    def _wait(self, delay: float):
+        """Dormir `delay` secondes : sleep grossier puis attente active"""
+        if delay <= 0:
+            return
+        deadline = self.clock() + delay
+        if delay > self.spin_threshold:
+            time.sleep(delay - self.spin_threshold)
+        while self.clock() < deadline:
+            time.sleep(0)  # rend le GIL aux threads de l'API
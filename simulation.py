@@ -0,0 +1,523 @@
+"""
+Simulation partagée - Le moteur dans un processus dédié, l'état en mémoire partagée
+Lancer avec : python simulation.py
+
+Le processus de simulation fait tourner le `GameEngine` et écrit chaque
+tick qui change l'état dans un double tampon `multiprocessing.shared_memory` (stats et
+classement dans un second, toutes les SHARED_STATS_INTERVAL secondes).
+Les API_WORKERS workers uvicorn y lisent /state, /me, /stats,
+/leaderboard et le flux /ws/state sans passer par lui, et lui envoient
+les actions par une connexion locale (cf. channel.py) : les lectures se
+répartissent sur tous les cœurs au lieu de disputer le GIL au thread du
+game loop. Les rooms sont hébergées par la simulation (un seul
+`RoomManager` pour tous les workers, cf. RemoteRooms).
+"""
+import json
+import multiprocessing
+import os
+import pickle
+import signal
+import struct
+import threading
+import time
+from array import array
+from concurrent.futures import Future
+from multiprocessing import shared_memory
+from multiprocessing.connection import Client, Listener
+from typing import Dict, List, Optional, Tuple
+
+import config
+from channel import RemoteError, Replier, RequestChannel
+from engine import GameEngine
+from entities import Obstacle
+import profiler
+from rooms import RoomError, RoomManager
+from snapshot import SnapshotBuilder, StateSnapshot
+from stream import StateStream
+
+ENV_VAR = "BATTLE_ARENA_SIMULATION"  # "hôte:port:clé", hérité par les workers uvicorn
+LEADERBOARD_LIMIT = 100  # entrées publiées (limite max de /leaderboard)
+BOARD_SIZE = 1024 * 1024  # octets max d'une publication des stats et du classement
+ROOM_NOT_FOUND = "Room not found"  # réponse d'erreur relayée en KeyError (cf. RemoteRooms)
+# Opérations du RoomManager relayées aux workers API ; les bloquantes
+# tournent dans un thread à part (pas dans celui qui relaie les commandes)
+ROOM_OPERATIONS = frozenset({'rooms', 'create', 'close', 'call', 'state', 'stats', 'profile', 'metrics'})
+ROOM_BLOCKING = frozenset({'create', 'close', 'metrics'})
+
+
+# ==================== MÉMOIRE PARTAGÉE ====================
+
+class SharedSnapshot:
+    """
+    Double tampon en mémoire partagée, un seul écrivain.
+
+    Disposition : [seq] puis deux emplacements [version, longueur, données].
+    La publication n s'écrit dans l'emplacement n % 2 avec une version
+    impaire, passée à 2n + 2 une fois les données copiées, puis seq = n.
+    Un lecteur copie l'emplacement désigné par seq et relit sa version :
+    impaire ou changée, la copie est déchirée (l'écrivain l'a rattrapé) et
+    il recommence.
+    """
+
+    _HEADER = struct.Struct('<Q')  # seq : dernière publication complète
+    _SLOT = struct.Struct('<QQ')  # version, longueur
+    READ_ATTEMPTS = 4
+
+    def __init__(self, shm: shared_memory.SharedMemory, capacity: int, owner: bool):
+        self.shm = shm
+        self.capacity = capacity  # octets max par publication
+        self.owner = owner  # l'écrivain détruit le segment à la fermeture
+        self._written = 0
+
+    @classmethod
+    def create(cls, capacity: int = config.SHARED_SNAPSHOT_SIZE) -> "SharedSnapshot":
+        size = cls._HEADER.size + 2 * (cls._SLOT.size + capacity)
+        return cls(shared_memory.SharedMemory(create=True, size=size), capacity, owner=True)
+
+    @classmethod
+    def attach(cls, name: str, capacity: int) -> "SharedSnapshot":
+        # Lecteurs et écrivain descendent du même lanceur et partagent son
+        # resource_tracker : le segment n'est détruit que par l'écrivain
+        return cls(shared_memory.SharedMemory(name=name), capacity, owner=False)
+
+    @property
+    def name(self) -> str:
+        return self.shm.name
+
+    @property
+    def seq(self) -> int:
+        return self._HEADER.unpack_from(self.shm.buf, 0)[0]
+
+    def _offset(self, seq: int) -> int:
+        return self._HEADER.size + (seq % 2) * (self._SLOT.size + self.capacity)
+
+    def write(self, payload: bytes) -> bool:
+        """Publier `payload` ; False s'il dépasse la capacité"""
+        size = len(payload)
+        if size > self.capacity:
+            return False
+        seq = self._written + 1
+        buf = self.shm.buf
+        offset = self._offset(seq)
+        self._SLOT.pack_into(buf, offset, 2 * seq + 1, size)
+        start = offset + self._SLOT.size
+        buf[start:start + size] = payload
+        self._SLOT.pack_into(buf, offset, 2 * seq + 2, size)
+        self._HEADER.pack_into(buf, 0, seq)
+        self._written = seq
+        return True
+
+    def read(self) -> Optional[Tuple[int, bytes]]:
+        """(seq, données) de la dernière publication ; None si aucune ou si chaque copie était déchirée"""
+        buf = self.shm.buf
+        for _ in range(self.READ_ATTEMPTS):
+            seq = self._HEADER.unpack_from(buf, 0)[0]
+            if seq == 0:
+                return None
+            offset = self._offset(seq)
+            version, size = self._SLOT.unpack_from(buf, offset)
+            if version % 2 or size > self.capacity:
+                continue
+            start = offset + self._SLOT.size
+            data = bytes(buf[start:start + size])
+            if self._SLOT.unpack_from(buf, offset)[0] == version:
+                return version // 2 - 1, data
+        return None
+
+    def close(self):
+        self.shm.close()
+        if self.owner:
+            self.shm.unlink()
+
+
+# ==================== PROCESSUS DE SIMULATION ====================
+
+class SimulationServer:
+    """
+    Côté simulation : publie chaque nouveau snapshot du moteur dans la mémoire
+    partagée et exécute les commandes des workers API (un thread par
+    connexion, commandes passées au tick comme en local).
+    """
+
+    def __init__(self, engine: GameEngine, capacity: int = config.SHARED_SNAPSHOT_SIZE):
+        self.engine = engine
+        self.shared = SharedSnapshot.create(capacity)
+        self.board = SharedSnapshot.create(BOARD_SIZE)  # (stats JSON, classement)
+        self.rooms = RoomManager()  # démarré à la première room
+        self.authkey = os.urandom(16)
+        self.listener = Listener(('127.0.0.1', 0), authkey=self.authkey)
+        self._board_published = float('-inf')  # time.monotonic() de la dernière publication
+        self._published: Optional[Tuple[str, Dict[str, int]]] = None  # (etag, ids) du dernier snapshot publié
+        self._too_big = set()  # segments déjà signalés trop petits
+
+    @property
+    def address(self) -> str:
+        host, port = self.listener.address
+        return f"{host}:{port}:{self.authkey.hex()}"
+
+    def start(self):
+        self.engine.exporter = self
+        self.engine.start()
+        threading.Thread(target=self._accept_loop, name="simulation-accept", daemon=True).start()
+
+    def stop(self):
+        self.engine.stop()
+        self.engine.exporter = None
+        self.rooms.stop()
+        self.listener.close()
+        self.shared.close()
+        self.board.close()
+
+    def publish(self, snapshot: StateSnapshot):
+        """Copier le tick dans la mémoire partagée (thread du game loop)"""
+        engine = self.engine
+        # player_id -> handle public, pour /me (ne quitte pas la machine)
+        ids = {player_id: player.public_id for player_id, player in engine.players.items()}
+        # Snapshot conservé (rien n'a changé) et mêmes joueurs : les lecteurs l'ont déjà
+        if (snapshot.etag, ids) != self._published:
+            self._published = (snapshot.etag, ids)
+            # Les enregistrements sont déjà dans body : seuls leurs handles (dans
+            # l'ordre de body) accompagnent le JSON, les lecteurs les réassocient
+            self._write(self.shared, 'Snapshot', (
+                snapshot.tick, snapshot.etag, snapshot.body,
+                array('Q', snapshot.players).tobytes(), array('Q', snapshot.bullets).tobytes(), ids,
+            ))
+        # Stats et classement changent à chaque tick (durées de tick, numéro du
+        # tick) : republiés à intervalle régulier, pas à chaque tick
+        now = time.monotonic()
+        if now - self._board_published >= config.SHARED_STATS_INTERVAL:
+            self._board_published = now
+            self._write(self.board, 'Stats', (engine.get_stats_json(), engine.get_leaderboard(LEADERBOARD_LIMIT)))
+
+    def _write(self, shared: SharedSnapshot, label: str, value: tuple):
+        payload = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        if not shared.write(payload) and label not in self._too_big:
+            self._too_big.add(label)
+            print(f"⚠️ {label} de {len(payload)} octets > {shared.capacity} octets, non publié")
+
+    def _accept_loop(self):
+        while True:
+            try:
+                conn = self.listener.accept()
+            except multiprocessing.AuthenticationError:
+                continue
+            except OSError:
+                break  # listener fermé
+            threading.Thread(target=self._serve, args=(conn,), name="simulation-conn", daemon=True).start()
+
+    def _serve(self, conn):
+        """Requêtes d'un worker API : (req_id, op, args)"""
+        replier = Replier(conn)
+        while True:
+            try:
+                req_id, op, args = conn.recv()
+            except (EOFError, OSError):
+                break  # worker arrêté
+            try:
+                if op == 'call':
+                    method, call_args = args
+                    self.engine.call(method, *call_args).add_done_callback(replier.resolve(req_id))
+                elif op == 'metrics':
+                    replier.send(req_id, True, self.engine.get_metrics())
+                elif op == 'rooms':
+                    self._room_request(replier, req_id, *args)
+                elif op == 'profile':
+                    # Capture de plusieurs secondes : hors de ce thread, qui relaie aussi les commandes
+                    threading.Thread(target=self._profile, args=(replier, req_id, args),
+                                     name="simulation-profile", daemon=True).start()
+                elif op == 'hello':
+                    replier.send(req_id, True, {
+                        'shm': self.shared.name,
+                        'capacity': self.shared.capacity,
+                        'board': self.board.name,
+                        'obstacles': self.engine.snapshots.static['obstacles'],
+                        'start_time': self.engine.start_time,
+                    })
+                else:
+                    raise RemoteError(f"Unknown operation {op}")
+            except Exception as e:
+                replier.fail(req_id, e)
+        conn.close()
+
+    def _room_request(self, replier: Replier, req_id: int, name: str, args: tuple):
+        """Opération `name` du RoomManager pour un worker API (cf. RemoteRooms)"""
+        if name not in ROOM_OPERATIONS:
+            raise RemoteError(f"Unknown room operation {name}")
+        if name in ROOM_BLOCKING:
+            threading.Thread(target=self._room_blocking, args=(replier, req_id, name, args),
+                             name="simulation-rooms", daemon=True).start()
+            return
+        try:
+            result = getattr(self.rooms, name)(*args)
+        except KeyError:
+            replier.send(req_id, False, ROOM_NOT_FOUND)
+            return
+        if isinstance(result, Future):
+            result.add_done_callback(replier.resolve(req_id))
+        else:
+            replier.send(req_id, True, result)
+
+    def _room_blocking(self, replier: Replier, req_id: int, name: str, args: tuple):
+        try:
+            replier.send(req_id, True, getattr(self.rooms, name)(*args))
+        except KeyError:
+            replier.send(req_id, False, ROOM_NOT_FOUND)
+        except Exception as e:
+            replier.fail(req_id, e)
+
+    def _profile(self, replier: Replier, req_id: int, options: dict):
+        try:
+            replier.send(req_id, True, profiler.capture(self.engine, **options))
+        except Exception as e:
+            replier.fail(req_id, e)
+
+
+def _simulation_main(conn):
+    """Processus de simulation : tourne jusqu'au message d'arrêt du lanceur"""
+    signal.signal(signal.SIGINT, signal.SIG_IGN)  # Ctrl+C : arrêt piloté par le lanceur
+    server = SimulationServer(GameEngine())
+    server.start()
+    conn.send(server.address)
+    try:
+        conn.recv()
+    except (EOFError, OSError):
+        pass  # lanceur disparu
+    server.stop()
+
+
+# ==================== CÔTÉ WORKER API ====================
+
+class SimulationClient:
+    """
+    Remplace le `GameEngine` dans main.py quand la simulation tourne
+    ailleurs : même interface (`call`, `snapshot`, `get_view`, `stream`,
+    stats, classement). Chaque publication est décodée au plus une fois
+    par worker, à la première lecture qui en a besoin.
+    """
+
+    def __init__(self, address: str):
+        host, port, authkey = address.rsplit(':', 2)
+        self.address = (host, int(port))
+        self.authkey = bytes.fromhex(authkey)
+        self.running = False
+        self.start_time = time.time()
+        self.channel: Optional[RequestChannel] = None
+        self.shared: Optional[SharedSnapshot] = None
+        self.board: Optional[SharedSnapshot] = None
+        self.snapshots: Optional[SnapshotBuilder] = None  # encodages binaires et vues /me
+        self.stream: Optional[StateStream] = None
+        self._state: Optional[tuple] = None  # (snapshot, ids)
+        self._seq = 0
+        self._board: Optional[tuple] = None  # (stats JSON, classement)
+        self._board_seq = 0
+        self._lock = threading.Lock()
+        self._poller: Optional[threading.Thread] = None
+
+    @classmethod
+    def from_env(cls) -> Optional["SimulationClient"]:
+        """Client de la simulation lancée par simulation.py, None en mode local"""
+        address = os.environ.get(ENV_VAR)
+        return cls(address) if address else None
+
+    def start(self):
+        """Se connecter à la simulation et attendre sa première publication"""
+        if self.running:
+            return
+        timeout = config.SIMULATION_REQUEST_TIMEOUT
+        self.channel = RequestChannel(Client(self.address, authkey=self.authkey), "Simulation")
+        hello = self.channel.request('hello', ()).result(timeout=timeout)
+        self.shared = SharedSnapshot.attach(hello['shm'], hello['capacity'])
+        self.board = SharedSnapshot.attach(hello['board'], BOARD_SIZE)
+        obstacles = [Obstacle(o['id'], o['x'], o['y'], o['width'], o['height']) for o in hello['obstacles']]
+        self.snapshots = SnapshotBuilder(obstacles)
+        self.stream = StateStream(self.snapshots.static, self.snapshots.names)
+        self.start_time = hello['start_time']
+
+        deadline = time.monotonic() + timeout
+        while self._current() is None or self._current_board() is None:
+            if time.monotonic() > deadline:
+                raise RemoteError("Simulation: no snapshot published")
+            time.sleep(1.0 / config.TICK_RATE)
+
+        self.running = True
+        self._poller = threading.Thread(target=self._poll_loop, name="simulation-poller", daemon=True)
+        self._poller.start()
+        print(f"🔗 Simulation partagée (pid {os.getpid()})")
+
+    def stop(self):
+        if not self.running:
+            return
+        self.running = False
+        self._poller.join(timeout=2.0)
+        self.channel.close()
+        self.shared.close()
+        self.board.close()
+
+    # ==================== LECTURES (MÉMOIRE PARTAGÉE) ====================
+
+    def _current(self) -> Optional[tuple]:
+        """Dernière publication décodée"""
+        if self.shared.seq != self._seq:
+            with self._lock:
+                if self.shared.seq != self._seq:  # pas déjà décodée par un autre thread
+                    self._load()
+        return self._state
+
+    def _load(self):
+        read = self.shared.read()
+        if read is None:
+            return  # rien de lisible : on garde la précédente
+        seq, data = read
+        tick, etag, body, player_handles, bullet_handles, ids = pickle.loads(data)
+        snapshot = self._state[0] if self._state is not None else None
+        if snapshot is None or snapshot.etag != etag:
+            state = json.loads(body)
+            snapshot = StateSnapshot(tick=tick, body=body, etag=etag,
+                                     players=dict(zip(array('Q', player_handles), state['players'])),
+                                     bullets=dict(zip(array('Q', bullet_handles), state['bullets'])))
+        # sinon le même objet : encodages, grilles et deltas déjà calculés restent valides
+        self._state = (snapshot, ids)
+        self._seq = seq
+
+    def _current_board(self) -> Optional[tuple]:
+        """Dernières stats et dernier classement publiés (stats JSON, classement)"""
+        if self.board.seq != self._board_seq:
+            with self._lock:
+                read = self.board.read() if self.board.seq != self._board_seq else None
+                if read is not None:
+                    self._board_seq, data = read
+                    self._board = pickle.loads(data)
+        return self._board
+
+    @property
+    def snapshot(self) -> StateSnapshot:
+        return self._current()[0]
+
+    def get_view(self, player_id: str, radius: float, far: bool = False) -> Optional[bytes]:
+        snapshot, ids = self._current()[:2]
+        public_id = ids.get(player_id)
+        if public_id is None:
+            return None
+        return self.snapshots.view(snapshot, public_id, radius, far)
+
+    def get_stats(self) -> dict:
+        return json.loads(self.get_stats_json())
+
+    def get_stats_json(self) -> bytes:
+        return self._current_board()[0]
+
+    def get_leaderboard(self, limit: int = 10) -> dict:
+        board = self._current_board()[1]
+        result = dict(board, players=board['players'][:limit])
+        if 'tournament' in board:
+            result['tournament'] = board['tournament'][:limit]
+        return result
+
+    def _poll_loop(self):
+        """Relayer les snapshots au flux /ws/state de ce worker, au rythme des ticks"""
+        polls = 0
+        while self.running:
+            time.sleep(1.0 / config.TICK_RATE)
+            polls += 1
+            # Sans abonné, rien à décoder : le flux oublie juste sa base
+            snapshot = self.snapshot if self.stream.has_subscribers else self._state[0]
+            self.stream.publish(snapshot, polls)
+
+    # ==================== COMMANDES ====================
+
+    def call(self, method: str, *args) -> Future:
+        """Exécuter une commande au prochain tick de la simulation"""
+        return self.channel.request('call', (method, args))
+
+    def profile(self, options: dict) -> Future:
+        """Profiler le game loop de la simulation (cf. profiler.capture)"""
+        return self.channel.request('profile', options)
+
+    def get_metrics(self) -> dict:
+        """Métriques du moteur (GameEngine.get_metrics), demandées à la simulation"""
+        return self.channel.request('metrics', ()).result(timeout=config.SIMULATION_REQUEST_TIMEOUT)
+
+
+class RemoteRooms:
+    """
+    Remplace le `RoomManager` dans main.py quand la simulation tourne
+    ailleurs : les rooms sont hébergées par le processus de simulation,
+    les API_WORKERS workers voient donc les mêmes. Même interface ; une
+    room inconnue lève KeyError, une erreur de room RoomError.
+    """
+
+    def __init__(self, simulation: SimulationClient):
+        self.simulation = simulation
+
+    def _request(self, name: str, *args) -> Future:
+        result = Future()
+
+        def relay(future: Future):
+            error = future.exception()
+            if error is None:
+                result.set_result(future.result())
+            elif str(error) == ROOM_NOT_FOUND:
+                result.set_exception(KeyError(args[0] if args else None))
+            else:
+                result.set_exception(RoomError(str(error)))
+
+        self.simulation.channel.request('rooms', (name, args)).add_done_callback(relay)
+        return result
+
+    def _wait(self, name: str, *args):
+        # Création d'arène ou relevé des workers côté simulation, plus le trajet
+        timeout = config.SIMULATION_REQUEST_TIMEOUT + config.ROOM_REQUEST_TIMEOUT
+        return self._request(name, *args).result(timeout=timeout)
+
+    def rooms(self) -> List[dict]:
+        return self._wait('rooms')
+
+    def create(self, room_id: str):
+        self._wait('create', room_id)
+
+    def close(self, room_id: str) -> bool:
+        return self._wait('close', room_id)
+
+    def call(self, room_id: str, method: str, *args) -> Future:
+        return self._request('call', room_id, method, *args)
+
+    def state(self, room_id: str, if_none_match: Optional[str] = None) -> Future:
+        return self._request('state', room_id, if_none_match)
+
+    def stats(self, room_id: str) -> Future:
+        return self._request('stats', room_id)
+
+    def profile(self, room_id: str, options: dict) -> Future:
+        return self._request('profile', room_id, options)
+
+    def metrics(self) -> Dict[str, dict]:
+        return self._wait('metrics')
+
+    def stop(self):
+        """Rien à arrêter : les rooms vivent avec la simulation"""
+
+
+# ==================== LANCEMENT ====================
+
+if __name__ == "__main__":
+    import uvicorn
+
+    ctx = multiprocessing.get_context('spawn')
+    conn, child = ctx.Pipe()
+    process = ctx.Process(target=_simulation_main, args=(child,), name="simulation")
+    process.start()
+    child.close()
+    os.environ[ENV_VAR] = conn.recv()  # hérité par les workers uvicorn
+
+    print(f"🧠 Simulation dans le processus {process.pid}, {config.API_WORKERS} workers API")
+    try:
+        uvicorn.run(
+            "main:app",
+            host="0.0.0.0",
+            port=config.SERVER_PORT,
+            workers=config.API_WORKERS,
+            log_level="info"
+        )
+    finally:
+        conn.send('stop')
+        process.join(timeout=10.0)
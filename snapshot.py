@@ -0,0 +1,145 @@
+"""
+Snapshot d'état publié une fois par tick
+"""
+import json
+import time
+from dataclasses import dataclass, field
+from typing import Dict, Optional, Tuple
+
+from spatial import SpatialHash
+from codec import StringTable, encode_state, FORMAT_BINARY_DEFLATE
+import config
+
+
+def encode_json(data) -> bytes:
+    """JSON compact (sans espaces) en bytes"""
+    return json.dumps(data, separators=(',', ':')).encode()
+
+
+@dataclass(frozen=True)
+class StateSnapshot:
+    """État public figé d'un tick, déjà encodé en JSON"""
+    tick: int
+    body: bytes
+    etag: str
+    # Enregistrements publics par handle (public_id), pour les deltas
+    players: Dict[int, dict] = field(default_factory=dict, repr=False)
+    bullets: Dict[int, dict] = field(default_factory=dict, repr=False)
+    # Encodages alternatifs calculés à la demande {format: bytes}
+    encoded: Dict[str, bytes] = field(default_factory=dict, repr=False, compare=False)
+    # Grilles spatiales {'players'|'bullets': SpatialHash} construites à la demande (/me)
+    areas: Dict[str, SpatialHash] = field(default_factory=dict, repr=False, compare=False)
+
+    def matches(self, if_none_match: Optional[str]) -> bool:
+        """Vrai si l'en-tête If-None-Match du client désigne ce snapshot"""
+        if not if_none_match:
+            return False
+        tags = [tag.strip() for tag in if_none_match.split(',')]
+        return '*' in tags or self.etag in tags or f'W/{self.etag}' in tags
+
+
+class SnapshotBuilder:
+    """
+    Construit les snapshots : la partie statique (obstacles, map) est
+    encodée une seule fois, seuls joueurs et balles le sont à chaque tick.
+    """
+
+    def __init__(self, obstacles):
+        self.static = {
+            'obstacles': [o.to_dict() for o in obstacles],
+            'map': {
+                'width': config.MAP_WIDTH,
+                'height': config.MAP_HEIGHT
+            }
+        }
+        static = encode_json(self.static)
+        # '{"obstacles":[...],"map":{...}}' -> ',"obstacles":[...],"map":{...}}'
+        self._static_suffix = b',' + static[1:]
+        self.names = StringTable()  # usernames du format binaire
+        # Préfixe d'ETag propre à ce démarrage (les ticks repartent de 0)
+        self._epoch = format(int(time.time()), 'x')
+        self.latest: Optional[StateSnapshot] = None
+        self._far: Optional[Tuple[int, bytes]] = None  # (tick, vue lointaine encodée)
+
+    def publish(self, tick: int, players: Dict[int, dict], bullets: Dict[int, dict]) -> StateSnapshot:
+        """
+        Encoder et publier l'état du tick (enregistrements publics indexés
+        par handle). Si rien n'a changé depuis le snapshot précédent, il
+        est conservé (même ETag, 304 possibles).
+        """
+        body = (b'{"players":' + encode_json(list(players.values())) +
+                b',"bullets":' + encode_json(list(bullets.values())) +
+                self._static_suffix)
+        previous = self.latest
+        if previous is not None and previous.body == body:
+            return previous
+        self.latest = StateSnapshot(tick=tick, body=body, etag=f'"{self._epoch}-{tick}"',
+                                    players=players, bullets=bullets)
+        return self.latest
+
+    def binary(self, snapshot: StateSnapshot, fmt: str) -> bytes:
+        """Encodage binaire du snapshot, calculé une fois par format"""
+        body = snapshot.encoded.get(fmt)
+        if body is None:
+            body = encode_state(snapshot.tick, self.names, snapshot.players, snapshot.bullets,
+                                self.static, compress=(fmt == FORMAT_BINARY_DEFLATE))
+            snapshot.encoded[fmt] = body
+        return body
+
+    # ==================== VUES PAR JOUEUR (/me) ====================
+    
+    def view(self, snapshot: StateSnapshot, public_id: int, radius: float,
+             far: bool = False) -> Optional[bytes]:
+        """
+        Vue d'un joueur : son état et les entités à moins de `radius`.
+        Les grilles du snapshot sont partagées par toutes les requêtes du
+        tick, une vue ne coûte que le voisinage. Avec `far`, ajoute tous
+        les joueurs tels qu'au plus AOI_FAR_INTERVAL ticks plus tôt.
+        None si le joueur n'est pas (encore) dans le snapshot.
+        """
+        me = snapshot.players.get(public_id)
+        if me is None:
+            return None
+        
+        x, y = me['x'], me['y']
+        r2 = radius * radius
+        players_grid, bullets_grid = self._areas(snapshot)
+        
+        def near(grid):
+            return [
+                dict(record, id=key) for key, record in grid.query(x, y, radius)
+                if key != public_id and (record['x'] - x) ** 2 + (record['y'] - y) ** 2 <= r2
+            ]
+        
+        body = encode_json({
+            'tick': snapshot.tick,
+            'me': dict(me, id=public_id),
+            'radius': radius,
+            'players': near(players_grid),
+            'bullets': near(bullets_grid),
+        })
+        if far:
+            body = body[:-1] + b',"far":' + self._far_view(snapshot) + b'}'
+        return body
+    
+    def _areas(self, snapshot: StateSnapshot) -> Tuple[SpatialHash, SpatialHash]:
+        """Grilles spatiales du snapshot, construites une fois par tick"""
+        areas = snapshot.areas
+        if 'bullets' not in areas:
+            for name, records in (('players', snapshot.players), ('bullets', snapshot.bullets)):
+                grid = SpatialHash(config.AOI_CELL_SIZE)
+                for key, record in records.items():
+                    grid.insert(key, (key, record), record['x'], record['y'])
+                areas[name] = grid
+        return areas['players'], areas['bullets']
+    
+    def _far_view(self, snapshot: StateSnapshot) -> bytes:
+        """Tous les joueurs, réencodés au plus une fois tous les AOI_FAR_INTERVAL ticks"""
+        far = self._far
+        if far is None or snapshot.tick - far[0] >= config.AOI_FAR_INTERVAL or snapshot.tick < far[0]:
+            far = (snapshot.tick, encode_json({
+                'tick': snapshot.tick,
+                'players': [dict(r, id=k) for k, r in snapshot.players.items()],
+            }))
+            self._far = far
+        return far[1]
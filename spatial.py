@@ -0,0 +1,146 @@
+"""
+Index spatiaux - Grille uniforme (spatial hash) pour les requêtes de voisinage
+"""
+import math
+from typing import Dict, Hashable, Iterator, List, Tuple
+
+import config
+
+
+Cell = Tuple[int, int]
+
+
+class SpatialHash:
+    """
+    Grille uniforme d'entités ponctuelles, mise à jour incrémentalement.
+
+    Chaque entité est rangée dans la cellule qui contient son centre ;
+    une requête de rayon r parcourt uniquement les cellules recouvertes
+    par le carré englobant du cercle.
+    """
+
+    def __init__(self, cell_size: float = config.SPATIAL_CELL_SIZE):
+        self.cell_size = cell_size
+        self._inv_cell = 1.0 / cell_size
+        self._cells: Dict[Cell, Dict[Hashable, object]] = {}
+        self._entity_cells: Dict[Hashable, Cell] = {}
+
+    def __len__(self) -> int:
+        return len(self._entity_cells)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._entity_cells
+
+    def _cell_of(self, x: float, y: float) -> Cell:
+        return int(math.floor(x * self._inv_cell)), int(math.floor(y * self._inv_cell))
+
+    def insert(self, key: Hashable, entity, x: float, y: float):
+        """Ajouter une entité (ou la déplacer si déjà présente)"""
+        if key in self._entity_cells:
+            self.move(key, entity, x, y)
+            return
+        cell = self._cell_of(x, y)
+        self._cells.setdefault(cell, {})[key] = entity
+        self._entity_cells[key] = cell
+
+    def move(self, key: Hashable, entity, x: float, y: float):
+        """Mettre à jour la cellule d'une entité après déplacement"""
+        old_cell = self._entity_cells.get(key)
+        new_cell = self._cell_of(x, y)
+        if old_cell == new_cell:
+            return
+        if old_cell is not None:
+            self._discard_from_cell(old_cell, key)
+        self._cells.setdefault(new_cell, {})[key] = entity
+        self._entity_cells[key] = new_cell
+
+    def remove(self, key: Hashable):
+        """Retirer une entité (no-op si absente)"""
+        cell = self._entity_cells.pop(key, None)
+        if cell is not None:
+            self._discard_from_cell(cell, key)
+
+    def clear(self):
+        self._cells.clear()
+        self._entity_cells.clear()
+
+    def _discard_from_cell(self, cell: Cell, key: Hashable):
+        bucket = self._cells.get(cell)
+        if bucket is None:
+            return
+        bucket.pop(key, None)
+        if not bucket:
+            del self._cells[cell]
+
+    def query(self, x: float, y: float, radius: float) -> Iterator[object]:
+        """
+        Itérer sur les entités dont le centre peut se trouver à moins de
+        `radius` de (x, y). Filtre grossier : l'appelant fait le test exact.
+        """
+        inv = self._inv_cell
+        cx_min = int(math.floor((x - radius) * inv))
+        cx_max = int(math.floor((x + radius) * inv))
+        cy_min = int(math.floor((y - radius) * inv))
+        cy_max = int(math.floor((y + radius) * inv))
+        cells = self._cells
+        for cx in range(cx_min, cx_max + 1):
+            for cy in range(cy_min, cy_max + 1):
+                bucket = cells.get((cx, cy))
+                if bucket:
+                    yield from bucket.values()
+
+    def values(self) -> List[object]:
+        return [entity for bucket in self._cells.values() for entity in bucket.values()]
+
+
+class ObstacleGrid:
+    """
+    Index statique des obstacles, construit une seule fois.
+
+    Chaque obstacle est référencé dans toutes les cellules que recouvre
+    son AABB. Les cellules sont des tuples triés par obstacle_id, ce qui
+    conserve l'ordre de parcours de la liste d'origine.
+    """
+
+    def __init__(self, obstacles, cell_size: float = config.SPATIAL_CELL_SIZE):
+        self.cell_size = cell_size
+        self._inv_cell = 1.0 / cell_size
+        self._count = len(obstacles)
+
+        cells: Dict[Cell, list] = {}
+        for obs in sorted(obstacles, key=lambda o: o.obstacle_id):
+            cx_min, cy_min = self._cell_of(obs.x, obs.y)
+            cx_max, cy_max = self._cell_of(obs.x + obs.width, obs.y + obs.height)
+            for cx in range(cx_min, cx_max + 1):
+                for cy in range(cy_min, cy_max + 1):
+                    cells.setdefault((cx, cy), []).append(obs)
+        self._cells: Dict[Cell, Tuple] = {cell: tuple(obs) for cell, obs in cells.items()}
+
+    def __len__(self) -> int:
+        return self._count
+
+    def _cell_of(self, x: float, y: float) -> Cell:
+        return int(math.floor(x * self._inv_cell)), int(math.floor(y * self._inv_cell))
+
+    def query(self, x: float, y: float, radius: float) -> Tuple:
+        """
+        Obstacles dont l'AABB peut toucher le cercle (x, y, radius),
+        triés par obstacle_id. Filtre grossier : l'appelant fait le test exact.
+        """
+        inv = self._inv_cell
+        cx_min = int(math.floor((x - radius) * inv))
+        cx_max = int(math.floor((x + radius) * inv))
+        cy_min = int(math.floor((y - radius) * inv))
+        cy_max = int(math.floor((y + radius) * inv))
+        cells = self._cells
+
+        # Cas courant (petit rayon) : une seule cellule, pas de copie
+        if cx_min == cx_max and cy_min == cy_max:
+            return cells.get((cx_min, cy_min), ())
+
+        found = {}
+        for cx in range(cx_min, cx_max + 1):
+            for cy in range(cy_min, cy_max + 1):
+                for obs in cells.get((cx, cy), ()):
+                    found[obs.obstacle_id] = obs
+        return tuple(found[k] for k in sorted(found))
@@ -0,0 +1,164 @@
+"""
+Flux d'état temps réel (/ws/state) - keyframe puis deltas par tick
+"""
+import asyncio
+from typing import Dict, FrozenSet, Optional, Tuple
+
+from snapshot import StateSnapshot, encode_json
+from codec import StringTable, encode_frame, encode_delta, FORMAT_JSON, FORMAT_BINARY_DEFLATE
+import config
+
+
+def diff_entities(previous: Dict[int, dict], current: Dict[int, dict]) -> dict:
+    """Entités ajoutées, modifiées (enregistrement complet) et retirées"""
+    added = []
+    changed = []
+    for key, record in current.items():
+        old = previous.get(key)
+        if old is None:
+            added.append(dict(record, id=key))
+        elif old != record:
+            changed.append(dict(record, id=key))
+    removed = [key for key in previous if key not in current]
+    return {'added': added, 'changed': changed, 'removed': removed}
+
+
+class Subscriber:
+    """Une connexion au flux, avec sa file d'envoi bornée"""
+
+    def __init__(self, loop: asyncio.AbstractEventLoop, fmt: str = FORMAT_JSON):
+        self.loop = loop
+        self.fmt = fmt  # format des frames (cf. codec.FORMATS)
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=config.WS_SEND_QUEUE_SIZE)
+        self.last_tick: Optional[int] = None  # dernier tick mis en file
+        self.sent_static = False  # obstacles et map déjà envoyés
+        self.dropped_frames = 0
+
+
+class StateStream:
+    """
+    Diffuse les snapshots aux abonnés WebSocket.
+
+    Le delta entre deux snapshots diffusés est calculé et encodé une seule
+    fois par format, dans le thread du game loop, puis remis à chaque abonné dans sa
+    boucle asyncio. Un abonné trop lent (file pleine) perd ses frames en
+    attente et repart sur une keyframe : un delta n'est jamais appliqué
+    sur une base manquante.
+    """
+
+    def __init__(self, static: dict, names: StringTable):
+        self.static = static
+        self.names = names
+        # Remplacé (jamais modifié sur place) : lisible depuis le game loop
+        self._subscribers: FrozenSet[Subscriber] = frozenset()
+        self._previous: Optional[StateSnapshot] = None
+        self._keyframes: Dict[Tuple[int, str, bool], bytes] = {}
+
+    @property
+    def has_subscribers(self) -> bool:
+        return bool(self._subscribers)
+
+    def subscribe(self, loop: asyncio.AbstractEventLoop, snapshot: StateSnapshot,
+                  fmt: str = FORMAT_JSON) -> Subscriber:
+        """Nouvel abonné (depuis sa boucle asyncio), servi d'une keyframe immédiate"""
+        subscriber = Subscriber(loop, fmt)
+        self._deliver(subscriber, snapshot, None, None)
+        self._subscribers = self._subscribers | {subscriber}
+        # Premier abonné : la frame suivante est un delta depuis cette keyframe,
+        # pas une seconde keyframe. Sans risque si publish passe entre-temps :
+        # un delta n'est remis que sur sa base (cf. _deliver)
+        if self._previous is None:
+            self._previous = snapshot
+        return subscriber
+
+    def unsubscribe(self, subscriber: Subscriber):
+        self._subscribers = self._subscribers - {subscriber}
+
+    # ==================== THREAD DU GAME LOOP ====================
+
+    def publish(self, snapshot: StateSnapshot, tick: int):
+        """Diffuser un snapshot (appelé par le game loop à chaque tick)"""
+        if not self._subscribers:
+            self._previous = None
+            return
+        if tick % config.STREAM_TICK_INTERVAL:
+            return
+        previous = self._previous
+        if previous is snapshot:
+            return  # rien n'a changé
+
+        subscribers = self._subscribers
+        deltas: Dict[str, bytes] = {}
+        if previous is not None:
+            players = diff_entities(previous.players, snapshot.players)
+            bullets = diff_entities(previous.bullets, snapshot.bullets)
+            for fmt in {s.fmt for s in subscribers}:
+                deltas[fmt] = self._encode_delta(fmt, snapshot.tick, previous.tick, players, bullets)
+        self._previous = snapshot
+
+        base = previous.tick if previous is not None else None
+        for subscriber in subscribers:
+            try:
+                subscriber.loop.call_soon_threadsafe(self._deliver, subscriber, snapshot, base,
+                                                     deltas.get(subscriber.fmt))
+            except RuntimeError:
+                # Boucle asyncio fermée : abonné mort
+                self.unsubscribe(subscriber)
+
+    def _encode_delta(self, fmt: str, tick: int, base: int, players: dict, bullets: dict) -> bytes:
+        if fmt == FORMAT_JSON:
+            return encode_json({
+                'type': 'delta',
+                'tick': tick,
+                'base': base,
+                'players': players,
+                'bullets': bullets,
+            })
+        return encode_delta(tick, base, self.names, players, bullets,
+                            compress=(fmt == FORMAT_BINARY_DEFLATE))
+
+    # ==================== BOUCLE ASYNCIO ====================
+
+    def _deliver(self, subscriber: Subscriber, snapshot: StateSnapshot,
+                 base: Optional[int], delta: Optional[bytes]):
+        queue = subscriber.queue
+        if delta is not None and subscriber.last_tick == base and not queue.full():
+            frame = delta
+        else:
+            # Premier envoi, base manquante ou consommateur trop lent
+            while not queue.empty():
+                queue.get_nowait()
+                subscriber.dropped_frames += 1
+            frame = self._keyframe(snapshot, subscriber.fmt, with_static=not subscriber.sent_static)
+            subscriber.sent_static = True
+        queue.put_nowait(frame)
+        subscriber.last_tick = snapshot.tick
+
+    def _keyframe(self, snapshot: StateSnapshot, fmt: str, with_static: bool) -> bytes:
+        """Keyframe encodée une fois par snapshot et format (avec ou sans obstacles)"""
+        key = (snapshot.tick, fmt, with_static)
+        frame = self._keyframes.get(key)
+        if frame is None:
+            if self._keyframes and next(iter(self._keyframes))[0] != snapshot.tick:
+                self._keyframes.clear()
+            players = [dict(r, id=k) for k, r in snapshot.players.items()]
+            bullets = [dict(r, id=k) for k, r in snapshot.bullets.items()]
+            if fmt == FORMAT_JSON:
+                data = {
+                    'type': 'keyframe',
+                    'tick': snapshot.tick,
+                    'players': players,
+                    'bullets': bullets,
+                }
+                if with_static:
+                    data.update(self.static)
+                frame = encode_json(data)
+            else:
+                frame = encode_frame(
+                    snapshot.tick, self.names, players=players, bullets=bullets,
+                    announce=[p['username'] for p in players], keyframe=True,
+                    static=self.static if with_static else None,
+                    compress=(fmt == FORMAT_BINARY_DEFLATE)
+                )
+            self._keyframes[key] = frame
+        return frame
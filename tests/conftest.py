@@ -0,0 +1,49 @@
+"""
+Fixtures communes : moteurs pas à pas (VirtualClock), sans persistance
+"""
+import pytest
+
+import config
+from bullet_store import ArrayBulletStore
+from engine import GameEngine
+from scheduler import VirtualClock
+from spatial import ObstacleGrid
+
+STORES = ('dict', 'numpy')
+
+
+@pytest.fixture(params=STORES)
+def store(request, monkeypatch):
+    """Stockage des balles (config.BULLET_STORE) : chaque test tourne sur les deux"""
+    if request.param == 'numpy':
+        pytest.importorskip('numpy')
+    monkeypatch.setattr(config, 'BULLET_STORE', request.param)
+    return request.param
+
+
+@pytest.fixture
+def make_engine():
+    """Moteur headless (VirtualClock) ; `obstacles` remplace les obstacles générés"""
+    def make(obstacles=None, seed=1, **kwargs):
+        engine = GameEngine(stats_file=None, seed=seed, clock=VirtualClock(),
+                            obstacle_count=0 if obstacles is not None else config.OBSTACLE_COUNT,
+                            record_dir=None, **kwargs)
+        if obstacles is not None:
+            engine.obstacles = list(obstacles)
+            engine.obstacle_index = ObstacleGrid(engine.obstacles)
+            if engine.bullet_store is not None:
+                engine.bullet_store = ArrayBulletStore(engine.obstacles, clock=engine.clock)
+        return engine
+    return make
+
+
+@pytest.fixture
+def api(monkeypatch):
+    """Client HTTP de main.app sur un moteur neuf (sans stats persistées), game loop démarré"""
+    from fastapi.testclient import TestClient
+    import main
+
+    monkeypatch.setattr(main, 'game', GameEngine(stats_file=None, seed=1, record_dir=None))
+    monkeypatch.setattr(main, 'ip_limiter', main.TokenBucketLimiter(1_000_000))
+    with TestClient(main.app) as client:
+        yield client
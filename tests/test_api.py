@@ -0,0 +1,80 @@
+"""
+API HTTP (main.app) sur un moteur neuf, game loop démarré
+"""
+import time
+
+import main
+from ratelimit import TokenBucketLimiter
+
+
+def join(api, username: str) -> str:
+    response = api.post('/join', json={'username': username})
+    assert response.status_code == 200
+    return response.json()['player_id']
+
+
+def test_actions_entries_share_one_shape(api, monkeypatch):
+    alice = join(api, 'alice')
+    bob = join(api, 'bob')
+    # Un seul jeton par joueur : la seconde entrée de bob est limitée
+    monkeypatch.setattr(main, 'player_limiter', TokenBucketLimiter(0.001, 1))
+
+    response = api.post('/actions', json=[
+        {'player_id': alice, 'move': {'direction_x': 1.0, 'direction_y': 0.0}},
+        {'player_id': bob, 'shoot': {'direction_x': 0.0, 'direction_y': 1.0}},
+        {'player_id': bob, 'move': {'direction_x': 0.0, 'direction_y': 1.0},
+         'shoot': {'direction_x': 1.0, 'direction_y': 0.0}},
+    ])
+
+    assert response.status_code == 200
+    results = response.json()['results']
+    assert [set(entry) for entry in results] == [{'player_id', 'move', 'shoot'}] * 3
+    # Appliquées : résultats de player_move / player_shoot (cooldowns compris)
+    assert 'success' in results[0]['move'] and results[0]['shoot'] is None
+    assert results[1]['move'] is None and 'success' in results[1]['shoot']
+    limited = {'success': False, 'error': main.RATE_LIMIT_ERROR}
+    assert results[2] == {'player_id': bob, 'move': limited, 'shoot': limited}
+
+
+def test_player_rejections_counted_where_the_limiter_refuses(api, monkeypatch):
+    alice = join(api, 'alice')
+    monkeypatch.setattr(main, 'player_limiter', TokenBucketLimiter(0.001, 1))
+    metrics = main.request_metrics
+    before = metrics.rate_limited.get('player', 0)
+
+    move = {'direction_x': 1.0, 'direction_y': 0.0}
+    assert api.post('/move', json={'player_id': alice, **move}).status_code != 429  # 400 possible : cooldown
+    assert api.post('/move', json={'player_id': alice, **move}).status_code == 429
+    assert api.get('/me', params={'player_id': alice}).status_code == 429  # threadpool
+    # Lot /actions : réponse 200, deux entrées refusées
+    assert api.post('/actions', json=[{'player_id': alice, 'move': move}] * 2).status_code == 200
+    # Limiteur désactivé : rien à compter
+    monkeypatch.setattr(main, 'player_limiter', None)
+    assert api.post('/move', json={'player_id': alice, **move}).status_code != 429
+
+    assert metrics.rate_limited['player'] - before == 4
+
+
+def test_state_etag_answers_304_until_the_state_changes(api):
+    first = api.get('/state')
+    etag = first.headers['etag']
+    assert first.status_code == 200
+
+    # Partie vide : le game loop republie le même snapshot, même ETag
+    for if_none_match in (etag, f'W/{etag}', f'"other", {etag}', '*'):
+        response = api.get('/state', headers={'If-None-Match': if_none_match})
+        assert response.status_code == 304
+        assert response.headers['etag'] == etag and response.content == b''
+    assert api.get('/state', params={'format': 'binary'},
+                   headers={'If-None-Match': etag}).status_code == 304
+
+    join(api, 'alice')
+    # /join répond pendant le tick, le snapshot est publié à sa fin
+    deadline = time.monotonic() + 2.0
+    response = api.get('/state', headers={'If-None-Match': etag})
+    while response.status_code == 304 and time.monotonic() < deadline:
+        time.sleep(0.01)
+        response = api.get('/state', headers={'If-None-Match': etag})
+    assert response.status_code == 200
+    assert response.headers['etag'] != etag
+    assert [p['username'] for p in response.json()['players']] == ['alice']
@@ -0,0 +1,160 @@
+"""
+Balles : tests balayés (pas d'effet tunnel) et mêmes règles d'impact
+dans les deux stockages (pool de Bullet et tableaux NumPy)
+"""
+import pytest
+
+import benchmark
+import config
+from bullet_store import BulletPool
+from entities import Obstacle
+from scheduler import VirtualClock
+
+FAST = 600.0  # unités/seconde : 10 unités par tick, bien plus qu'un joueur ou un mur
+
+
+def test_pool_reuses_released_handles():
+    clock = VirtualClock()
+    pool = BulletPool(capacity=2, clock=clock)
+    first = pool.spawn('alice', 1.0, 1.0, 1.0, 0.0, 10, public_id=1)
+    second = pool.spawn('alice', 2.0, 2.0, 1.0, 0.0, 10, public_id=2)
+    assert (first.entity_id, second.entity_id) == (0, 1)
+    first.bounces = 2
+    pool.release(first)
+
+    clock.advance(1.0)
+    reused = pool.spawn('bob', 3.0, 3.0, 0.0, 1.0, 10, public_id=3)
+    extra = pool.spawn('bob', 4.0, 4.0, 0.0, 1.0, 10, public_id=4)  # pool plein : agrandi
+
+    assert reused is first and reused.entity_id == 0
+    assert (reused.owner_id, reused.bounces, reused.created_at, reused.public_id) == ('bob', 0, 1.0, 3)
+    assert extra.entity_id == 2
+    assert [b.entity_id for b in pool] == [1, 0, 2]  # ordre de tir
+    assert pool.get(0) is reused and len(pool) == 3
+
+
+def test_pool_counts_live_bullets_per_owner():
+    pool = BulletPool(capacity=4)
+    a1 = pool.spawn('alice', 0.0, 0.0, 1.0, 0.0, 10, public_id=1)
+    pool.spawn('alice', 0.0, 0.0, 1.0, 0.0, 10, public_id=2)
+    b1 = pool.spawn('bob', 0.0, 0.0, 1.0, 0.0, 10, public_id=3)
+
+    pool.release(a1)
+    pool.release(a1)  # déjà libérée : sans effet
+    pool.release(b1)
+
+    assert pool.count_owned('alice') == 1
+    assert pool.count_owned('bob') == 0
+    assert len(pool) == 1
+
+
+def test_bullet_limit_per_player(store, make_engine):
+    engine = make_engine(obstacles=[])
+    shooter = engine._add_player('shooter', 50.0, 50.0)
+    for _ in range(config.MAX_BULLETS_PER_PLAYER):
+        shooter.last_shoot = float('-inf')
+        assert engine.player_shoot(shooter.entity_id, 1.0, 0.0)['success']
+    shooter.last_shoot = float('-inf')
+    assert engine.player_shoot(shooter.entity_id, 1.0, 0.0)['error'] == 'Too many bullets'
+
+    # Sorties de la map : les balles rendent leur place
+    engine.step(int(50.0 / config.BULLET_SPEED / config.TICK_DURATION) + 2)
+    assert engine.bullet_count() == 0
+    assert engine.player_shoot(shooter.entity_id, 1.0, 0.0)['success']
+
+
+
+def test_shot_bullet_id_is_its_snapshot_id_and_never_reused(store, make_engine):
+    engine = make_engine(obstacles=[])
+    shooter = engine._add_player('shooter', 50.0, 50.0)
+    seen = set()
+    for _ in range(3):
+        # Balles sorties de la map entre deux salves : leurs places sont recyclées
+        volley = set()
+        for _ in range(config.MAX_BULLETS_PER_PLAYER):
+            shooter.last_shoot = float('-inf')
+            volley.add(engine.player_shoot(shooter.entity_id, 1.0, 0.0)['bullet_id'])
+        assert len(volley) == config.MAX_BULLETS_PER_PLAYER and not volley & seen
+        seen |= volley
+        engine.step()
+        assert set(engine.snapshot.bullets) == volley
+        engine.step(int(50.0 / config.BULLET_SPEED / config.TICK_DURATION) + 2)
+        assert engine.bullet_count() == 0
+
+
+def test_fast_bullet_hits_player_instead_of_tunnelling(store, make_engine):
+    engine = make_engine(obstacles=[])
+    shooter = engine._add_player('shooter', 10.0, 50.0)
+    target = engine._add_player('target', 15.0, 50.0)
+    engine._spawn_bullet(shooter.entity_id, 11.0, 50.0, FAST, 0.0)
+
+    engine.step()
+
+    assert target.health == config.PLAYER_MAX_HEALTH - config.BULLET_DAMAGE
+    assert engine.bullet_count() == 0
+
+
+def test_fast_bullet_bounces_off_thin_wall(store, make_engine):
+    engine = make_engine(obstacles=[Obstacle(0, 15.0, 40.0, 0.1, 20.0)])
+    shooter = engine._add_player('shooter', 10.0, 50.0)
+    behind = engine._add_player('behind', 18.0, 50.0)
+    engine._spawn_bullet(shooter.entity_id, 11.0, 50.0, FAST, 0.0)
+
+    engine.step()
+
+    # Rebond au contact du mur, puis le reste du trajet du tick en arrière
+    contact = 15.0 - config.BULLET_RADIUS
+    assert behind.health == config.PLAYER_MAX_HEALTH
+    [bullet] = engine.snapshot.bullets.values()
+    assert bullet['vx'] == -FAST
+    assert bullet['x'] == pytest.approx(contact - (10.0 - (contact - 11.0)), abs=0.01)
+
+
+def test_bullet_keeps_flying_past_player_killed_earlier_in_tick(store, make_engine):
+    engine = make_engine(obstacles=[])
+    first = engine._add_player('first', 10.0, 50.0)
+    second = engine._add_player('second', 10.0, 52.0)
+    target = engine._add_player('target', 20.0, 51.0)
+    behind = engine._add_player('behind', 24.0, 51.0)
+    target.health = config.BULLET_DAMAGE
+    # Deux balles sur la même ligne : la première tirée tue, la seconde continue
+    engine._spawn_bullet(first.entity_id, 17.0, 51.0, FAST, 0.0)
+    engine._spawn_bullet(second.entity_id, 16.0, 51.0, FAST, 0.0)
+
+    engine.step()
+
+    assert target.entity_id not in engine.players
+    assert first.kills == 1 and second.kills == 0
+    assert behind.health == config.PLAYER_MAX_HEALTH - config.BULLET_DAMAGE
+    assert engine.bullet_count() == 0
+
+
+def test_simultaneous_contact_goes_to_lowest_public_id(store, make_engine):
+    engine = make_engine(obstacles=[])
+    shooter = engine._add_player('shooter', 10.0, 50.0)
+    low = engine._add_player('low', 15.0, 49.5)
+    high = engine._add_player('high', 15.0, 50.5)  # même distance au trajet
+    engine._spawn_bullet(shooter.entity_id, 11.0, 50.0, FAST, 0.0)
+
+    engine.step()
+
+    assert low.health == config.PLAYER_MAX_HEALTH - config.BULLET_DAMAGE
+    assert high.health == config.PLAYER_MAX_HEALTH
+
+
+@pytest.mark.parametrize('scenario', [
+    benchmark.Scenario('hunter-100', 100),
+    benchmark.Scenario('hunter-100-obstacles-200', 100, obstacles=200),
+    benchmark.Scenario('idle-100-bullets-1k', 100, bullets=1_000, policy='idle'),
+], ids=lambda scenario: scenario.name)
+def test_stores_play_the_same_game(scenario, monkeypatch):
+    pytest.importorskip('numpy')
+    finals = {}
+    for store in ('dict', 'numpy'):
+        monkeypatch.setattr(config, 'BULLET_STORE', store)
+        finals[store] = benchmark.run_scenario(scenario, ticks=300, warmup=0, seed=7)['final']
+
+    # digest : sha1 de snapshot.body (positions, santé, balles)
+    assert finals['dict']['digest'] == finals['numpy']['digest']
+    assert finals['dict'] == finals['numpy']
+    assert finals['dict']['kills'] > 0
@@ -0,0 +1,73 @@
+"""
+Format binaire : aller-retour encodage / FrameDecoder (keyframe, delta, compression)
+"""
+import json
+
+import pytest
+
+import config
+from codec import FORMAT_BINARY, FORMAT_BINARY_DEFLATE, FrameDecoder, encode_delta
+from stream import diff_entities
+
+STEP = config.MAP_WIDTH / 65535  # pas de quantification des coordonnées
+
+
+def assert_records_match(decoded, expected):
+    """Enregistrements décodés (avec 'id') contre {id: enregistrement public}"""
+    assert {r['id'] for r in decoded} == set(expected)
+    for record in decoded:
+        original = expected[record['id']]
+        for key, value in original.items():
+            if isinstance(value, float):
+                assert record[key] == pytest.approx(value, abs=STEP)
+            else:
+                assert record[key] == value
+
+
+@pytest.fixture
+def engine(make_engine):
+    engine = make_engine(seed=3)
+    shooters = [engine._add_player(name, 10.0 + 20 * i, 30.0 + 5 * i)
+                for i, name in enumerate(['alice', 'bob', 'élodie'])]
+    for i, player in enumerate(shooters):
+        engine._spawn_bullet(player.entity_id, player.x, player.y, 15.0 - 10 * i, 7.5)
+    engine.step()
+    return engine
+
+
+@pytest.mark.parametrize('fmt', [FORMAT_BINARY, FORMAT_BINARY_DEFLATE])
+def test_keyframe_round_trip(engine, fmt):
+    snapshot = engine.snapshot
+
+    frame = FrameDecoder().decode(engine.snapshots.binary(snapshot, fmt))
+
+    assert frame['type'] == 'keyframe' and frame['tick'] == snapshot.tick
+    assert_records_match(frame['players'], snapshot.players)
+    assert_records_match(frame['bullets'], snapshot.bullets)
+    static = json.loads(snapshot.body)
+    assert frame['map'] == static['map']
+    assert_records_match(frame['obstacles'], {o['id']: o for o in static['obstacles']})
+
+
+def test_delta_applied_on_keyframe_gives_current_state(engine):
+    decoder = FrameDecoder()
+    base = engine.snapshot
+    state = {r['id']: r for r in decoder.decode(engine.snapshots.binary(base, FORMAT_BINARY))['players']}
+    leaving = next(iter(base.players))
+    engine._remove_player(next(p for p in engine.players.values() if p.public_id == leaving).entity_id)
+    engine._add_player('zoé', 70.0, 70.0)
+    engine.step()
+    current = engine.snapshot
+
+    payload = encode_delta(current.tick, base.tick, engine.snapshots.names,
+                           diff_entities(base.players, current.players),
+                           diff_entities(base.bullets, current.bullets), compress=True)
+    delta = decoder.decode(payload)
+
+    assert (delta['type'], delta['tick'], delta['base']) == ('delta', current.tick, base.tick)
+    assert delta['players']['removed'] == [leaving]
+    for record in delta['players']['changed']:
+        state[record['id']] = record
+    for player_id in delta['players']['removed']:
+        del state[player_id]
+    assert_records_match(list(state.values()), current.players)
@@ -0,0 +1,72 @@
+"""
+Moteur pas à pas (GameEngine.step sous VirtualClock) : commandes au tick, horloge, reproductibilité
+"""
+import pytest
+
+import config
+
+
+def play(engine, ticks: int = 90):
+    """Deux joueurs qui tirent et bougent à chaque tick, via les commandes en file"""
+    alice = engine.submit(engine.join_game, 'alice')
+    bob = engine.submit(engine.join_game, 'bob')
+    engine.step()
+    alice, bob = alice.result()['player_id'], bob.result()['player_id']
+    for tick in range(ticks):
+        engine.submit(engine.player_move, alice, 1.0, (tick % 7) - 3.0)
+        engine.submit(engine.player_shoot, alice, -1.0, 0.5)
+        engine.submit(engine.player_shoot, bob, 1.0, -0.5)
+        engine.step()
+    return engine.snapshot
+
+
+def test_commands_run_at_next_step(make_engine):
+    engine = make_engine()
+    future = engine.submit(engine.join_game, 'alice')
+    assert not future.done()
+
+    engine.step()
+
+    assert future.result()['success']
+    assert engine.tick == 1
+    assert [p['username'] for p in engine.snapshot.players.values()] == ['alice']
+
+
+def test_step_advances_virtual_clock(make_engine):
+    engine = make_engine()
+    start = engine.clock()
+
+    engine.step(30)
+
+    assert engine.tick == 30
+    assert engine.clock() == pytest.approx(start + 30 * config.TICK_DURATION)
+
+
+def test_cooldowns_follow_virtual_time(make_engine):
+    engine = make_engine()
+    join = engine.submit(engine.join_game, 'alice')
+    engine.step()
+    player_id = join.result()['player_id']
+    engine.step(int(config.SHOOT_RATE_LIMIT / config.TICK_DURATION) + 1)
+
+    first = engine.submit(engine.player_shoot, player_id, 1.0, 0.0)
+    second = engine.submit(engine.player_shoot, player_id, 1.0, 0.0)
+    engine.step()
+
+    assert first.result()['success']
+    assert second.result()['error'].startswith('Cooldown')
+
+
+def test_same_seed_and_commands_replay_identically(store, make_engine):
+    first = play(make_engine(seed=42))
+    second = play(make_engine(seed=42))
+
+    assert first.body == second.body
+    assert first.bullets  # la partie a bien tiré
+
+
+def test_step_refused_while_game_loop_runs(make_engine):
+    engine = make_engine()
+    engine.running = True
+    with pytest.raises(RuntimeError):
+        engine.step()
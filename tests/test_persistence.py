@@ -0,0 +1,87 @@
+"""
+Journal des scores du tournoi : rejeu, compaction hors du thread appelant, reprise après crash
+"""
+import json
+import os
+
+import pytest
+
+from persistence import Journal, JournalError
+
+
+@pytest.fixture
+def paths(tmp_path):
+    return str(tmp_path / "scores.journal"), str(tmp_path / "scores.json")
+
+
+def test_load_replays_events_after_snapshot(paths):
+    journal = Journal(*paths)
+    assert journal.load() == ({}, [])
+    journal.append({'victim': 'bob', 'killer': 'alice'})
+    journal.append({'victim': 'alice', 'killer': None})
+    journal.close()
+
+    state, events = Journal(*paths).load()
+    assert state == {}
+    assert [(e['seq'], e['victim']) for e in events] == [(1, 'bob'), (2, 'alice')]
+
+
+def test_compact_writes_snapshot_in_background_and_empties_journal(paths):
+    journal = Journal(*paths)
+    journal.load()
+    journal.append({'victim': 'bob', 'killer': 'alice'})
+    assert journal.compact({'bob': {'kills': 0, 'deaths': 1}})
+    assert not journal.compact({})  # précédente pas encore écrite
+    journal.append({'victim': 'carol', 'killer': 'bob'})
+    journal.close()  # termine la compaction en cours
+
+    assert not os.path.exists(journal.sealed_path)
+    with open(paths[1]) as f:
+        assert json.load(f) == {'seq': 1, 'state': {'bob': {'kills': 0, 'deaths': 1}}}
+    state, events = Journal(*paths).load()
+    assert state == {'bob': {'kills': 0, 'deaths': 1}}
+    assert [e['seq'] for e in events] == [2]
+
+
+def test_interrupted_compaction_keeps_sealed_events(paths):
+    journal = Journal(*paths)
+    journal.load()
+    journal.append({'victim': 'bob', 'killer': None})
+    journal.compact({'bob': {'kills': 0, 'deaths': 1}})
+    journal.append({'victim': 'carol', 'killer': None})
+    # Arrêt brutal avant l'écriture du snapshot
+    journal.writer.path = None
+    journal.close()
+
+    reloaded = Journal(*paths)
+    state, events = reloaded.load()
+    assert state == {}
+    assert [e['victim'] for e in events] == ['bob', 'carol']
+    assert not os.path.exists(reloaded.sealed_path)
+    reloaded.append({'victim': 'dave', 'killer': None})
+    assert reloaded.seq == 3
+    reloaded.close()
+
+
+def test_truncated_last_line_is_dropped(paths):
+    journal = Journal(*paths)
+    journal.load()
+    journal.append({'victim': 'bob', 'killer': None})
+    journal.close()
+    with open(paths[0], 'a') as f:
+        f.write('{"victim": "ca')
+
+    reloaded = Journal(*paths)
+    _, events = reloaded.load()
+    reloaded.append({'victim': 'carol', 'killer': None})
+    reloaded.close()
+
+    _, events = Journal(*paths).load()
+    assert [e['victim'] for e in events] == ['bob', 'carol']
+
+
+def test_corrupt_snapshot_refuses_to_start(paths):
+    with open(paths[1], 'w') as f:
+        f.write('{"seq": 3, "sta')
+    with pytest.raises(JournalError):
+        Journal(*paths).load()
@@ -0,0 +1,51 @@
+"""
+Seaux à jetons par clé : rafale, recharge, éviction LRU
+"""
+from ratelimit import TokenBucketLimiter
+from scheduler import VirtualClock
+
+
+def test_burst_then_refill_at_rate():
+    clock = VirtualClock()
+    limiter = TokenBucketLimiter(rate=10, burst=3, clock=clock)
+
+    assert [limiter.check('ip') for _ in range(4)] == [True, True, True, False]
+    clock.advance(0.1)  # un jeton
+    assert [limiter.check('ip') for _ in range(2)] == [True, False]
+    clock.advance(10.0)  # jamais plus que la rafale
+    assert [limiter.check('ip') for _ in range(4)] == [True, True, True, False]
+
+
+def test_keys_are_independent():
+    limiter = TokenBucketLimiter(rate=1, burst=1, clock=VirtualClock())
+
+    assert limiter.check('alice')
+    assert not limiter.check('alice')
+    assert limiter.check('bob')
+
+
+def test_least_recently_used_keys_evicted_beyond_max_keys():
+    clock = VirtualClock()
+    limiter = TokenBucketLimiter(rate=1, burst=1, max_keys=2, clock=clock)
+    limiter.check('a')
+    limiter.check('b')
+    limiter.check('a')  # 'a' redevient la plus récente
+
+    limiter.check('c')
+
+    assert len(limiter) == 2
+    assert limiter.check('b')  # oubliée : seau plein
+    assert not limiter.check('c')
+
+
+def test_refilled_buckets_are_forgotten():
+    clock = VirtualClock()
+    limiter = TokenBucketLimiter(rate=10, burst=5, clock=clock)
+    for key in range(100):
+        limiter.check(key)
+    assert len(limiter) == 100
+
+    clock.advance(0.5)  # rafale rechargée
+    limiter.check('new')
+
+    assert len(limiter) == 1
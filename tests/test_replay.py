@@ -0,0 +1,59 @@
+"""
+Enregistrement d'une partie en temps réel (game loop) puis rejeu pas à pas
+"""
+import glob
+import time
+
+import pytest
+
+import config
+from engine import GameEngine
+from recording import OP_CHECK, read_recording
+from replay import replay
+
+
+@pytest.fixture(scope='module')
+def recording(tmp_path_factory):
+    """Partie courte enregistrée (≈ 1,3 s, deux empreintes au moins) : joueurs qui bougent et tirent"""
+    directory = tmp_path_factory.mktemp('recordings')
+    engine = GameEngine(stats_file=None, seed=42, record_dir=str(directory))
+    engine.start()
+    try:
+        ids = [engine.call('join_game', name).result(timeout=2)['player_id']
+               for name in ('alice', 'bob', 'charlie')]
+        deadline = time.monotonic() + 1.3
+        turn = 0
+        while time.monotonic() < deadline:
+            for i, player_id in enumerate(ids):
+                direction = ((turn + i) % 3 - 1.0, 1.0 if (turn + i) % 2 else -1.0)
+                engine.call('player_move', player_id, *direction)
+                engine.call('player_shoot', player_id, -direction[0], -direction[1])
+            turn += 1
+            time.sleep(0.02)
+        engine.call('leave_game', ids[0]).result(timeout=2)
+    finally:
+        engine.stop()
+    path, = glob.glob(str(directory / '*.rec'))
+    return path
+
+
+def test_replay_matches_every_recorded_digest(recording):
+    checks = sum(1 for op, *_ in read_recording(recording).events if op == OP_CHECK)
+    assert checks >= 2
+
+    report = replay(recording)
+
+    assert report['divergence'] is None
+    assert report['rejected'] == 0
+    assert report['checks'] == checks
+    assert not report['truncated']
+    assert report['final']['shots'] > 0 and report['final']['players'] == 2
+
+
+def test_replay_reports_where_a_changed_engine_diverges(recording, monkeypatch):
+    monkeypatch.setattr(config, 'BULLET_SPEED', config.BULLET_SPEED * 2)
+
+    report = replay(recording)
+
+    assert report['divergence'] is not None
+    assert report['divergence']['check'] == report['checks']
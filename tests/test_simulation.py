@@ -0,0 +1,50 @@
+"""
+Publication des snapshots en mémoire partagée (SimulationServer) et relecture côté worker API
+"""
+import pytest
+
+from simulation import SharedSnapshot, SimulationClient, SimulationServer
+
+
+@pytest.fixture
+def published(make_engine):
+    """(moteur pas à pas, serveur qui publie ses ticks, client qui lit la mémoire partagée)"""
+    engine = make_engine(obstacles=[])
+    server = SimulationServer(engine)
+    engine.exporter = server
+    client = SimulationClient('127.0.0.1:0:00')
+    client.shared = SharedSnapshot.attach(server.shared.name, server.shared.capacity)
+    yield engine, server, client
+    client.shared.close()
+    server.stop()
+
+
+def test_unchanged_snapshot_is_not_written_again(published):
+    engine, server, _ = published
+    engine.step(3)
+    assert server.shared.seq == 1  # partie vide : même snapshot à chaque tick
+
+    engine._add_player('alice', 20.0, 20.0)
+    engine.step(3)
+    assert server.shared.seq == 2
+
+    player = engine._add_player('bob', 40.0, 40.0)
+    engine._spawn_bullet(player.entity_id, 40.0, 40.0, 15.0, 0.0)
+    engine.step(3)
+    assert server.shared.seq == 5  # la balle bouge : un snapshot par tick
+
+
+def test_reader_rebuilds_records_from_the_json_body(published):
+    engine, _, client = published
+    alice = engine._add_player('alice', 20.0, 20.0)
+    elodie = engine._add_player('élodie', 40.0, 40.0)
+    engine._spawn_bullet(elodie.entity_id, 40.0, 40.0, 15.0, 7.5)
+    engine._spawn_bullet(alice.entity_id, 20.0, 20.0, -3.0, 15.0)
+    engine.step()
+
+    snapshot = client.snapshot
+    assert (snapshot.tick, snapshot.etag, snapshot.body) == (engine.snapshot.tick, engine.snapshot.etag,
+                                                              engine.snapshot.body)
+    assert snapshot.players == engine.snapshot.players
+    assert snapshot.bullets == engine.snapshot.bullets
+    assert client._current()[1] == {alice.entity_id: alice.public_id, elodie.entity_id: elodie.public_id}
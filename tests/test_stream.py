@@ -0,0 +1,38 @@
+"""
+Flux /ws/state : keyframe à l'abonnement, puis deltas
+"""
+import asyncio
+import json
+
+import config
+
+
+def frames_after_subscribe(engine, changes):
+    """Frames JSON reçues par un abonné, `changes(engine)` appliqué avant chaque frame"""
+    loop = asyncio.new_event_loop()
+    try:
+        subscriber = engine.stream.subscribe(loop, engine.snapshot)
+        for change in changes:
+            change(engine)
+            engine.step(config.STREAM_TICK_INTERVAL)
+        loop.run_until_complete(asyncio.sleep(0))  # callbacks remis par le game loop
+        return [json.loads(subscriber.queue.get_nowait()) for _ in range(subscriber.queue.qsize())]
+    finally:
+        loop.close()
+
+
+def test_first_subscriber_gets_keyframe_then_deltas(make_engine):
+    engine = make_engine(obstacles=[])
+    engine._add_player('alice', 50.0, 50.0)
+    engine.step()
+
+    frames = frames_after_subscribe(engine, [
+        lambda e: e._add_player('bob', 20.0, 20.0),
+        lambda e: e._add_player('carol', 80.0, 80.0),
+    ])
+
+    assert [f['type'] for f in frames] == ['keyframe', 'delta', 'delta']
+    assert 'obstacles' in frames[0]
+    assert frames[1]['base'] == frames[0]['tick']
+    assert frames[2]['base'] == frames[1]['tick']
+    assert [p['username'] for p in frames[1]['players']['added']] == ['bob']
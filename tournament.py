@@ -6,19 +6,21 @@ Ce script remplace main.py pour activer le mode tournoi.
 Il patch le GameEngine pour :
 - N'autoriser que les joueurs de la whitelist
 - Limiter les respawns à MAX_RESPAWNS par joueur
-- Sauvegarder et afficher un classement persistant
+- Tenir un classement persistant (en mémoire, journalisé sur disque)
 """
 
-import json
-import os
-import time
+from typing import Dict, List, Optional, Tuple
 import uvicorn
 from engine import GameEngine
-from main import app
+from leaderboard import Leaderboard
+from persistence import Journal
+from main import app, game
 
 # ==================== CONFIG TOURNOI ====================
 
-TOURNAMENT_FILE = "tournament_scores.json"
+TOURNAMENT_FILE = "tournament_scores.json"  # snapshot compacté
+TOURNAMENT_JOURNAL = "tournament_scores.journal"  # morts depuis le snapshot
+COMPACT_EVERY = 200  # événements journalisés avant compaction
 MAX_RESPAWNS = 10
 
 WHITELIST = [
@@ -28,6 +30,68 @@ WHITELIST = [
     # Ajoute ici les usernames autorisés
 ]
 
+# ==================== CLASSEMENT EN MÉMOIRE ====================
+
+class TournamentLedger:
+    """
+    Scores du tournoi en mémoire, journalisés à chaque mort.
+
+    Le journal (append-only) est compacté dans TOURNAMENT_FILE tous les
+    COMPACT_EVERY événements et rejoué au démarrage ; le classement par
+    kills est maintenu au fil des événements.
+    """
+
+    def __init__(self, journal: Journal):
+        self.journal = journal
+        self.scores: Dict[str, dict] = {}
+        self.ranking = Leaderboard()
+
+        state, events = journal.load()
+        for username, s in state.items():
+            self.scores[username] = {"kills": s["kills"], "deaths": s["deaths"]}
+            self.ranking.set(username, s["kills"])
+        for event in events:
+            self._apply(event["victim"], event.get("killer"))
+
+    def deaths(self, username: str) -> int:
+        return self.scores.get(username, {}).get("deaths", 0)
+
+    def record_death(self, victim: str, killer: Optional[str]):
+        """Enregistrer une mort (et le kill du tueur s'il est connu)"""
+        self._apply(victim, killer)
+        self.journal.append({"victim": victim, "killer": killer})
+        if self.journal.pending >= COMPACT_EVERY:
+            self.compact()
+
+    def _apply(self, victim: str, killer: Optional[str]):
+        self._entry(victim)["deaths"] += 1
+        if killer:
+            self._entry(killer)["kills"] += 1
+            self.ranking.add(killer)
+
+    def _entry(self, username: str) -> dict:
+        entry = self.scores.get(username)
+        if entry is None:
+            entry = self.scores[username] = {"kills": 0, "deaths": 0}
+            self.ranking.set(username, 0)
+        return entry
+
+    def compact(self):
+        """Confier un snapshot des scores au thread d'écriture du journal (pas d'I/O bloquante ici)"""
+        try:
+            self.journal.compact({username: dict(s) for username, s in self.scores.items()})
+        except Exception as e:
+            print(f"⚠️ Erreur sauvegarde tournoi: {e}")
+
+    def standings(self, limit: Optional[int] = None) -> List[Tuple[str, dict]]:
+        """Classement (username, scores), meilleurs en premier"""
+        top = self.ranking.top(limit if limit is not None else len(self.ranking))
+        return [(username, self.scores[username]) for username, _ in top]
+
+
+ledger: Optional[TournamentLedger] = None  # créé par activate()
+
+
 # ==================== PATCH DU GAME ENGINE ====================
 
 _original_join = GameEngine.join_game
@@ -40,8 +104,7 @@ def _tournament_join(self, username: str) -> dict:
         return {"success": False, "error": "Tournament mode: username not whitelisted"}
 
     # Check respawns restants
-    scores = _load_scores()
-    respawns_used = scores.get(username, {}).get("deaths", 0)
+    respawns_used = ledger.deaths(username)
     if respawns_used >= MAX_RESPAWNS:
         return {"success": False, "error": f"Tournament over for {username}: {MAX_RESPAWNS} respawns used"}
 
@@ -57,54 +120,34 @@ def _tournament_death(self, player_id: str, killer_id: str):
 
     # Mise à jour scores tournoi
     if player:
-        scores = _load_scores()
-
-        # Victime
-        if player.username not in scores:
-            scores[player.username] = {"kills": 0, "deaths": 0}
-        scores[player.username]["deaths"] += 1
+        ledger.record_death(player.username, killer.username if killer else None)
+        remaining = MAX_RESPAWNS - ledger.deaths(player.username)
+        status = "❌ ÉLIMINÉ" if remaining <= 0 else f"{remaining} respawns restants"
+        print(f"🏆 {player.username}: {status} (rang {ledger.ranking.rank(player.username)})")
 
-        # Tueur
-        if killer:
-            if killer.username not in scores:
-                scores[killer.username] = {"kills": 0, "deaths": 0}
-            scores[killer.username]["kills"] += 1
-
-        _save_scores(scores)
-        _print_leaderboard(scores)
-
-
-# Appliquer les patches
-GameEngine.join_game = _tournament_join
-GameEngine._handle_player_death = _tournament_death
 
+def activate():
+    """
+    Charger le classement et appliquer les patches.
 
-# ==================== PERSISTANCE SCORES ====================
-
-def _load_scores() -> dict:
-    if os.path.exists(TOURNAMENT_FILE):
-        try:
-            with open(TOURNAMENT_FILE, "r") as f:
-                return json.load(f)
-        except Exception:
-            pass
-    return {}
+    Appelé au lancement seulement : les workers de rooms (démarrés en
+    'spawn') réimportent ce script sans rien activer, le journal n'a
+    qu'un seul écrivain.
+    """
+    global ledger
+    ledger = TournamentLedger(Journal(TOURNAMENT_JOURNAL, TOURNAMENT_FILE))
+    game.tournament = ledger  # classement servi par /leaderboard
+    GameEngine.join_game = _tournament_join
+    GameEngine._handle_player_death = _tournament_death
 
 
-def _save_scores(scores: dict):
-    try:
-        with open(TOURNAMENT_FILE, "w") as f:
-            json.dump(scores, f, indent=2)
-    except Exception as e:
-        print(f"⚠️ Erreur sauvegarde tournoi: {e}")
+# ==================== AFFICHAGE ====================
 
-
-def _print_leaderboard(scores: dict):
+def _print_leaderboard(standings: List[Tuple[str, dict]]):
     print("\n🏆 CLASSEMENT TOURNOI")
     print(f"{'Joueur':<20} {'Kills':>6} {'Deaths':>8} {'Respawns restants':>18}")
     print("-" * 56)
-    sorted_scores = sorted(scores.items(), key=lambda x: x[1]["kills"], reverse=True)
-    for username, s in sorted_scores:
+    for username, s in standings:
         remaining = MAX_RESPAWNS - s["deaths"]
         status = "❌ ÉLIMINÉ" if remaining <= 0 else f"{remaining} restants"
         print(f"{username:<20} {s['kills']:>6} {s['deaths']:>8} {status:>18}")
@@ -116,15 +159,15 @@ def _print_leaderboard(scores: dict):
 if __name__ == "__main__":
     import config
 
+    activate()
     print("🏆 Mode TOURNOI activé")
     print(f"   Whitelist: {', '.join(WHITELIST)}")
     print(f"   Respawns max: {MAX_RESPAWNS}")
     print()
 
-    scores = _load_scores()
-    if scores:
+    if ledger.scores:
         print("📊 Scores existants chargés :")
-        _print_leaderboard(scores)
+        _print_leaderboard(ledger.standings())
     else:
         print("📊 Nouveau tournoi — aucun score existant\n")
 
@@ -134,3 +177,7 @@ if __name__ == "__main__":
         port=config.SERVER_PORT,
         log_level="info"
     )
+
+    # Arrêt : tout le journal dans le snapshot
+    ledger.compact()
+    ledger.journal.close()
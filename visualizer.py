@@ -8,15 +8,21 @@ import requests
 import sys
 import math
 from typing import Dict, List, Optional
+from codec import FrameDecoder
 
 
 class GameVisualizer:
     """Visualiseur graphique du jeu avec Pygame"""
     
-    def __init__(self, api_url: str = "http://localhost:8000", window_size: int = 800):
+    def __init__(self, api_url: str = "http://localhost:8000", window_size: int = 800,
+                 binary: bool = False):
         self.api_url = api_url.rstrip('/')
         self.window_size = window_size
         
+        # Format binaire compressé (cf. codec.py) : ~5x moins d'octets que le JSON
+        self.binary = binary
+        self.decoder = FrameDecoder()
+        
         # Dimensions du jeu
         self.map_width = 100.0
         self.map_height = 100.0
@@ -52,6 +58,7 @@ class GameVisualizer:
         print("🎮 Battle Arena Visualizer (Pygame)")
         print(f"   API: {api_url}")
         print(f"   Window: {window_size}x{window_size}")
+        print(f"   Format: {'binary' if binary else 'json'}")
         print("\nControls:")
         print("  G - Toggle grid")
         print("  N - Toggle names")
@@ -61,6 +68,12 @@ class GameVisualizer:
     def get_state(self) -> Optional[Dict]:
         """Récupérer l'état du jeu"""
         try:
+            if self.binary:
+                response = requests.get(f"{self.api_url}/api/state",
+                                        params={'format': 'binary-deflate'}, timeout=2)
+                if response.status_code == 200:
+                    return self.decoder.decode(response.content)
+                return None
             response = requests.get(f"{self.api_url}/api/state", timeout=2)
             if response.status_code == 200:
                 return response.json()
@@ -78,6 +91,16 @@ class GameVisualizer:
             pass
         return None
     
+    def get_leaderboard(self) -> Optional[List[Dict]]:
+        """Récupérer le top 5 (déjà trié par le serveur)"""
+        try:
+            response = requests.get(f"{self.api_url}/api/leaderboard", params={'limit': 5}, timeout=2)
+            if response.status_code == 200:
+                return response.json()['players']
+        except:
+            pass
+        return None
+    
     def world_to_screen(self, x: float, y: float) -> tuple:
         """Convertir coordonnées monde en coordonnées écran"""
         screen_x = int(x * self.scale)
@@ -261,8 +284,7 @@ class GameVisualizer:
         if not players:
             return
         
-        # Trier par kills
-        sorted_players = sorted(players, key=lambda p: p['kills'], reverse=True)[:5]
+        sorted_players = players[:5]
         
         # Fond
         board_width = 200
@@ -324,6 +346,7 @@ class GameVisualizer:
         print("🎬 Starting visualizer...")
         
         frame_count = 0
+        leaderboard = []
         
         while self.running:
             self.handle_events()
@@ -335,6 +358,7 @@ class GameVisualizer:
             stats = None
             if frame_count % 30 == 0:
                 stats = self.get_stats()
+                leaderboard = self.get_leaderboard() or leaderboard
             
             if state is None:
                 # Afficher message d'erreur
@@ -356,7 +380,7 @@ class GameVisualizer:
                 self.draw_bullets(state.get('bullets', []))
                 self.draw_players(state.get('players', []))
                 self.draw_hud(state, stats)
-                self.draw_leaderboard(state.get('players', []))
+                self.draw_leaderboard(leaderboard)
             
             pygame.display.flip()
             self.clock.tick(fps)
@@ -373,8 +397,11 @@ if __name__ == "__main__":
     # Taille fenêtre
     window_size = int(sys.argv[2]) if len(sys.argv) > 2 else 800
     
+    # Format ("binary" pour le format compact)
+    binary = len(sys.argv) > 3 and sys.argv[3] == "binary"
+    
     try:
-        viz = GameVisualizer(api_url, window_size)
+        viz = GameVisualizer(api_url, window_size, binary)
         viz.run(fps=30)
     except KeyboardInterrupt:
         print("\n👋 Interrupted")